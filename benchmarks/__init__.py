@@ -0,0 +1,15 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# __init__.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+# You can run the benchmark suite by executing the following command while in
+# the root directory of the project.
+#
+#   python -m benchmarks
+#
+# Pass `--save` to record the results as the stored baseline, and `--check` to
+# fail (with a non-zero exit status) if any benchmark has regressed against it.
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# __main__.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from benchmarks import suite
+from lorenz import backends
+
+BASELINE = Path(__file__).parent / "baseline.json"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+
+    parser.add_argument(
+        "-k",
+        "--only",
+        action="append",
+        help="only run benchmarks whose name contains this string",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="run the large (up to 100M character) sizes",
+    )
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        default=BASELINE,
+        help="path of the stored baseline",
+    )
+    parser.add_argument(
+        "--save",
+        action="store_true",
+        help="store the results as the new baseline",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="exit non-zero if any benchmark regressed against the baseline",
+    )
+    parser.add_argument(
+        "--backend",
+        help="run with this backend (default: $LORENZ_BACKEND, or automatic)",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="permitted slowdown before --check fails (default: 0.25)",
+    )
+
+    args = parser.parse_args()
+
+    if args.backend:
+        backends.use(args.backend)
+    print(f"backend: {backends.default().name}")
+
+    sizes = suite.FULL if args.full else suite.QUICK
+
+    results = []
+    for name, size in suite.cases(sizes, only=args.only):
+        result = suite.measure(name, size)
+        results.append(result)
+
+        print(
+            f"{name:<24} {size:>12,} "
+            f"{result['median'] * 1e3:>12.3f} ms "
+            f"{result['throughput']:>14,.0f} /s"
+        )
+
+    if args.save:
+        baseline = {}
+        if args.baseline.exists():
+            baseline = json.loads(args.baseline.read_text())
+
+        for result in results:
+            baseline[f"{result['name']}[{result['size']}]"] = result
+
+        args.baseline.write_text(json.dumps(baseline, indent=2) + "\n")
+
+    if args.check:
+        if not args.baseline.exists():
+            sys.exit(f"no baseline found at {args.baseline}.")
+
+        baseline = json.loads(args.baseline.read_text())
+        regressions = suite.compare(results, baseline, args.tolerance)
+
+        for key, before, after in regressions:
+            print(
+                f"REGRESSION {key}: {before * 1e3:.3f} ms -> {after * 1e3:.3f} ms"
+            )
+
+        if regressions:
+            sys.exit(1)
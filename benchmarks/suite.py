@@ -0,0 +1,449 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# suite.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+""" Benchmarks for the hot paths of the library.
+
+Each benchmark is a function decorated with `@benchmark`, which accepts a size
+(the number of characters to process) and returns a zero-argument callable
+that performs the work to be timed. Any preparation done before returning the
+callable is excluded from the measurement.
+"""
+import random
+import statistics
+import time
+
+from lorenz.anneal import Annealer
+from lorenz.bits import BitPlaneStream
+from lorenz.bitslice import BitslicedSZ40
+from lorenz.candidates import CandidateStore
+from lorenz.colossus import Colossus
+from lorenz.corpus import CorpusGenerator
+from lorenz.cribs import drag
+from lorenz.duplicates import DuplicateIndex
+from lorenz.generate import CamGenerator
+from lorenz.language import LanguageModel
+from lorenz.machines import SZ40
+from lorenz.patterns import KH_CAMS
+from lorenz.rectangle import Rectangle
+from lorenz.resync import decrypt
+from lorenz.search import ChiSearch
+from lorenz.search import SequentialTest
+from lorenz.stats import evaluate
+from lorenz.telegraphy import BP_SHIFTLESS_ITA2
+from lorenz.telegraphy import Teleprinter
+from lorenz.wiring import CompiledMachine
+
+# The sizes exercised by default, and those added by `--full`. The largest
+# sizes are fed through the machine in chunks of at most CHUNK characters, so
+# as to keep memory usage bounded; every chunk is processed, so that the
+# throughput reported is that of the whole size.
+QUICK = [1_000, 100_000]
+FULL = [1_000, 1_000_000, 100_000_000]
+CHUNK = 1_000_000
+
+BENCHMARKS = {}
+
+
+def benchmark(name, sizes=None):
+    """Register a benchmark under `name`.
+
+    If `sizes` is given, the benchmark is only run at those sizes, regardless
+    of the sizes requested on the command line.
+    """
+
+    def decorator(function):
+        BENCHMARKS[name] = (function, sizes)
+        return function
+
+    return decorator
+
+
+def _stream(size, seed=0):
+    """ Generate a reproducible stream of five-bit words. """
+    rng = random.Random(seed)
+    return [rng.randrange(32) for _ in range(min(size, CHUNK))]
+
+
+@benchmark("sz40.construct", sizes=[1_000])
+def sz40_construct(size):
+    def run():
+        for _ in range(size):
+            SZ40(KH_CAMS)
+
+    return run
+
+
+@benchmark("sz40.feed")
+def sz40_feed(size):
+    stream = _stream(size)
+    machine = SZ40(KH_CAMS)
+
+    def run():
+        remaining = size
+        while remaining > 0:
+            machine.feed(stream[:remaining])
+            remaining -= len(stream)
+
+    return run
+
+
+@benchmark("sz40.keystream")
+def sz40_keystream(size):
+    machine = SZ40(KH_CAMS)
+
+    def run():
+        remaining = size
+        while remaining > 0:
+            machine.keystream(min(remaining, CHUNK))
+            remaining -= CHUNK
+
+    return run
+
+
+@benchmark("sz40.reverse_keystream")
+def sz40_reverse_keystream(size):
+    machine = SZ40(KH_CAMS)
+    machine.seek(size)
+
+    def run():
+        remaining = size
+        while remaining > 0:
+            machine.reverse_keystream(min(remaining, CHUNK))
+            remaining -= CHUNK
+        machine.seek(size)
+
+    return run
+
+
+@benchmark("sz40.seek", sizes=[1_000])
+def sz40_seek(size):
+    machine = SZ40(KH_CAMS)
+
+    def run():
+        for n in range(size):
+            machine.seek(n)
+
+    return run
+
+
+@benchmark("wiring.feed")
+def wiring_feed(size):
+    stream = _stream(size)
+
+    machine = CompiledMachine.sz40(KH_CAMS)
+
+    def run():
+        remaining = size
+        while remaining > 0:
+            machine.feed(stream[:remaining])
+            remaining -= len(stream)
+
+    return run
+
+
+def _lanes(n, seed=0):
+    """ Generate reproducible start positions for `n` machines. """
+    rng = random.Random(seed)
+    return [
+        {
+            group: [rng.randrange(len(pins)) for pins in KH_CAMS[group]]
+            for group in ["chi", "psi", "mu"]
+        }
+        for _ in range(n)
+    ]
+
+
+# The bitsliced benchmarks run 64 lanes with independent motors; the size is
+# the number of characters produced per lane. "bitslice.reference" produces
+# the same keys with one SZ40 per lane, for comparison.
+@benchmark("bitslice.keystreams", sizes=[1_000, 10_000])
+def bitslice_keystreams(size):
+    machines = BitslicedSZ40(KH_CAMS, _lanes(64))
+
+    def run():
+        machines.keystreams(size)
+
+    return run
+
+
+@benchmark("bitslice.reference", sizes=[1_000, 10_000])
+def bitslice_reference(size):
+    machines = [SZ40(KH_CAMS, positions=lane) for lane in _lanes(64)]
+
+    def run():
+        for machine in machines:
+            machine.keystream(size)
+
+    return run
+
+
+@benchmark("bitslice.slices")
+def bitslice_slices(size):
+    machines = BitslicedSZ40(KH_CAMS, _lanes(64))
+
+    def run():
+        remaining = size
+        while remaining > 0:
+            for _ in machines.slices(min(remaining, CHUNK)):
+                pass
+            remaining -= CHUNK
+
+    return run
+
+
+@benchmark("bitplane.agreement")
+def bitplane_agreement(size):
+    stream = BitPlaneStream.from_stream(_stream(size, seed=0))
+    other = BitPlaneStream.from_stream(_stream(size, seed=1))
+
+    def run():
+        remaining = size
+        while remaining > 0:
+            stream.delta().agreement(other.delta(), 1, 2)
+            remaining -= CHUNK
+
+    return run
+
+
+@benchmark("cribs.drag", sizes=[1_000, 10_000])
+def cribs_drag(size):
+    ciphertext = _stream(size)
+    crib = _stream(60, seed=1)
+
+    def run():
+        drag(ciphertext, crib, KH_CAMS["chi"])
+
+    return run
+
+
+@benchmark("search.chi")
+def search_chi(size):
+    ciphertext = _stream(size)
+
+    def run():
+        remaining = size
+        while remaining > 0:
+            ChiSearch(ciphertext[:remaining], KH_CAMS["chi"]).run()
+            remaining -= len(ciphertext)
+
+    return run
+
+
+@benchmark("colossus.run", sizes=[1_000, 10_000])
+def colossus_run(size):
+    colossus = Colossus(_stream(size), chi=KH_CAMS["chi"])
+
+    def run():
+        colossus.run("~(dZ1 ^ dZ2 ^ dX1 ^ dX2)", loops=["X1", "X2"])
+
+    return run
+
+
+@benchmark("anneal.step", sizes=[1_000, 10_000])
+def anneal_step(size):
+    annealer = Annealer(_stream(size), KH_CAMS["mu"], seed=0)
+
+    def run():
+        for _ in range(1000):
+            annealer.step(0.5)
+
+    return run
+
+
+@benchmark("rectangle.feed", sizes=[1_000, 100_000])
+def rectangle_feed(size):
+    rectangle = Rectangle()
+    ciphertext = _stream(size)
+    delta = [[0, 1] * 20 + [0], [0, 1] * 15 + [0]]
+
+    def run():
+        rectangle.feed(ciphertext, delta, threshold=0)
+
+    return run
+
+
+@benchmark("candidates.top", sizes=[1_000, 100_000])
+def candidates_top(size):
+    rng = random.Random(0)
+    pairs = [
+        (rng.getrandbits(96).to_bytes(12, "little"), rng.random())
+        for _ in range(size)
+    ]
+
+    def run():
+        store = CandidateStore()
+        store.extend(pairs)
+        store.top(100)
+
+    return run
+
+
+@benchmark("duplicates.signature", sizes=[1_000, 100_000])
+def duplicates_signature(size):
+    index = DuplicateIndex()
+    stream = _stream(size)
+
+    def run():
+        index.signature(stream)
+
+    return run
+
+
+@benchmark("search.chi.sequential")
+def search_chi_sequential(size):
+    ciphertext = _stream(size)
+
+    def run():
+        remaining = size
+        while remaining > 0:
+            ChiSearch(ciphertext[:remaining], KH_CAMS["chi"]).run(
+                SequentialTest()
+            )
+            remaining -= len(ciphertext)
+
+    return run
+
+
+@benchmark("resync.decrypt")
+def resync_decrypt(size):
+    rng = random.Random(0)
+    plaintext = LanguageModel.english().sample(min(size, CHUNK), rng)
+    ciphertext = SZ40(KH_CAMS).feed(plaintext)
+
+    # drop a character every thousand.
+    del ciphertext[500::1000]
+
+    def run():
+        remaining = size
+        while remaining > 0:
+            decrypt(ciphertext, KH_CAMS)
+            remaining -= CHUNK
+
+    return run
+
+
+@benchmark("stats.evaluate", sizes=[1_000])
+def stats_evaluate(size):
+    library = [KH_CAMS] * size
+
+    def run():
+        evaluate(library)
+
+    return run
+
+
+@benchmark("generate.cams", sizes=[1_000, 10_000])
+def generate_cams(size):
+    def run():
+        for _ in CamGenerator(seed=0).generate(size, packed=True):
+            pass
+
+    return run
+
+
+@benchmark("corpus.records", sizes=[1_000, 100_000])
+def corpus_records(size):
+    generator = CorpusGenerator(seed=0, library=[KH_CAMS], length=1_000)
+
+    def run():
+        for _ in generator.records(size // 1_000):
+            pass
+
+    return run
+
+
+@benchmark("teleprinter.encode")
+def teleprinter_encode(size):
+    rng = random.Random(0)
+    message = "".join(
+        rng.choice(BP_SHIFTLESS_ITA2) for _ in range(min(size, CHUNK))
+    )
+
+    def run():
+        remaining = size
+        while remaining > 0:
+            Teleprinter.encode(message[:remaining])
+            remaining -= len(message)
+
+    return run
+
+
+@benchmark("teleprinter.decode")
+def teleprinter_decode(size):
+    stream = _stream(size)
+
+    def run():
+        remaining = size
+        while remaining > 0:
+            Teleprinter.decode(stream[:remaining])
+            remaining -= len(stream)
+
+    return run
+
+
+def measure(name, size, repeat=5):
+    """Time the benchmark `name` at the given size.
+
+    The benchmark is run `repeat` times (once, for sizes above a million
+    characters); the best and median wall-clock times are reported, along with
+    the throughput implied by the median.
+    """
+
+    function, _ = BENCHMARKS[name]
+    run = function(size)
+
+    if size > CHUNK:
+        repeat = 1
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+
+    median = statistics.median(timings)
+    return {
+        "name": name,
+        "size": size,
+        "best": min(timings),
+        "median": median,
+        "throughput": size / median if median > 0 else float("inf"),
+    }
+
+
+def cases(sizes, only=None):
+    """ Enumerate the (name, size) pairs to be run. """
+    for name, (_, fixed) in BENCHMARKS.items():
+        if only and not any(pattern in name for pattern in only):
+            continue
+
+        for size in fixed or sizes:
+            yield name, size
+
+
+def compare(results, baseline, tolerance):
+    """Compare results against a stored baseline.
+
+    Returns a list of (key, baseline median, current median) triples for every
+    benchmark whose median time exceeds its baseline by more than the given
+    tolerance (expressed as a fraction, i.e. 0.25 permits a 25% slowdown.)
+    Benchmarks missing from the baseline are ignored.
+    """
+
+    regressions = []
+    for result in results:
+        key = f"{result['name']}[{result['size']}]"
+        if key not in baseline:
+            continue
+
+        if result["median"] > baseline[key]["median"] * (1 + tolerance):
+            regressions.append(
+                (key, baseline[key]["median"], result["median"])
+            )
+
+    return regressions
@@ -0,0 +1,654 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# anneal.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+""" Recovers the cams of the Psi and motor rotors from the de-Chi.
+
+Once the Chi cams and starts are known, removing the Chi stream from the
+ciphertext leaves the "de-Chi", which is the plaintext plus the extended Psi
+stream. Either of the Psi and motor patterns can be recovered once the other
+is known:
+
+    - given the motor cams, `recover()` finds the Psi cams by simulated
+      annealing. A guess at the Psi cams yields a guess at the plaintext, and
+      is scored by a `LanguageModel`; the guess is improved one cam at a time,
+      keeping each change that improves the score (and, early on, some that do
+      not.) Flipping a Psi cam changes the plaintext only at the characters at
+      which that cam is active, so only those characters (and, for a bigram
+      model, the ones following them) are rescored.
+
+    - given the Psi cams, `recover_motor()` follows the extended Psi stream
+      through the de-Chi (finding, at every step, whether the Psi rotors
+      moved), and then finds the motor cams that best explain that motion.
+      The motion found is not free of errors, which can lead the fit astray,
+      so it is begun from several offsets of the motor rotors (in parallel),
+      and the fit that gives the best plaintext is kept.
+
+Searching for both at once is not supported. Flipping a motor cam changes the
+motion of the Psi rotors from that point on, so the score of a guess at the
+motor cams is chaotic unless the Psi cams are already nearly right, and the
+motion alone (the de-Chi is more often repeated where the Psi rotors stand
+still) carries too little evidence to fix the motor cams in a message of a few
+thousand characters.
+
+The cams are recovered as seen from the starts of the message; that is, the
+patterns found are those of the rotors rotated to their start positions.
+"""
+import math
+import multiprocessing
+import operator
+import random
+from collections import namedtuple
+from itertools import accumulate
+
+from lorenz.checkpoint import Checkpointer
+from lorenz.checkpoint import fingerprint
+from lorenz.checkpoint import rng_state
+from lorenz.checkpoint import set_rng_state
+from lorenz.language import LanguageModel
+from lorenz.schedule import MotorSchedule
+
+# The result of a search: the Psi and motor cams (in the forms accepted by
+# `SZ40.__init__()`), and the mean score per character of the plaintext.
+Recovery = namedtuple("Recovery", ["psi", "mu", "score"])
+
+PSI_SIZES = [43, 47, 51, 53, 59]
+MU_SIZES = [61, 37]
+
+# The motor is recovered from at most this many characters of the de-Chi (two
+# full cycles of the motor), since following the Psi stream takes time
+# quadratic in the length of the de-Chi.
+SPAN = 2 * 61 * 37
+
+# The number of times the cams of the second motor rotor, and the positions at
+# which it advances, are refitted to one another for each trial.
+ROUNDS = 8
+
+# The furthest that a raised cam of the first motor rotor is moved at a time
+# while the motor cams are refined.
+REACH = 4
+
+
+class Annealer:
+    """ A single simulated-annealing search for the Psi cams. """
+
+    def score(self):
+        """ Score the current plaintext in full. """
+        return sum(self.model.scores(self.plaintext))
+
+    def plaintext_of(self):
+        """ Derive the plaintext from the current cams. """
+        advances = self.advances
+        key = [0] * self.n
+        for i, pins in enumerate(self.psi):
+            size = len(pins)
+            bit = 4 - i
+            key = [k | (pins[a % size] << bit) for k, a in zip(key, advances)]
+        return [d ^ k for d, k in zip(self.dechi, key)]
+
+    def flip_psi(self, i, c):
+        """Flip cam `c` of Psi rotor `i` (zero-indexed) and return the change
+        in score, rescoring only the affected characters.
+        """
+
+        positions = self.buckets[i][c]
+        bit = 1 << (4 - i)
+        plaintext = self.plaintext
+
+        terms = positions
+        if self.model.bigrams is not None:
+            terms = sorted(
+                set(positions).union(
+                    t + 1 for t in positions if t + 1 < self.n
+                )
+            )
+
+        before = self._terms(terms)
+        for t in positions:
+            plaintext[t] ^= bit
+        self.psi[i][c] ^= 1
+
+        return self._terms(terms) - before
+
+    def step(self, temperature):
+        """Flip a random cam, keeping the change if it improves the score or,
+        with a probability falling with the temperature, if it does not.
+        """
+
+        rng = self.rng
+        i = rng.randrange(len(self.psi))
+        c = rng.randrange(len(self.psi[i]))
+        delta = self.flip_psi(i, c)
+        if self._accept(delta, temperature):
+            self.total += delta
+        else:
+            self.flip_psi(i, c)
+
+    def run(
+        self, iterations, start=2.0, end=0.01, checkpoint=None, every=60.0
+    ):
+        """Anneal for a number of iterations, the temperature falling
+        geometrically from `start` to `end`, and return the Recovery.
+
+        checkpoint
+            If given, the path of a file to which the progress of the search
+            is written (at most once every `every` seconds.) If the file holds
+            a checkpoint of this same search, the search resumes from it, and
+            returns the same Recovery as though it had never been interrupted.
+        """
+
+        ratio = (end / start) ** (1 / max(iterations - 1, 1))
+        temperature = start
+        first = 0
+
+        checkpointer = None
+        if checkpoint is not None:
+            key = fingerprint(
+                self.dechi,
+                self.mu,
+                self.psi,
+                rng_state(self.rng),
+                self.model.unigrams,
+                self.model.bigrams,
+                iterations,
+                start,
+                end,
+            )
+            checkpointer = Checkpointer(checkpoint, key, every)
+
+            state = checkpointer.load()
+            if state is not None:
+                first = state["iteration"]
+                temperature = state["temperature"]
+                set_rng_state(self.rng, state["rng"])
+                self.psi = state["psi"]
+                self.plaintext = self.plaintext_of()
+                self.total = state["total"]
+
+        for i in range(first, iterations):
+            self.step(temperature)
+            temperature *= ratio
+
+            if checkpointer is not None and (
+                checkpointer.due() or i == iterations - 1
+            ):
+                checkpointer.save(
+                    {
+                        "iteration": i + 1,
+                        "temperature": temperature,
+                        "rng": rng_state(self.rng),
+                        "psi": self.psi,
+                        "total": self.total,
+                    }
+                )
+
+        return self.recovery()
+
+    def recovery(self):
+        """ Return the current cams, as a Recovery. """
+        return Recovery(
+            [list(pins) for pins in self.psi],
+            [list(pins) for pins in self.mu],
+            self.total / self.n,
+        )
+
+    def _accept(self, delta, temperature):
+        if delta >= 0:
+            return True
+        return self.rng.random() < math.exp(delta / temperature)
+
+    def _terms(self, terms):
+        """ Sum the scores of the characters at the given indices. """
+        plaintext = self.plaintext
+        unigrams = self.model.unigrams
+        bigrams = self.model.bigrams
+
+        if bigrams is None:
+            return sum(unigrams[plaintext[t]] for t in terms)
+
+        return sum(
+            (
+                bigrams[plaintext[t - 1]][plaintext[t]]
+                if t
+                else unigrams[plaintext[t]]
+            )
+            for t in terms
+        )
+
+    def _derive(self):
+        """ Recompute everything that depends upon the motor cams. """
+        schedule = MotorSchedule(self.mu, [0] * len(self.mu))
+        self.advances = list(
+            accumulate(schedule.stream(self.n - 1), initial=0)
+        )
+
+        self.buckets = []
+        for pins in self.psi:
+            size = len(pins)
+            buckets = [[] for _ in range(size)]
+            for t, a in enumerate(self.advances):
+                buckets[a % size].append(t)
+            self.buckets.append(buckets)
+
+        self.plaintext = self.plaintext_of()
+        self.total = self.score()
+
+    def __init__(self, dechi, mu, model=None, psi=None, seed=None):
+        """Prepare a search.
+
+        dechi
+            The de-Chi, as a list of five-bit integers.
+
+        mu
+            The motor cams, in the form accepted by `SZ40.__init__()`.
+
+        model
+            The LanguageModel used to score the plaintext. By default, a model
+            of English is used.
+
+        psi
+            The initial guess at the Psi cams. By default, it is random.
+
+        seed
+            The seed of the search's random choices.
+        """
+
+        if len(dechi) < 2:
+            raise ValueError("the de-Chi is too short to be searched.")
+
+        self.rng = random.Random(seed)
+        self.model = model or LanguageModel.english()
+        self.dechi = list(dechi)
+        self.n = len(self.dechi)
+
+        self.mu = [list(pins) for pins in mu]
+        if psi:
+            self.psi = [list(pins) for pins in psi]
+        else:
+            self.psi = [
+                [self.rng.getrandbits(1) for _ in range(size)]
+                for size in PSI_SIZES
+            ]
+
+        self._derive()
+
+
+def _restart(arguments):
+    dechi, mu, model, seed, iterations, start, end, checkpoint, every = (
+        arguments
+    )
+    annealer = Annealer(dechi, mu, model=model, seed=seed)
+    return annealer.run(
+        iterations, start=start, end=end, checkpoint=checkpoint, every=every
+    )
+
+
+def recover(
+    dechi,
+    mu,
+    model=None,
+    restarts=4,
+    iterations=20000,
+    start=2.0,
+    end=0.01,
+    seed=0,
+    processes=None,
+    checkpoint=None,
+    every=60.0,
+):
+    """Run several independent searches for the Psi cams, given the motor
+    cams, in parallel, and return the best Recovery.
+
+    dechi, mu, model
+        As for `Annealer.__init__()`.
+
+    restarts
+        The number of independent searches.
+
+    iterations, start, end
+        As for `Annealer.run()`.
+
+    seed
+        The seed from which the seed of each search is derived.
+
+    processes
+        The number of worker processes; by default, one per core. If one, the
+        searches are run in this process.
+
+    checkpoint, every
+        As for `Annealer.run()`; each search writes its own checkpoint, to
+        the given path followed by the number of the search.
+    """
+
+    model = model or LanguageModel.english()
+    arguments = [
+        (
+            dechi,
+            mu,
+            model,
+            seed * 1_000_003 + r,
+            iterations,
+            start,
+            end,
+            None if checkpoint is None else f"{checkpoint}.{r}",
+            every,
+        )
+        for r in range(restarts)
+    ]
+
+    if processes == 1 or restarts == 1:
+        results = list(map(_restart, arguments))
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.map(_restart, arguments)
+
+    return max(results, key=lambda recovery: recovery.score)
+
+
+def _words(psi, n):
+    """ Return the Psi words after 0, 1, ..., n - 1 advances. """
+    words = [0] * n
+    for i, pins in enumerate(psi):
+        size = len(pins)
+        bit = 4 - i
+        words = [w | (pins[a % size] << bit) for a, w in enumerate(words)]
+    return words
+
+
+def _track(dechi, psi, model):
+    """Follow the extended Psi stream through the de-Chi, returning the most
+    likely motion of the Psi rotors: a list of bits, one for each step but
+    the last, indicating whether the Psi rotors advance after that step.
+
+    This is the Viterbi path over the number of advances so far, scored by
+    the unigram model alone.
+    """
+
+    n = len(dechi)
+    words = _words(psi, n)
+
+    # The score of each character of de-Chi, against the Psi word at each
+    # number of advances.
+    unigrams = model.unigrams
+    emissions = [[unigrams[d ^ w] for w in words] for d in range(32)]
+
+    scores = [emissions[dechi[0]][0]]
+    choices = []
+    for t in range(1, n):
+        stay = scores + [-math.inf]
+        move = [-math.inf] + scores
+        choices.append(bytes(map(operator.gt, move, stay)))
+        scores = list(
+            map(
+                operator.add,
+                map(max, stay, move),
+                emissions[dechi[t]][: t + 1],
+            )
+        )
+
+    a = max(range(n), key=scores.__getitem__)
+    motion = []
+    for choice in reversed(choices):
+        motion.append(choice[a])
+        a -= choice[a]
+    motion.reverse()
+    return motion
+
+
+def _align(sums, pins, raised):
+    """Find how often the second motor rotor has advanced at each position of
+    the first rotor (within a revolution of it), given the cams of the second
+    rotor and the number of raised cams on the first, so as to best agree
+    with the motion. Return the agreement and those counts.
+    """
+
+    first, second = MU_SIZES
+    signs = [1 if pin else -1 for pin in pins] * 2
+
+    def agreement(k, c):
+        v = c % second
+        return sum(map(operator.mul, sums[k], signs[v : v + second]))
+
+    # The count at each position is either that at the previous position, or
+    # one more; it begins at zero and ends at `raised`.
+    best = {0: agreement(0, 0)}
+    back = []
+    for k in range(1, first):
+        scores, links = {}, {}
+        for c in range(max(0, raised - (first - k)), min(k, raised) + 1):
+            options = [(best[p], p) for p in (c, c - 1) if p in best]
+            if options:
+                score, links[c] = max(options)
+                scores[c] = score + agreement(k, c)
+        best = scores
+        back.append(links)
+
+    score, c = max((s, c) for c, s in best.items() if raised - c in (0, 1))
+    counts = [c]
+    for links in reversed(back):
+        c = links[c]
+        counts.append(c)
+    counts.reverse()
+    return score, counts
+
+
+def _sums(motion, raised, shift=0):
+    """Return the motion at each position of the first motor rotor, grouped
+    by the number of advances (modulo its size) of the second rotor during
+    the complete revolutions of the first, as used by `_align()`. The motion
+    is taken to begin `shift` steps into a revolution of the first rotor.
+    """
+
+    first, second = MU_SIZES
+    sums = [[0] * second for _ in range(first)]
+    for t, bit in enumerate(motion):
+        q, k = divmod(t + shift, first)
+        sums[k][q * raised % second] += 1 if bit else -1
+    return sums
+
+
+def _vote(sums, counts):
+    """Return the cams of the second motor rotor that best agree with the
+    motion, given the counts found by `_align()`.
+    """
+
+    second = MU_SIZES[1]
+    votes = [0] * second
+    for row, c in zip(sums, counts):
+        for r, s in enumerate(row):
+            votes[(r + c) % second] += s
+    return [int(v > 0) for v in votes]
+
+
+def _fit(motion, raised=None, offsets=(0, 0)):
+    """Find the motor cams whose motion best agrees with the given motion,
+    returning the number of raised cams on the first motor rotor, the counts
+    found by `_align()` and the cams of the second motor rotor.
+
+    The number of raised cams is found unless given. The fit only finds the
+    best agreement near its first guess, so it may be begun from other
+    `offsets` of the two rotors: the motion is taken to begin that far into a
+    revolution of the first, and the first guess at the cams of the second is
+    rotated by that much.
+    """
+
+    first, second = MU_SIZES
+    shift, turn = offsets
+
+    best = None
+    for raised in range(first + 1) if raised is None else [raised]:
+        sums = _sums(motion, raised, shift)
+
+        pins = [int(s > 0) for s in sums[0]]
+        pins = pins[turn:] + pins[:turn]
+        for _ in range(ROUNDS):
+            score, counts = _align(sums, pins, raised)
+
+            refitted = _vote(sums, counts)
+            if refitted == pins:
+                break
+            pins = refitted
+        else:
+            score, counts = _align(sums, pins, raised)
+
+        if best is None or score > best[0]:
+            best = (score, raised, counts, pins)
+
+    _, raised, counts, pins = best
+
+    # Return the fit as seen from the start of the motion, rather than from
+    # the start of the revolution in which it began.
+    base = counts[shift]
+    counts = [c - base for c in counts[shift:]] + [
+        c + raised - base for c in counts[:shift]
+    ]
+    base %= second
+    return raised, counts, pins[base:] + pins[:base]
+
+
+def _motion(n, raised, counts, pins):
+    """Return the motion of the Psi rotors over `n` steps, as for `_track()`,
+    given the number of raised cams on the first motor rotor, the counts
+    found by `_align()` and the cams of the second motor rotor.
+    """
+
+    first, second = MU_SIZES
+
+    # The cams of the second rotor are repeated, so that a revolution of the
+    # first can be read from any of them without wrapping around.
+    cams = pins * (first // second + 2)
+
+    motion = []
+    for q in range((n - 2) // first + 1):
+        start = q * raised % second
+        motion.extend(map(cams[start:].__getitem__, counts))
+    return motion[: n - 1]
+
+
+def _refine(dechi, psi, model, motion, raised, counts, pins):
+    """Improve the fit of `_fit()` to the motion by hill climbing on the score
+    of the plaintext (which, unlike the tracked motion, is not confused where
+    consecutive Psi words are equal), making the best single change to the
+    cams at a time, and return the score. The counts and cams are modified in
+    place.
+    """
+
+    n = len(dechi)
+    words = _words(psi, n)
+    sums = _sums(motion, raised)
+
+    def score(counts, pins):
+        motion = _motion(n, raised, counts, pins)
+        key = map(words.__getitem__, accumulate(motion, initial=0))
+        return sum(model.scores(list(map(operator.xor, dechi, key))))
+
+    def changes(counts, pins):
+        # A raised cam of the first rotor may be moved by up to REACH places,
+        # which changes the counts between its old and new places by one;
+        # each cam of the second rotor may be flipped. Each change is tried
+        # both alone and with the other rotor fitted to the motion again.
+        cams = [b - a for a, b in zip(counts, counts[1:] + [raised])]
+        for i, cam in enumerate(cams):
+            for j in range(i + 1, min(i + REACH + 1, len(cams))):
+                if cams[j] != cam:
+                    d = cams[j] - cam
+                    moved = (
+                        counts[: i + 1]
+                        + [c + d for c in counts[i + 1 : j + 1]]
+                        + counts[j + 1 :]
+                    )
+                    yield moved, pins
+                    yield moved, _vote(sums, moved)
+        for j, pin in enumerate(pins):
+            flipped = pins[:j] + [pin ^ 1] + pins[j + 1 :]
+            yield counts, flipped
+            yield _align(sums, flipped, raised)[1], flipped
+
+    # A wrong cam throws the Psi stream out of step from its first use
+    # onwards, so the best change is made rather than the first that improves
+    # the score, which tends to compensate for a wrong cam rather than
+    # correct it; refitting corrects pairs of wrong cams that compensate for
+    # one another.
+    best, fit = score(counts, pins), (counts, pins)
+    while True:
+        trial, change = max(
+            (score(*change), change) for change in changes(*fit)
+        )
+        if trial <= best:
+            break
+        best, fit = trial, change
+
+    counts[:], pins[:] = fit
+    return best
+
+
+def _restart_motor(arguments):
+    dechi, psi, model, motion, raised, offsets = arguments
+    raised, counts, pins = _fit(motion, raised, offsets)
+    score = _refine(dechi, psi, model, motion, raised, counts, pins)
+    return score, raised, counts, pins
+
+
+def recover_motor(
+    dechi, psi, model=None, span=SPAN, restarts=16, seed=0, processes=None
+):
+    """Find the motor cams, given the Psi cams, and return the Recovery.
+
+    dechi, model
+        As for `Annealer.__init__()`.
+
+    psi
+        The Psi cams, in the form accepted by `SZ40.__init__()`.
+
+    span
+        The number of characters of the de-Chi from which the motor cams are
+        recovered.
+
+    restarts
+        The number of offsets of the motor rotors from which the fit is
+        begun; the fit that best explains the de-Chi is kept.
+
+    seed
+        The seed from which the offsets (after the first, which is zero) are
+        drawn.
+
+    processes
+        The number of worker processes; by default, one per core. If one, the
+        fits are run in this process.
+    """
+
+    if len(dechi) < 2:
+        raise ValueError("the de-Chi is too short to be searched.")
+
+    model = model or LanguageModel.english()
+    dechi = list(dechi)
+
+    # The number of raised cams on the first rotor is found once; each
+    # restart fits only the counts and the cams of the second rotor.
+    motion = _track(dechi[:span], psi, model)
+    raised, _, _ = _fit(motion)
+
+    rng = random.Random(seed)
+    offsets = [(0, 0)] + [
+        tuple(rng.randrange(size) for size in MU_SIZES)
+        for _ in range(restarts - 1)
+    ]
+    arguments = [
+        (dechi[:span], psi, model, motion, raised, offset)
+        for offset in offsets
+    ]
+
+    if processes == 1 or restarts == 1:
+        results = list(map(_restart_motor, arguments))
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.map(_restart_motor, arguments)
+
+    _, raised, counts, pins = max(results, key=lambda result: result[0])
+
+    mu = [[b - a for a, b in zip(counts, counts[1:] + [raised])], pins]
+    return Annealer(dechi, mu, model=model, psi=psi).recovery()
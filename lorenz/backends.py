@@ -0,0 +1,320 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# backends.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+""" Interchangeable implementations of the library's inner loops.
+
+The bulk operations behind `SZ40.feed()` and `SZ40.keystream()`, and the
+counting done by `ChiSearch`, are delegated to a "backend". Three are provided:
+
+    python  the reference implementation, using only the standard library;
+    numpy   using NumPy arrays, if NumPy is installed;
+    numba   using loops compiled by Numba, if Numba (and NumPy) are installed.
+
+All backends give identical results. A backend is chosen by name, either by
+passing it to the classes that use it or, for the default, by setting the
+`LORENZ_BACKEND` environment variable. Otherwise, Numba is used if it is
+installed, and the reference implementation if not.
+
+Each backend is checked against the reference implementation when it is first
+selected; the default backend is selected (and so checked) when this module is
+imported, so that a broken installation is found at startup rather than part
+way through an analysis. A backend that cannot be imported, or that fails this
+self-test, is refused: with an error if it was asked for by name, and with a
+warning (and a fall back to the reference implementation) if it was chosen
+automatically.
+"""
+import os
+import random
+import warnings
+from itertools import accumulate
+from operator import or_
+from operator import xor
+
+from lorenz.bits import popcount
+
+# The registered backends, by name.
+BACKENDS = {}
+
+# The backends that have been selected (and passed the self-test), by name.
+_SELECTED = {}
+
+# The name of the default backend, once chosen.
+_DEFAULT = None
+
+
+def register(name):
+    """ Register a class as the backend with the given name. """
+
+    def decorator(cls):
+        cls.name = name
+        BACKENDS[name] = cls
+        return cls
+
+    return decorator
+
+
+@register("python")
+class PythonBackend:
+    """ The reference implementation, using only the standard library. """
+
+    def states(self, pins, positions, n):
+        """Return the states of a set of rotors (as returned by
+        `RotorSet.state()`) at each of their next `n` positions.
+
+        pins, positions
+            The cams and the current positions of the rotors.
+        """
+
+        states = [0] * n
+        for shift, (cams, position) in enumerate(
+            zip(reversed(pins), reversed(positions))
+        ):
+            size = len(cams)
+            start = position % size
+
+            rotated = [bit << shift for bit in cams[start:]]
+            rotated += [bit << shift for bit in cams[:start]]
+
+            states = list(map(or_, states, (rotated * -(-n // size))[:n]))
+
+        return states
+
+    def keystream(self, chi, psi, advances):
+        """Return the key, given the states of the Chi rotors at each step,
+        the states of the Psi rotors at each of their positions, and the
+        number of times the Psi rotors have advanced before each step.
+        """
+
+        return list(map(xor, chi, map(psi.__getitem__, advances)))
+
+    def add(self, stream, key):
+        """ Add (XOR) a key to a stream of characters. """
+        return list(map(xor, stream, key))
+
+    def crosses(self, x, values):
+        """Return the number of crosses (set bits) in the sum of `x` and each
+        of the packed streams in `values`.
+        """
+
+        return list(map(popcount, map(x.__xor__, values)))
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.name!r}>"
+
+
+@register("numpy")
+class NumPyBackend(PythonBackend):
+    """Operate upon NumPy arrays. Packed (big integer) streams have no NumPy
+    representation, so `crosses()` is inherited from the reference.
+    """
+
+    def states(self, pins, positions, n):
+        np = self.np
+
+        states = np.zeros(n, dtype=np.uint8)
+        for shift, (cams, position) in enumerate(
+            zip(reversed(pins), reversed(positions))
+        ):
+            rotated = np.roll(np.asarray(cams, dtype=np.uint8), -position)
+            states |= np.resize(rotated, n) << np.uint8(shift)
+
+        return states.tolist()
+
+    def keystream(self, chi, psi, advances):
+        np = self.np
+
+        chi = np.asarray(chi, dtype=np.uint8)
+        psi = np.asarray(psi, dtype=np.uint8)
+        index = np.asarray(advances[: len(chi)], dtype=np.intp)
+
+        return (chi ^ psi[index]).tolist()
+
+    def add(self, stream, key):
+        np = self.np
+
+        n = min(len(stream), len(key))
+        stream = np.asarray(stream[:n], dtype=np.uint8)
+        key = np.asarray(key[:n], dtype=np.uint8)
+
+        return (stream ^ key).tolist()
+
+    def __init__(self):
+        import numpy
+
+        self.np = numpy
+
+
+@register("numba")
+class NumbaBackend(NumPyBackend):
+    """ Operate upon NumPy arrays, with loops compiled by Numba. """
+
+    def states(self, pins, positions, n):
+        np = self.np
+
+        cams = np.asarray([bit for rotor in pins for bit in rotor], np.uint8)
+        offsets = np.asarray(
+            list(accumulate((len(rotor) for rotor in pins), initial=0)),
+            dtype=np.intp,
+        )
+        starts = np.asarray(positions, dtype=np.intp)
+
+        out = np.empty(n, dtype=np.uint8)
+        self._states(cams, offsets, starts, out)
+        return out.tolist()
+
+    def keystream(self, chi, psi, advances):
+        np = self.np
+
+        chi = np.asarray(chi, dtype=np.uint8)
+        psi = np.asarray(psi, dtype=np.uint8)
+        index = np.asarray(advances[: len(chi)], dtype=np.intp)
+
+        out = np.empty(len(chi), dtype=np.uint8)
+        self._keystream(chi, psi, index, out)
+        return out.tolist()
+
+    def __init__(self):
+        super().__init__()
+
+        import numba
+
+        @numba.njit
+        def states(cams, offsets, starts, out):
+            for t in range(out.shape[0]):
+                state = 0
+                for r in range(offsets.shape[0] - 1):
+                    size = offsets[r + 1] - offsets[r]
+                    bit = cams[offsets[r] + (starts[r] + t) % size]
+                    state = (state << 1) | bit
+                out[t] = state
+
+        @numba.njit
+        def keystream(chi, psi, index, out):
+            for t in range(out.shape[0]):
+                out[t] = chi[t] ^ psi[index[t]]
+
+        self._states = states
+        self._keystream = keystream
+
+
+def self_test(backend):
+    """Check a backend against the reference implementation, raising a
+    RuntimeError if they disagree.
+    """
+
+    reference = PythonBackend()
+    rng = random.Random(0)
+
+    pins = [[rng.getrandbits(1) for _ in range(size)] for size in [41, 31, 23]]
+    positions = [rng.randrange(len(cams)) for cams in pins]
+    stream = [rng.randrange(32) for _ in range(500)]
+    advances = list(
+        accumulate((rng.getrandbits(1) for _ in range(500)), initial=0)
+    )
+    values = [rng.getrandbits(200) for _ in range(50)]
+
+    chi = reference.states(pins, positions, 500)
+    psi = reference.states(pins[::-1], positions[::-1], advances[-1] + 1)
+    key = reference.keystream(chi, psi, advances)
+
+    checks = [
+        ("states", (pins, positions, 500), chi),
+        ("states", (pins, positions, 0), []),
+        ("keystream", (chi, psi, advances), key),
+        ("add", (stream, key), reference.add(stream, key)),
+        ("crosses", (values[0], values), reference.crosses(values[0], values)),
+    ]
+
+    for method, args, expected in checks:
+        if getattr(backend, method)(*args) != expected:
+            raise RuntimeError(
+                f"backend {backend.name!r} failed its self-test ({method})."
+            )
+
+
+def select(name):
+    """Return the backend with the given name, creating (and testing) it on
+    first use.
+    """
+
+    if name not in BACKENDS:
+        raise ValueError(f"unknown backend {name!r}.")
+
+    if name not in _SELECTED:
+        try:
+            backend = BACKENDS[name]()
+        except ImportError as e:
+            raise RuntimeError(f"backend {name!r} is unavailable ({e}).")
+
+        self_test(backend)
+        _SELECTED[name] = backend
+
+    return _SELECTED[name]
+
+
+def available():
+    """ Return the names of the backends that are usable here. """
+    names = []
+    for name in BACKENDS:
+        try:
+            select(name)
+        except RuntimeError:
+            continue
+        names.append(name)
+
+    return names
+
+
+def default():
+    """Return the default backend: that named by the `LORENZ_BACKEND`
+    environment variable, or otherwise the fastest one available.
+    """
+
+    global _DEFAULT
+
+    if _DEFAULT is None:
+        name = os.environ.get("LORENZ_BACKEND")
+        if name:
+            select(name)
+            _DEFAULT = name
+        else:
+            try:
+                select("numba")
+                _DEFAULT = "numba"
+            except RuntimeError as e:
+                if "unavailable" not in str(e):
+                    warnings.warn(f"{e} Falling back to 'python'.")
+                _DEFAULT = "python"
+
+    return select(_DEFAULT)
+
+
+def get(backend=None):
+    """Resolve a backend argument: None (for the default backend), the name
+    of a backend, or a backend itself.
+    """
+
+    if backend is None:
+        return default()
+
+    if isinstance(backend, str):
+        return select(backend)
+
+    return backend
+
+
+def use(name):
+    """ Change the default backend. """
+    global _DEFAULT
+
+    select(name)
+    _DEFAULT = name
+
+
+# Choose (and self-test) the default backend at startup.
+default()
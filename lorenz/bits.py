@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# bits.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+""" Helpers for handling streams of bits packed into Python integers.
+
+A list of bits is packed least-significant-bit first; that is, the bit at
+index `t` of the list becomes the bit with value `2 ** t` in the integer. Python
+integers are arbitrarily wide, so a single integer can hold the impulses of an
+entire message and be operated upon with the native bitwise operators.
+"""
+try:
+    popcount = int.bit_count
+except AttributeError:  # Python < 3.10
+
+    def popcount(x):
+        """ Count the number of set bits in a non-negative integer. """
+        return bin(x).count("1")
+
+
+def pack(bits):
+    """ Pack a list of zeroes and ones into an integer. """
+    if not bits:
+        return 0
+
+    return int("".join(map(str, reversed(bits))), 2)
+
+
+def unpack(x, n):
+    """ Unpack the lowest `n` bits of an integer into a list. """
+    if n <= 0:
+        return []
+
+    digits = bin(x & ((1 << n) - 1))[2:].zfill(n)
+    return list(map(int, reversed(digits)))
+
+
+def mask(n):
+    """ Return an integer with the lowest `n` bits set. """
+    return (1 << n) - 1
+
+
+# The five-bit binary representation of every word, most significant first.
+_WORDS = [format(word, "05b") for word in range(32)]
+
+
+class BitPlaneStream:
+    """Represent a stream of five-bit words as five packed bit-planes, one
+    for each impulse.
+
+    Impulses are numbered from 1 to 5, impulse 1 being the most significant
+    bit of each word (the convention used by `RotorSet.state()` and the ITA2
+    encoding of `Teleprinter`.) Bit `t` of the plane of an impulse gives that
+    impulse of the word at index `t` of the stream.
+    """
+
+    def impulse(self, i):
+        """ Return the packed plane of impulse `i`. """
+        if not 1 <= i <= 5:
+            raise ValueError(f"illegal impulse {i}.")
+
+        return self.planes[i - 1]
+
+    def combine(self, *impulses):
+        """Return the packed sum (XOR) of the given impulses, or of all five
+        if none are given.
+        """
+
+        combined = 0
+        for i in impulses or range(1, 6):
+            combined ^= self.impulse(i)
+        return combined
+
+    def crosses(self, *impulses):
+        """Count the positions at which the sum of the given impulses is a
+        cross.
+        """
+
+        return popcount(self.combine(*impulses))
+
+    def dots(self, *impulses):
+        """Count the positions at which the sum of the given impulses is a
+        dot.
+        """
+
+        return self.length - self.crosses(*impulses)
+
+    def agreement(self, other, *impulses):
+        """Count the positions at which the sum of the given impulses of this
+        stream agrees with that of another.
+        """
+
+        length = min(self.length, other.length)
+        combined = self.combine(*impulses) ^ other.combine(*impulses)
+        return length - popcount(combined & mask(length))
+
+    def delta(self):
+        """Return the delta of the stream; that is, the sum of each word with
+        the word that follows it.
+        """
+
+        if self.length < 2:
+            return BitPlaneStream([0] * 5, 0)
+
+        window = mask(self.length - 1)
+        return BitPlaneStream(
+            [(plane ^ (plane >> 1)) & window for plane in self.planes],
+            self.length - 1,
+        )
+
+    def shift(self, k):
+        """ Return the stream with its first `k` words removed. """
+        if k < 0:
+            raise ValueError(f"cannot shift by a negative offset {k}.")
+
+        k = min(k, self.length)
+        return BitPlaneStream(
+            [plane >> k for plane in self.planes], self.length - k
+        )
+
+    def truncate(self, n):
+        """ Return the first `n` words of the stream. """
+        n = max(0, min(n, self.length))
+        return BitPlaneStream([plane & mask(n) for plane in self.planes], n)
+
+    def to_stream(self):
+        """ Unpack the stream into a list of five-bit integers. """
+        if self.length == 0:
+            return []
+
+        digits = [
+            bin(plane | (1 << self.length))[:2:-1] for plane in self.planes
+        ]
+        return list(map(int, map("".join, zip(*digits)), [2] * self.length))
+
+    @classmethod
+    def from_stream(cls, stream):
+        """ Pack a list of five-bit integers into a BitPlaneStream. """
+        if any((word < 0) or (word >= 32) for word in stream):
+            raise RuntimeError("illegal byte in stream")
+
+        digits = "".join(map(_WORDS.__getitem__, stream))
+        return cls(
+            [int(digits[i::5][::-1] or "0", 2) for i in range(5)], len(stream)
+        )
+
+    @classmethod
+    def from_rotors(cls, rotors, n):
+        """Return the states of a five-rotor RotorSet at each of its next `n`
+        positions, without stepping it.
+        """
+
+        if len(rotors.rotors) != 5:
+            raise ValueError("a five-rotor RotorSet is required.")
+
+        return cls(
+            [wheel(rotor.pins, rotor.position, n) for rotor in rotors.rotors],
+            n,
+        )
+
+    def __xor__(self, other):
+        length = min(self.length, other.length)
+        window = mask(length)
+        return BitPlaneStream(
+            [(a ^ b) & window for a, b in zip(self.planes, other.planes)],
+            length,
+        )
+
+    def __len__(self):
+        return self.length
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, BitPlaneStream)
+            and self.length == other.length
+            and self.planes == other.planes
+        )
+
+    def __repr__(self):
+        return f"BitPlaneStream(length={self.length})"
+
+    def __init__(self, planes, length):
+        """Create a BitPlaneStream.
+
+        planes
+            A list of five integers, giving the packed planes of impulses 1
+            through 5.
+
+        length
+            The number of words in the stream. Bits of the planes beyond this
+            length are discarded.
+        """
+
+        if len(planes) != 5:
+            raise ValueError("a BitPlaneStream must have five planes.")
+
+        self.length = length
+        self.planes = [plane & mask(length) for plane in planes]
+
+
+def wheel(pins, start, n):
+    """Pack the stream produced by a rotor with the given cams over `n` steps
+    from position `start`.
+    """
+
+    size = len(pins)
+    start %= size
+
+    digits = "".join(map(str, pins[start:] + pins[:start]))
+    return int((digits * -(-n // size))[:n][::-1] or "0", 2)
@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# bitslice.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+""" A bitsliced implementation of the Lorenz SZ-40 machine.
+
+`BitslicedSZ40` emulates many machines sharing the same cam patterns, but with
+different start positions ("lanes"), simultaneously. The key of every lane is
+produced in one pass, as a time-major matrix of bytes (row t holding the key
+of every lane at step t), without stepping any rotor character by character:
+
+    - each rotor's cams are weighted by their impulse and repeated into a
+      byte string once, and the stream of a lane is a slice of it, so the
+      Chi (and Psi) words of a lane are the OR of five slices, computed as
+      integers;
+    - the motor is followed along its precomputed cycle (see
+      `lorenz.schedule`); the number of Psi advances before every step is a
+      slice of one prefix sum per cycle, shared by every lane on the cycle;
+    - the lanes that share a motor start share that slice, and their Psi
+      words are gathered for all of them at once, a row at a time.
+
+`.slices()` transposes the matrix into one lane mask per impulse and step, in
+which bit l gives the key impulse produced by the machine in lane l.
+"""
+from itertools import accumulate
+
+from lorenz.schedule import MotorSchedule
+
+# The key is produced at most this many steps at a time by `.slices()`, so as
+# to keep memory usage bounded.
+BLOCK = 4096
+
+# Translation tables from a five-bit word to the ASCII digit of each impulse,
+# the first being the most significant impulse.
+_DIGITS = [
+    bytes(
+        ord("1") if word & (1 << (4 - i)) else ord("0") for word in range(256)
+    )
+    for i in range(5)
+]
+
+
+def _wheels(rotors, n):
+    """Return, for each rotor, its cams weighted by their impulse (as in
+    `RotorSet.state()`) and repeated to cover `n` steps from any start.
+    """
+
+    tables = []
+    for i, pins in enumerate(rotors):
+        weighted = bytes(pin << (len(rotors) - 1 - i) for pin in pins)
+        tables.append(weighted * (-(-(len(pins) + n) // len(pins))))
+    return tables
+
+
+def _words(tables, starts, n):
+    """ Return the words of a rotor set over `n` steps, as an integer. """
+    words = 0
+    for table, start in zip(tables, starts):
+        words |= int.from_bytes(table[start : start + n], "little")
+    return words
+
+
+class BitslicedSZ40:
+    """ Emulate many Lorenz SZ-40 machines, with a shared set of cams. """
+
+    def slices(self, n):
+        """Generate the key for the next `n` characters, stepping every lane
+        `n` positions forward.
+
+        Each item is a tuple of five lane masks, one for each impulse (the
+        first being the most significant impulse of the key), in which bit l
+        gives the key impulse produced by the machine in lane l.
+        """
+
+        width = self.lanes
+        while n > 0:
+            k = min(n, BLOCK)
+            matrix = self._matrix(k)
+
+            # The columns of the matrix are held highest lane first, so that
+            # each row of digits reads as a binary lane mask.
+            impulses = []
+            for digits in _DIGITS:
+                text = matrix.translate(digits)
+                impulses.append(
+                    [
+                        int(text[i : i + width], 2)
+                        for i in range(0, len(text), width)
+                    ]
+                )
+
+            yield from zip(*impulses)
+            n -= k
+
+    def keystreams(self, n):
+        """Return the key for the next `n` characters of every lane, as a list
+        (indexed by lane) of lists of five-bit integers.
+        """
+
+        matrix = self._matrix(n)
+
+        width = self.lanes
+        return [
+            list(matrix[width - 1 - lane :: width]) for lane in range(width)
+        ]
+
+    def feed(self, streams):
+        """Feed one stream of information into each lane, returning the
+        output of each lane.
+
+        Streams shorter than the longest are padded for the purpose of
+        stepping the machines, but their outputs are not.
+        """
+
+        if len(streams) != self.lanes:
+            raise ValueError("mismatched streams and lanes.")
+
+        for stream in streams:
+            if any(
+                (type(word) is not int) or (word < 0) or (word >= 32)
+                for word in stream
+            ):
+                raise RuntimeError("illegal word in stream.")
+
+        matrix = self._matrix(max(map(len, streams), default=0))
+
+        width = self.lanes
+        outputs = []
+        for lane, stream in enumerate(streams):
+            n = len(stream)
+            key = matrix[width - 1 - lane :: width][:n]
+            words = int.from_bytes(bytes(stream), "little")
+            words ^= int.from_bytes(key, "little")
+            outputs.append(list(words.to_bytes(n, "little")))
+
+        return outputs
+
+    def _matrix(self, n):
+        """Return the key for the next `n` characters as a time-major matrix
+        of bytes (row t holding the key of every lane at step t, highest lane
+        first), stepping every lane `n` positions forward.
+        """
+
+        width = self.lanes
+        matrix = bytearray(n * width)
+        if n == 0:
+            return matrix
+
+        chi = _wheels(self._rotors["chi"], n)
+
+        # Lanes sharing a motor start share its schedule.
+        groups = {}
+        for lane, position in enumerate(self.positions):
+            groups.setdefault(tuple(position["mu"]), []).append(lane)
+
+        cycles = {}
+        for motor, lanes in groups.items():
+            schedule = MotorSchedule(self._rotors["mu"], motor)
+            cycle, index = schedule.cycle, schedule.index
+
+            # The number of Psi advances before each step of the cycle (and
+            # beyond it, far enough that any `n` steps are covered), and the
+            # Psi wheels repeated to cover as many advances.
+            if id(cycle) not in cycles:
+                prefix = list(
+                    accumulate(cycle.stream(0, cycle.period + n), initial=0)
+                )
+                cycles[id(cycle)] = (
+                    prefix,
+                    _wheels(self._rotors["psi"], prefix[-1] + 1),
+                )
+            prefix, psi = cycles[id(cycle)]
+
+            base = prefix[index]
+            advances = prefix[index : index + n]
+            total = prefix[index + n] - base
+
+            # The Psi words of each lane, indexed by the prefix sum itself
+            # rather than by the advances since `index`.
+            span = prefix[index + n - 1] + 1
+            columns = []
+            for lane in lanes:
+                starts = [
+                    (start - base) % len(pins)
+                    for start, pins in zip(
+                        self.positions[lane]["psi"], self._rotors["psi"]
+                    )
+                ]
+                columns.append(
+                    _words(psi, starts, span).to_bytes(span, "little")
+                )
+
+            if len(lanes) == 1:
+                keys = [bytes(map(columns[0].__getitem__, advances))]
+            else:
+                # Gather the Psi words of every lane in the group, a row of
+                # the group at a time.
+                g = len(lanes)
+                interleaved = bytearray(span * g)
+                for j, column in enumerate(columns):
+                    interleaved[j::g] = column
+                rows = [interleaved[a * g : (a + 1) * g] for a in range(span)]
+                gathered = b"".join(map(rows.__getitem__, advances))
+                keys = [gathered[j::g] for j in range(g)]
+
+            for lane, key in zip(lanes, keys):
+                position = self.positions[lane]
+                words = _words(chi, position["chi"], n)
+                words ^= int.from_bytes(key, "little")
+                matrix[width - 1 - lane :: width] = words.to_bytes(n, "little")
+
+                position["chi"] = [
+                    (start + n) % len(pins)
+                    for start, pins in zip(
+                        position["chi"], self._rotors["chi"]
+                    )
+                ]
+                position["psi"] = [
+                    (start + total) % len(pins)
+                    for start, pins in zip(
+                        position["psi"], self._rotors["psi"]
+                    )
+                ]
+                position["mu"] = schedule.positions(n)
+
+        return matrix
+
+    def __init__(self, rotors, positions):
+        """Create a set of bitsliced Lorenz SZ-40 machines.
+
+        rotors
+            Specify the rotor settings shared by every lane, as for
+            `SZ40.__init__()`.
+
+        positions
+            Specify the initial rotor positions of each lane, as a list of
+            dictionaries with three keys: `chi`, `psi`, and `mu`.
+        """
+
+        if not positions:
+            raise ValueError("at least one lane is required.")
+
+        for group in ["chi", "psi", "mu"]:
+            for lane in positions:
+                if len(lane[group]) != len(rotors[group]):
+                    raise ValueError("mismatched rotors and positions")
+
+                for pins, position in zip(rotors[group], lane[group]):
+                    if (position < 0) or (position >= len(pins)):
+                        raise ValueError(
+                            f"illegal rotor start position {position}."
+                        )
+
+        self.lanes = len(positions)
+        self.positions = [
+            {group: list(lane[group]) for group in ["chi", "psi", "mu"]}
+            for lane in positions
+        ]
+
+        self._rotors = {
+            group: [list(pins) for pins in rotors[group]]
+            for group in ["chi", "psi", "mu"]
+        }
@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# cache.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+""" Caches artifacts derived from a set of cam patterns on disk, so that they
+are derived once rather than on every run.
+
+Artifacts are raw files, addressed by a hash of the cams from which they were
+derived (see `key()`) and a name, beneath a directory for each version of the
+cache's layout:
+
+    <directory>/v2/<key[:2]>/<key>/<name>
+
+Files are written atomically, so any number of processes may share a cache, and
+are memory-mapped when read. The cache is kept within a size limit by deleting
+the least recently used artifacts (and those of other versions) first; to spare
+walking the whole cache on every write, it is only trimmed once the artifacts
+written since it was last measured might have taken it over the limit.
+
+The cache directory is, by default, `$LORENZ_CACHE`, or else `lorenz` within
+the user's cache directory.
+"""
+import functools
+import mmap
+import os
+import re
+import shutil
+
+from lorenz.bits import mask
+from lorenz.bits import wheel
+from lorenz.checkpoint import fingerprint
+
+VERSION = 2
+
+# The default size limit of a cache, in bytes.
+LIMIT = 256 * 2**20
+
+
+def key(cams):
+    """Return a hash identifying a set of cam patterns, given as a dictionary
+    (such as `KH_CAMS`) or a list of lists of bits.
+
+    The hash depends only upon the bits, so cams held in lists, `bytes` or
+    shared memory (see `lorenz.shared`) hash alike, in every process.
+    """
+
+    if isinstance(cams, dict):
+        return fingerprint(
+            sorted((group, key(rotors)) for group, rotors in cams.items())
+        )
+    return fingerprint([bytes(pins) for pins in cams])
+
+
+def default_directory():
+    """ Return the default directory of the cache. """
+    if os.environ.get("LORENZ_CACHE"):
+        return os.environ["LORENZ_CACHE"]
+
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "lorenz")
+
+
+class ArtifactCache:
+    """ A directory of artifacts, addressed by the hash of their cams. """
+
+    def path(self, key, name):
+        """ Return the path of an artifact. """
+        if not name or os.sep in name or name.startswith("."):
+            raise ValueError(f"illegal artifact name {name!r}.")
+
+        return os.path.join(self.root, key[:2], key, name)
+
+    def get(self, key, name):
+        """Return an artifact as a read-only buffer (memory-mapped, unless it
+        is empty), or None if it is not cached. Reading an artifact marks it
+        as recently used.
+
+        The buffer should be closed once it has been read, for example by
+        using it as a context manager.
+        """
+
+        path = self.path(key, name)
+        try:
+            with open(path, "rb") as fh:
+                os.utime(path)
+                if os.fstat(fh.fileno()).st_size == 0:
+                    return memoryview(b"")
+                return mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, name, data):
+        """Store an artifact, then trim the cache to its limit if it might
+        have exceeded it.
+        """
+
+        path = self.path(key, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as fh:
+            fh.write(data)
+        os.replace(temporary, path)
+
+        if self._used is None:
+            self._used = self.size()
+        else:
+            self._used += len(data)
+
+        if self._used > self.limit:
+            self.cleanup()
+
+    def load(self, key, name, build):
+        """Return an artifact as for `get()`, calling `build()` to derive (and
+        store) it if it is not cached.
+        """
+
+        data = self.get(key, name)
+        if data is None:
+            data = build()
+            self.put(key, name, data)
+            data = memoryview(data).toreadonly()
+        return data
+
+    def size(self):
+        """ Return the total size of the artifacts of this version. """
+        return sum(size for _, size, _ in self._artifacts())
+
+    def cleanup(self, limit=None):
+        """Delete the artifacts of other versions, then the least recently used
+        artifacts until the cache is within its limit (or the given one.)
+        """
+
+        limit = self.limit if limit is None else limit
+
+        for entry in os.listdir(self.directory):
+            path = os.path.join(self.directory, entry)
+            if entry != f"v{VERSION}" and re.fullmatch(r"v[0-9]+", entry):
+                shutil.rmtree(path, ignore_errors=True)
+
+        artifacts = sorted(self._artifacts())
+        total = sum(size for _, size, _ in artifacts)
+        for _, size, path in artifacts:
+            if total <= limit:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+            # Remove the directories left empty.
+            for directory in [
+                os.path.dirname(path),
+                os.path.dirname(os.path.dirname(path)),
+            ]:
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    break
+
+        self._used = total
+
+    def clear(self):
+        """ Delete every artifact. """
+        shutil.rmtree(self.root, ignore_errors=True)
+        os.makedirs(self.root, exist_ok=True)
+        self._used = 0
+
+    def _artifacts(self):
+        """ Yield the (last use, size, path) of each artifact. """
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith(".tmp"):
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield (stat.st_mtime_ns, stat.st_size, path)
+
+    def __init__(self, directory=None, limit=LIMIT):
+        """Open (or create) a cache.
+
+        directory
+            The directory of the cache; see `default_directory()`.
+
+        limit
+            The greatest total size of the cache, in bytes.
+        """
+
+        self.directory = os.fspath(directory or default_directory())
+        self.root = os.path.join(self.directory, f"v{VERSION}")
+        self.limit = limit
+
+        # The size of the cache when it was last measured, plus that of the
+        # artifacts written since; it is first measured on the first write.
+        self._used = None
+
+        os.makedirs(self.root, exist_ok=True)
+
+
+def delta_rows(pins):
+    """Return the delta stream of a rotor with the given cams from each of its
+    starts, over `8 * len(pins)` steps (a whole number of bytes, and of
+    revolutions), packed into `len(pins)` little-endian bytes per start.
+
+    Since each row spans whole revolutions, the delta stream from a start
+    over any number of steps is its row, repeated.
+    """
+
+    size = len(pins)
+    return b"".join(
+        ((stream ^ (stream >> 1)) & mask(8 * size)).to_bytes(size, "little")
+        for stream in (wheel(pins, s, 8 * size + 1) for s in range(size))
+    )
+
+
+# The rows of the rotors most recently searched without a cache are also kept
+# in memory, as a search derives windows of several lengths from them.
+_delta_rows = functools.lru_cache(maxsize=64)(delta_rows)
+
+
+def delta_tables(pins, n, cache=None):
+    """Return, for each of the given cam patterns, the first `n` characters of
+    its packed delta stream from each of its starts. These are the windows
+    of `ChiSearch`.
+
+    If a cache is given, the rows of each rotor (see `delta_rows()`), which
+    do not depend upon `n`, are stored in it, keyed by that rotor's cams
+    alone, and the windows are read from their memory-mapped rows.
+    """
+
+    tables = []
+    for p in pins:
+        size = len(p)
+
+        if cache is None:
+            rows = memoryview(_delta_rows(tuple(p)))
+        else:
+            rows = cache.load(key([p]), "chi-delta", lambda: delta_rows(p))
+
+        with rows:
+            repeats = -(-n // (8 * size))
+            tables.append(
+                [
+                    int.from_bytes(
+                        bytes(rows[i : i + size]) * repeats, "little"
+                    )
+                    & mask(n)
+                    for i in range(0, size * size, size)
+                ]
+            )
+
+    return tables
@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# candidates.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+""" Stores very many candidate settings compactly.
+
+A candidate is the positions of the twelve rotors (in the order Chi 1-5, Psi
+1-5, Mu 61, Mu 37) and a score. A `CandidateStore` keeps the positions as
+unsigned bytes and the scores as single-precision floats, in flat arrays, so
+each candidate costs 16 bytes rather than the hundreds taken by a tuple or an
+`SZ40`. (Scores are therefore rounded to single precision.)
+
+Once a store holds more candidates than its capacity, they are sorted by score
+and "spilled" to a shard on disk; each shard is a file of fixed-size records,
+best first. Reading the store merges the shards (and those written by other
+stores, perhaps in other processes; see `write()` and `merge()`) lazily, so
+the whole set is never held in memory at once.
+"""
+import heapq
+import os
+import struct
+import tempfile
+from array import array
+from collections import namedtuple
+from itertools import islice
+
+# Each rotor's position, and the score.
+Candidate = namedtuple("Candidate", ["positions", "score"])
+
+WIDTH = 12
+
+# Records are read from shards this many at a time.
+BLOCK = 4096
+
+
+def _record(width):
+    return struct.Struct(f"<{width}sf")
+
+
+def read(path, width=WIDTH):
+    """ Yield the candidates of a shard, best first. """
+    record = _record(width)
+    with open(path, "rb") as fh:
+        while True:
+            data = fh.read(record.size * BLOCK)
+            if not data:
+                return
+            for positions, score in record.iter_unpack(data):
+                yield Candidate(tuple(positions), score)
+
+
+def merge(shards, width=WIDTH, unique=False):
+    """Merge shards (each a path, or an iterable of candidates, best first)
+    into a single stream of candidates, best first. If `unique`, only the
+    best-scoring occurrence of any positions is kept; this holds the
+    positions already seen in memory.
+    """
+
+    streams = [
+        read(shard, width) if isinstance(shard, (str, os.PathLike)) else shard
+        for shard in shards
+    ]
+    merged = heapq.merge(*streams, key=lambda candidate: -candidate.score)
+
+    if not unique:
+        yield from merged
+        return
+
+    seen = set()
+    for candidate in merged:
+        if candidate.positions not in seen:
+            seen.add(candidate.positions)
+            yield candidate
+
+
+class CandidateStore:
+    """ A compact, spillable collection of scored candidate settings. """
+
+    def add(self, positions, score):
+        """ Add a candidate. """
+        positions = bytes(positions)
+        if len(positions) != self.width:
+            raise ValueError(
+                f"expected {self.width} positions, got {len(positions)}."
+            )
+
+        self._positions.frombytes(positions)
+        self._scores.append(score)
+
+        if len(self._scores) >= self.capacity:
+            self.spill()
+
+    def extend(self, candidates):
+        """ Add many (positions, score) pairs. """
+        for positions, score in candidates:
+            self.add(positions, score)
+
+    def top(self, k, unique=False):
+        """ Return the `k` best candidates, best first. """
+        if self.shards or unique:
+            return list(islice(self.merged(unique), k))
+
+        # Everything is in memory, so there is no need to sort it all.
+        best = heapq.nlargest(
+            k, range(len(self._scores)), key=self._scores.__getitem__
+        )
+        return [Candidate(tuple(self._key(i)), self._scores[i]) for i in best]
+
+    def merged(self, unique=False):
+        """Yield every candidate, best first; see `merge()`. Candidates held in
+        memory are sorted first.
+        """
+
+        self._sort()
+        return merge(
+            self.shards + [self._iterate()], self.width, unique=unique
+        )
+
+    def dedup(self):
+        """Drop the candidates held in memory whose positions are shared with
+        a better-scoring candidate held in memory.
+        """
+
+        self._sort()
+        seen = set()
+        keep = []
+        for i in range(len(self._scores)):
+            key = self._key(i)
+            if key not in seen:
+                seen.add(key)
+                keep.append(i)
+        self._select(keep)
+
+    def spill(self):
+        """ Write the candidates held in memory to a new shard. """
+        if not self._scores:
+            return
+
+        if self.directory is None:
+            self._temporary = tempfile.TemporaryDirectory()
+            self.directory = self._temporary.name
+
+        path = os.path.join(
+            self.directory, f"{self.prefix}-{len(self._spilled):06d}.shard"
+        )
+        self.write(path)
+        self.shards.append(path)
+        self._spilled.append(path)
+
+        self._positions = array("B")
+        self._scores = array("f")
+        self._sorted = 0
+
+    def write(self, path):
+        """Write the candidates held in memory to a shard at the given path,
+        best first. The candidates are kept.
+        """
+
+        self._sort()
+        record = _record(self.width)
+        with open(path, "wb") as fh:
+            for start in range(0, len(self._scores), BLOCK):
+                fh.write(
+                    b"".join(
+                        record.pack(self._key(i), self._scores[i])
+                        for i in range(
+                            start, min(start + BLOCK, len(self._scores))
+                        )
+                    )
+                )
+
+    def close(self):
+        """ Delete the shards spilled by this store. """
+        for path in self._spilled:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self.shards = [p for p in self.shards if p not in self._spilled]
+        self._spilled = []
+
+        if self._temporary is not None:
+            self._temporary.cleanup()
+            self._temporary = None
+            self.directory = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        """ Count the candidates, in memory and on disk. """
+        record = _record(self.width)
+        return len(self._scores) + sum(
+            os.path.getsize(path) // record.size for path in self.shards
+        )
+
+    def _key(self, i):
+        return self._positions[i * self.width : (i + 1) * self.width].tobytes()
+
+    def _iterate(self):
+        for i in range(len(self._scores)):
+            yield Candidate(tuple(self._key(i)), self._scores[i])
+
+    def _sort(self):
+        """ Sort the candidates held in memory, best first. """
+        if self._sorted == len(self._scores):
+            return
+
+        order = sorted(
+            range(len(self._scores)),
+            key=self._scores.__getitem__,
+            reverse=True,
+        )
+        self._select(order)
+
+    def _select(self, indices):
+        """ Keep only the candidates at the given indices, in that order. """
+        positions = array("B")
+        for i in indices:
+            positions.frombytes(self._key(i))
+
+        self._positions = positions
+        self._scores = array("f", map(self._scores.__getitem__, indices))
+        self._sorted = len(self._scores)
+
+    def __init__(
+        self, width=WIDTH, capacity=1_000_000, directory=None, shards=()
+    ):
+        """Create a CandidateStore.
+
+        width
+            The number of positions in each candidate.
+
+        capacity
+            The number of candidates held in memory before they are spilled.
+
+        directory
+            The directory to which shards are spilled; by default, a temporary
+            directory, deleted when the store is closed.
+
+        shards
+            Shards already written (by `write()`, perhaps by another store) to
+            be read as part of this store. They are not deleted on closing.
+        """
+
+        if width < 1:
+            raise ValueError(f"illegal width {width}.")
+        if capacity < 1:
+            raise ValueError(f"illegal capacity {capacity}.")
+
+        self.width = width
+        self.capacity = capacity
+
+        self._temporary = None
+        self.directory = directory and os.fspath(directory)
+        self.prefix = f"candidates-{os.getpid()}-{id(self):x}"
+
+        self.shards = [os.fspath(path) for path in shards]
+        self._spilled = []
+
+        self._positions = array("B")
+        self._scores = array("f")
+
+        # The number of candidates held in memory when they were last sorted.
+        self._sorted = 0
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# checkpoint.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+""" Saves the progress of long-running searches, so that they can resume
+after being interrupted.
+
+A `Checkpointer` periodically writes the state of a search (as JSON) to a
+file, replacing the previous checkpoint atomically, so that a crash while
+writing never leaves a corrupt checkpoint behind. Each checkpoint records a
+fingerprint of the search that wrote it (the ciphertext, the patterns and the
+parameters), and a checkpoint is only resumed by an identical search.
+"""
+import hashlib
+import json
+import os
+import time
+from collections.abc import Mapping
+from collections.abc import Sequence
+
+VERSION = 2
+
+
+def _digest(h, part):
+    """Feed a part of a search's inputs to a hash, tagged with its type and
+    length, so that different parts never feed the same bytes.
+
+    Integers are fed as bytes, since `repr()` refuses (and is slow on) the
+    integers holding long bit-packed streams. Other sequences than `bytes`
+    are fed item by item, so that (say) a list and a `SharedPins` holding the
+    same cams hash alike.
+    """
+
+    if part is None or isinstance(part, bool):
+        h.update(b"C" + repr(part).encode())
+    elif isinstance(part, int):
+        data = part.to_bytes(part.bit_length() // 8 + 1, "little", signed=True)
+        h.update(b"I%d:" % len(data) + data)
+    elif isinstance(part, float):
+        h.update(b"F" + part.hex().encode())
+    elif isinstance(part, str):
+        data = part.encode()
+        h.update(b"S%d:" % len(data) + data)
+    elif isinstance(part, (bytes, bytearray, memoryview)):
+        data = bytes(part)
+        h.update(b"B%d:" % len(data) + data)
+    elif isinstance(part, Mapping):
+        h.update(b"M%d:" % len(part))
+        for key in sorted(part, key=repr):
+            _digest(h, key)
+            _digest(h, part[key])
+    elif isinstance(part, Sequence):
+        h.update(b"L%d:" % len(part))
+        for item in part:
+            _digest(h, item)
+    else:
+        raise TypeError(f"cannot fingerprint {type(part).__name__}.")
+
+
+def fingerprint(*parts):
+    """ Return a hash identifying a search by its inputs. """
+    h = hashlib.sha256()
+    _digest(h, parts)
+    return h.hexdigest()
+
+
+def rng_state(rng):
+    """ Return the state of a `random.Random`, in a form that JSON accepts. """
+    version, internal, gauss = rng.getstate()
+    return [version, list(internal), gauss]
+
+
+def set_rng_state(rng, state):
+    """ Restore the state of a `random.Random` saved by `rng_state()`. """
+    version, internal, gauss = state
+    rng.setstate((version, tuple(internal), gauss))
+
+
+class Checkpointer:
+    """ Write and read the checkpoints of a single search. """
+
+    def due(self):
+        """ Decide whether a checkpoint should be written now. """
+        return time.monotonic() - self._written >= self.every
+
+    def save(self, state):
+        """ Write a checkpoint of the given (JSON-serializable) state. """
+        data = {"version": VERSION, "key": self.key, "state": state}
+
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as fh:
+            json.dump(data, fh, separators=(",", ":"))
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(temporary, self.path)
+
+        self._written = time.monotonic()
+        self.saves += 1
+
+    def load(self):
+        """Return the state of the last checkpoint, or None if there is none.
+        A checkpoint written by a different search raises a ValueError.
+        """
+
+        if not os.path.exists(self.path):
+            return None
+
+        with open(self.path) as fh:
+            data = json.load(fh)
+
+        if data.get("version") != VERSION or data.get("key") != self.key:
+            raise ValueError(
+                f"checkpoint {self.path} belongs to a different search."
+            )
+
+        return data["state"]
+
+    def __init__(self, path, key, every=60.0):
+        """Create a Checkpointer.
+
+        path
+            The file to which checkpoints are written.
+
+        key
+            The fingerprint of the search.
+
+        every
+            The least number of seconds between checkpoints.
+        """
+
+        self.path = os.fspath(path)
+        self.key = key
+        self.every = every
+
+        # The number of checkpoints written.
+        self.saves = 0
+
+        self._written = time.monotonic()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# colossus.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+""" Emulates the counting of the Colossus, programmed by boolean expressions.
+
+On Colossus, a "run" was set up on the plug panel and switches: a boolean
+function of the streams read from the tape and generated from the wheel
+patterns, counted over the whole message, for every setting of the wheels
+being stepped. Counts exceeding a "set total" were printed.
+
+Here, a run is an expression over the streams
+
+    Z1 .. Z5    the impulses of the ciphertext
+    X1 .. X5    the streams of the Chi wheels
+    S1 .. S5    the streams of the Psi wheels (unextended; that is, as though
+                stepped at every character)
+
+and their deltas dZ1 .. dZ5, dX1 .. dX5 and dS1 .. dS5, combined with `^`,
+`&`, `|` and `~` (or `and`, `or` and `not`.) The expression is counted at each
+character where it is a cross; for example, the "1+2 break-in" counts the dots
+of dZ1 + dZ2 + dX1 + dX2 by running
+
+    colossus.run("~(dZ1 ^ dZ2 ^ dX1 ^ dX2)", loops=["X1", "X2"])
+
+Every stream is held bit-packed, so each setting costs a handful of operations
+on integers rather than a loop over the characters of the message.
+"""
+import ast
+import re
+from collections import namedtuple
+from itertools import product
+
+from lorenz.bits import BitPlaneStream
+from lorenz.bits import mask
+from lorenz.bits import popcount
+from lorenz.bits import wheel
+
+# The result of a run at one setting: the starts of the looped wheels (in the
+# order in which they were given), and the count.
+Count = namedtuple("Count", ["starts", "count"])
+
+_STREAM = re.compile(r"^(d?)([ZXS])([1-5])$")
+
+
+def _compile(expression):
+    """Compile an expression into a function of the full mask and the streams
+    it refers to, returning the function and the names of those streams.
+    """
+
+    names = []
+
+    def walk(node):
+        if isinstance(node, ast.BinOp):
+            ops = {ast.BitXor: "^", ast.BitAnd: "&", ast.BitOr: "|"}
+            if type(node.op) in ops:
+                op = ops[type(node.op)]
+                return f"({walk(node.left)} {op} {walk(node.right)})"
+        if isinstance(node, ast.BoolOp):
+            op = " & " if isinstance(node.op, ast.And) else " | "
+            return "(" + op.join(map(walk, node.values)) + ")"
+        if isinstance(node, ast.UnaryOp):
+            if isinstance(node.op, (ast.Invert, ast.Not)):
+                return f"(M ^ {walk(node.operand)})"
+        if isinstance(node, ast.Name) and _STREAM.match(node.id):
+            if node.id not in names:
+                names.append(node.id)
+            return f"v{names.index(node.id)}"
+        if isinstance(node, ast.Constant) and node.value in (0, 1):
+            return "M" if node.value else "0"
+        raise ValueError(f"illegal expression {expression!r}.")
+
+    try:
+        tree = ast.parse(expression, mode="eval")
+    except SyntaxError:
+        raise ValueError(f"illegal expression {expression!r}.")
+
+    body = walk(tree.body)
+    args = "".join(f", v{i}" for i in range(len(names)))
+
+    namespace = {}
+    exec(f"def run(M{args}):\n    return {body}\n", namespace)
+    return namespace["run"], names
+
+
+class Colossus:
+    """ A Colossus, loaded with a ciphertext and a set of wheel patterns. """
+
+    def count(self, expression, starts=None):
+        """Count the characters at which an expression is a cross, with the
+        wheels at the given starts.
+
+        starts
+            A dictionary mapping wheels ("X1", "S3", ...) to their starts; by
+            default, every wheel starts at zero.
+        """
+
+        function, names = self._function(expression)
+        starts = starts or {}
+        values = [
+            self._stream(name, starts.get(name[-2:], 0)) for name in names
+        ]
+        return popcount(function(self._mask, *values))
+
+    def run(self, expression, loops=(), starts=None, total=None, limit=None):
+        """Count an expression at every setting of the looped wheels,
+        returning the settings ranked by count, from greatest to least.
+
+        loops
+            The wheels ("X1", "S3", ...) to be stepped through all of their
+            starts. Looping over the first two Chi wheels counts 41 * 31
+            settings.
+
+        starts
+            A dictionary giving the (fixed) starts of any other wheels, which
+            otherwise start at zero.
+
+        total
+            If given, only the settings whose counts reach this "set total"
+            are returned.
+
+        limit
+            If given, only this many of the best settings are returned.
+        """
+
+        function, names = self._function(expression)
+        starts = starts or {}
+
+        loops = list(loops)
+        for rotor in loops:
+            if rotor not in self._pins:
+                raise ValueError(f"cannot loop over wheel {rotor!r}.")
+
+        if len(set(loops)) != len(loops):
+            raise ValueError("cannot loop over a wheel twice.")
+
+        # Each argument of the function is either fixed, or depends upon one
+        # of the looped wheels.
+        fixed = {}
+        looped = {}
+        for i, name in enumerate(names):
+            if name[-2:] in loops:
+                looped[i] = loops.index(name[-2:])
+            else:
+                fixed[i] = self._stream(name, starts.get(name[-2:], 0))
+
+        tables = {
+            i: [
+                self._stream(names[i], s)
+                for s in range(len(self._pins[loops[k]]))
+            ]
+            for i, k in looped.items()
+        }
+
+        values = [fixed.get(i) for i in range(len(names))]
+        counts = []
+        for setting in product(
+            *(range(len(self._pins[rotor])) for rotor in loops)
+        ):
+            for i, k in looped.items():
+                values[i] = tables[i][setting[k]]
+
+            count = popcount(function(self._mask, *values))
+            if total is None or count >= total:
+                counts.append(Count(setting, count))
+
+        counts.sort(key=lambda c: (-c.count, c.starts))
+        return counts[:limit] if limit is not None else counts
+
+    def _function(self, expression):
+        """ Return the compiled function of an expression, and its streams. """
+        if expression not in self._functions:
+            function, names = _compile(expression)
+            for name in names:
+                if name[-2:] not in self._pins and name[-2] != "Z":
+                    raise ValueError(f"no pattern for the wheel of {name!r}.")
+                if name[0] == "d" and not self.delta:
+                    raise ValueError(f"delta stream {name!r} is not counted.")
+            self._functions[expression] = (function, names)
+
+        return self._functions[expression]
+
+    def _stream(self, name, start):
+        """ Return the packed stream of the given name, from a start. """
+        key = (name, start)
+        if key not in self._streams:
+            delta, kind, i = _STREAM.match(name).groups()
+
+            if kind == "Z":
+                planes = self._deltas if delta else self._planes
+                stream = planes.impulse(int(i))
+            else:
+                stream = wheel(self._pins[kind + i], start, self.length + 1)
+                if delta:
+                    stream ^= stream >> 1
+
+            self._streams[key] = stream & self._mask
+
+        return self._streams[key]
+
+    def __init__(self, ciphertext, chi=None, psi=None, delta=True):
+        """Load a Colossus.
+
+        ciphertext
+            The ciphertext, as a list of five-bit integers.
+
+        chi, psi
+            The cam patterns of the Chi and Psi wheels, each as a list of five
+            lists of bits, if runs are to refer to them.
+
+        delta
+            If true (the default), runs are counted over one character fewer
+            than the length of the message, so that delta streams may be used.
+        """
+
+        if len(ciphertext) < 2:
+            raise ValueError("the ciphertext is too short to be counted.")
+
+        self.delta = delta
+        self.length = len(ciphertext) - (1 if delta else 0)
+
+        self._planes = BitPlaneStream.from_stream(ciphertext)
+        self._deltas = self._planes.delta()
+
+        self._pins = {}
+        for kind, patterns in [("X", chi), ("S", psi)]:
+            for i, pins in enumerate(patterns or [], start=1):
+                self._pins[f"{kind}{i}"] = pins
+
+        self._mask = mask(self.length)
+        self._streams = {}
+        self._functions = {}
@@ -0,0 +1,251 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# corpus.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+""" Generates synthetic traffic: messages of plaintext, enciphered on the SZ40
+with known cams and start positions, for benchmarking and for measuring how
+often the methods of analysis succeed.
+
+Records are written to a sequence of binary "shard" files, each of which is
+limited in size, so that a corpus of any size can be generated (and read back)
+without holding it in memory. Each record is laid out as
+
+    length      4 bytes, little-endian
+    cams        63 bytes, as packed by `lorenz.generate.pack()`
+    positions   12 bytes, one for each rotor (Chi, then Psi, then Mu)
+    plaintext   `length` bytes, one for each character
+    ciphertext  `length` bytes, one for each character
+"""
+import os
+import random
+import struct
+from collections import namedtuple
+
+from lorenz import generate
+from lorenz.language import LanguageModel
+from lorenz.machines import SZ40
+from lorenz.telegraphy import Teleprinter
+
+# A message, with the settings under which it was enciphered.
+Record = namedtuple("Record", ["plaintext", "cams", "positions", "ciphertext"])
+
+_LENGTH = struct.Struct("<I")
+_ROTORS = ["chi", "psi", "mu"]
+
+
+def encode(record):
+    """ Encode a Record as bytes. """
+    positions = [p for group in _ROTORS for p in record.positions[group]]
+    return b"".join(
+        [
+            _LENGTH.pack(len(record.plaintext)),
+            generate.pack(record.cams),
+            bytes(positions),
+            bytes(record.plaintext),
+            bytes(record.ciphertext),
+        ]
+    )
+
+
+def decode(data):
+    """ Decode a Record from bytes. """
+    (n,) = _LENGTH.unpack_from(data)
+    cams_at = _LENGTH.size
+    positions_at = cams_at + generate.record_size()
+    plaintext_at = positions_at + 12
+    ciphertext_at = plaintext_at + n
+
+    if len(data) != ciphertext_at + n:
+        raise ValueError("encoded record is of the wrong length.")
+
+    cams = generate.unpack(data[cams_at:positions_at])
+
+    positions = {}
+    i = positions_at
+    for group in _ROTORS:
+        k = len(cams[group])
+        positions[group] = list(data[i : i + k])
+        i += k
+
+    return Record(
+        list(data[plaintext_at:ciphertext_at]),
+        cams,
+        positions,
+        list(data[ciphertext_at:]),
+    )
+
+
+class CorpusGenerator:
+    """ Generate synthetic messages, reproducibly from a seed. """
+
+    def cams(self):
+        """ Choose a set of cams for the next message. """
+        if self.library is None:
+            return self.generator.cams()
+
+        return self.rng.choice(self.library)
+
+    def positions(self, cams):
+        """ Choose random start positions for a set of cams. """
+        return {
+            group: [self.rng.randrange(len(pins)) for pins in cams[group]]
+            for group in _ROTORS
+        }
+
+    def plaintext(self, n):
+        """ Produce `n` characters of plaintext. """
+        if self.text is None:
+            return self.model.sample(n, rng=self.rng)
+
+        # Take a slice of the text from a random offset, wrapping around.
+        start = self.rng.randrange(len(self.text))
+        repeats = (start + n) // len(self.text) + 1
+        return (self.text * repeats)[start : start + n]
+
+    def record(self):
+        """ Produce a single Record. """
+        lo, hi = self.length
+        plaintext = self.plaintext(self.rng.randint(lo, hi))
+        cams = self.cams()
+        positions = self.positions(cams)
+        ciphertext = SZ40(cams, positions=positions).feed(plaintext)
+
+        return Record(plaintext, cams, positions, ciphertext)
+
+    def records(self, n):
+        """ Generate `n` Records. """
+        for _ in range(n):
+            yield self.record()
+
+    def __init__(
+        self, seed=None, model=None, text=None, library=None, length=1000
+    ):
+        """Create a CorpusGenerator.
+
+        seed
+            The seed of the generator; generators with the same seed (and
+            otherwise the same arguments) produce the same corpus.
+
+        model
+            The LanguageModel from which plaintext is sampled. By default, a
+            model of English is used.
+
+        text
+            Alternatively, a body of text (as a string in Bletchley shiftless
+            notation, or a list of five-bit integers) from which the plaintext
+            is sliced.
+
+        library
+            A list (or dictionary) of sets of cams, such as those found in
+            `lorenz.patterns`, from which the cams of each message are chosen.
+            By default, random cams are generated.
+
+        length
+            The length of each message, either as an integer or as a (lo, hi)
+            pair, in which case lengths are chosen uniformly from that range.
+        """
+
+        self.rng = random.Random(seed)
+        self.model = model or LanguageModel.english()
+
+        if isinstance(text, str):
+            text = Teleprinter.encode(text)
+        if text is not None and not text:
+            raise ValueError("the text is empty.")
+        self.text = text
+
+        if isinstance(library, dict):
+            library = list(library.values())
+        if library is not None and not library:
+            raise ValueError("the library is empty.")
+        self.library = library
+
+        self.generator = generate.CamGenerator(seed=self.rng.getrandbits(64))
+
+        self.length = (length, length) if isinstance(length, int) else length
+        if not 0 <= self.length[0] <= self.length[1]:
+            raise ValueError(f"illegal length {length}.")
+
+
+class CorpusWriter:
+    """Write Records to a sequence of shard files, starting a new shard
+    whenever the current one would exceed the size limit.
+    """
+
+    def write(self, record):
+        """ Append a Record to the corpus. """
+        data = encode(record)
+
+        if self._fh is not None and self._size + len(data) > self.shard_size:
+            self._fh.close()
+            self._fh = None
+
+        if self._fh is None:
+            path = os.path.join(
+                self.directory, f"{self.prefix}-{len(self.paths):05d}.bin"
+            )
+            self._fh = open(path, "wb")
+            self._size = 0
+            self.paths.append(path)
+
+        self._fh.write(data)
+        self._size += len(data)
+        self.count += 1
+
+    def close(self):
+        """ Close the current shard. """
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __init__(self, directory, prefix="corpus", shard_size=64 * 2**20):
+        """Create a CorpusWriter.
+
+        directory
+            The directory in which shards are written; it is created if it
+            does not exist.
+
+        prefix
+            The prefix of the names of the shard files.
+
+        shard_size
+            The greatest size of a shard, in bytes. (A single record larger
+            than this is written to a shard of its own.)
+        """
+
+        os.makedirs(directory, exist_ok=True)
+
+        self.directory = directory
+        self.prefix = prefix
+        self.shard_size = shard_size
+
+        # The paths of the shards written so far, and the number of records.
+        self.paths = []
+        self.count = 0
+
+        self._fh = None
+        self._size = 0
+
+
+def read(paths):
+    """ Read Records from a sequence of shard files, in order. """
+    for path in paths:
+        with open(path, "rb") as fh:
+            while True:
+                header = fh.read(_LENGTH.size)
+                if not header:
+                    break
+
+                (n,) = _LENGTH.unpack(header)
+                body = fh.read(generate.record_size() + 12 + 2 * n)
+                yield decode(header + body)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# cribs.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+""" Slides a crib (a fragment of suspected plaintext) across a ciphertext,
+searching for offsets at which the implied key is consistent with the known
+patterns of the Chi rotors.
+
+At the correct offset, the crib added to the ciphertext gives the key, whose
+delta is the delta-Chi added to the delta-Psi'. As the Psi rotors frequently
+stand still, delta-Psi' is mostly dots, so each impulse of the delta-key
+agrees with the delta-Chi stream (from the correct start) far more often than
+chance.
+
+All streams are bit-packed (see `lorenz.bits`), so comparing the crib against
+every position of a Chi rotor at a given offset costs one XOR and one popcount
+per position, rather than a pass over the characters of the crib.
+"""
+import math
+from collections import namedtuple
+
+from lorenz.bits import BitPlaneStream
+from lorenz.bits import mask
+from lorenz.bits import popcount
+from lorenz.bits import wheel
+
+# A ranked offset, with the start position of each Chi rotor implied by the
+# crib at that offset, and the number of delta-key impulses agreeing with it.
+CribMatch = namedtuple(
+    "CribMatch", ["offset", "score", "starts", "agreements"]
+)
+
+
+def drag(ciphertext, crib, chi, impulses=(1, 2, 3, 4, 5), limit=10):
+    """Drag a crib across a ciphertext.
+
+    ciphertext
+        The ciphertext, as a list of five-bit integers.
+
+    crib
+        The suspected plaintext, as a list of five-bit integers. It must be at
+        least two characters long.
+
+    chi
+        The cam patterns of the Chi rotors, as a list of five lists of bits.
+
+    impulses
+        The impulses to be scored.
+
+    limit
+        The number of offsets to return.
+
+    Returns a list of CribMatch tuples, in decreasing order of score. The score
+    of an offset is the sum, over the scored impulses, of the number of
+    standard deviations by which the best-agreeing Chi start exceeds chance;
+    `starts` gives that start (as a position at the beginning of the
+    ciphertext) for each scored impulse, or None for those not scored.
+    """
+
+    if len(crib) < 2:
+        raise ValueError("a crib must be at least two characters long.")
+
+    if len(crib) > len(ciphertext):
+        raise ValueError("the crib is longer than the ciphertext.")
+
+    m = len(crib) - 1
+    window = mask(m)
+    deviation = math.sqrt(m) / 2
+
+    z = BitPlaneStream.from_stream(ciphertext).delta()
+    c = BitPlaneStream.from_stream(crib).delta()
+
+    # The delta of each Chi rotor over the length of the crib, from each of
+    # its positions.
+    patterns = {}
+    for i in impulses:
+        pins = chi[i - 1]
+        patterns[i] = [
+            (wheel(pins, u, m + 1) ^ (wheel(pins, u, m + 1) >> 1)) & window
+            for u in range(len(pins))
+        ]
+
+    offsets = range(len(ciphertext) - len(crib) + 1)
+
+    # For each impulse, find the best-agreeing position of the Chi rotor at
+    # every offset; counting the disagreements with every position of the
+    # rotor is done at C speed, via map().
+    best = {}
+    for i in impulses:
+        plane = z.impulse(i)
+        crib_plane = c.impulse(i)
+        candidates = patterns[i]
+
+        best[i] = []
+        for offset in offsets:
+            key = ((plane >> offset) & window) ^ crib_plane
+            counts = list(map(popcount, map(key.__xor__, candidates)))
+
+            fewest = min(counts)
+            best[i].append((fewest, counts.index(fewest)))
+
+    matches = []
+    for offset in offsets:
+        score = 0.0
+        starts = [None] * 5
+        agreements = [None] * 5
+
+        for i in impulses:
+            fewest, u = best[i][offset]
+
+            starts[i - 1] = (u - offset) % len(chi[i - 1])
+            agreements[i - 1] = m - fewest
+            score += (m - fewest - m / 2) / deviation
+
+        matches.append(CribMatch(offset, score, starts, agreements))
+
+    matches.sort(key=lambda match: (-match.score, match.offset))
+    return matches[:limit]
@@ -0,0 +1,344 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# distributed.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+""" Distributes a Chi-setting search across many worker processes, which may
+run on other machines.
+
+A `Coordinator` splits the candidates of a `ChiSearch` into shards (runs of its
+groups; see `ChiSearch.groups()`) and serves them over a TCP or Unix socket.
+Workers (see `work()`) connect, receive the search, and repeatedly request a
+shard, count it, and return the counts.
+
+The protocol is one JSON object per line. A worker sends
+
+    {"type": "hello"}                       on connecting
+    {"type": "request"}                     when idle
+    {"type": "result", "shard": i, ...}     when a shard is counted
+    {"type": "heartbeat"}                   periodically, while counting
+
+and the coordinator answers "hello" with the search ("job"), and "request" and
+"result" with the next shard ("task"), a pause ("wait") or "done".
+
+Shards are handed out from a queue, so fast workers simply take more of them.
+Once the queue is empty, idle workers "steal" the shard that has been out the
+longest, and whichever copy finishes first is kept. A worker that falls silent
+for longer than the timeout (or disconnects) is presumed dead, and its shards
+are returned to the queue.
+"""
+import json
+import socket
+import socketserver
+import threading
+import time
+from collections import deque
+from itertools import count
+
+from lorenz.search import ChiSearch
+
+
+def _connect(address):
+    """ Open a connection to a TCP (host, port) or Unix (path) address. """
+    if isinstance(address, str):
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    else:
+        connection = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    connection.connect(address)
+    return connection
+
+
+def _send(fh, message):
+    fh.write(json.dumps(message, separators=(",", ":")).encode() + b"\n")
+    fh.flush()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """ Serve a single worker's connection. """
+
+    def handle(self):
+        coordinator = self.server.coordinator
+        worker = next(coordinator._ids)
+
+        try:
+            for line in self.rfile:
+                message = json.loads(line)
+                reply = coordinator._receive(worker, message)
+                if reply is not None:
+                    _send(self.wfile, reply)
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            coordinator._disconnect(worker)
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class Coordinator:
+    """ Serve the shards of a Chi-setting search to workers. """
+
+    def results(self, timeout=None, limit=None):
+        """Wait for every shard to be counted, then return the merged results
+        ranked as for `ChiSearch.run()`. Raises TimeoutError if the search is
+        unfinished after `timeout` seconds.
+        """
+
+        with self._lock:
+            if not self._finished.wait_for(
+                lambda: len(self._done) == len(self.shards), timeout
+            ):
+                raise TimeoutError("the search is unfinished.")
+
+            merged = [
+                pair
+                for shard in range(len(self.shards))
+                for pair in self._done[shard]
+            ]
+
+        return self.search.rank(merged, limit)
+
+    def close(self):
+        """ Stop serving. """
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _receive(self, worker, message):
+        """ Handle a message from a worker, returning the reply (if any). """
+        with self._lock:
+            self._seen[worker] = time.monotonic()
+
+            kind = message.get("type")
+            if kind == "hello":
+                return self._job
+            if kind == "heartbeat":
+                return None
+            if kind == "result":
+                self._complete(worker, message)
+            elif kind != "request":
+                raise ValueError(f"unknown message {kind!r}.")
+
+            return self._assign(worker)
+
+    def _complete(self, worker, message):
+        """ Record the counts of a shard, unless it was already counted. """
+        shard = message["shard"]
+        self._holders.get(shard, {}).pop(worker, None)
+
+        if shard not in self._done:
+            self._done[shard] = [
+                (tuple(starts), n) for starts, n in message["results"]
+            ]
+            self._holders.pop(shard, None)
+            self._finished.notify_all()
+
+    def _assign(self, worker):
+        """ Choose the next task for an idle worker. """
+        self._reap()
+
+        if len(self._done) == len(self.shards):
+            return {"type": "done"}
+
+        shard = None
+        while self._pending:
+            candidate = self._pending.popleft()
+            if candidate not in self._done:
+                shard = candidate
+                break
+
+        if shard is None and self.steal:
+            # Duplicate the shard that has been held longest by others.
+            held = [
+                (min(holders.values()), s)
+                for s, holders in self._holders.items()
+                if s not in self._done and worker not in holders
+            ]
+            if held:
+                shard = min(held)[1]
+                self.stolen += 1
+
+        if shard is None:
+            return {"type": "wait", "seconds": self.heartbeat}
+
+        self._holders.setdefault(shard, {})[worker] = time.monotonic()
+        lo, hi = self.shards[shard]
+        return {"type": "task", "shard": shard, "lo": lo, "hi": hi}
+
+    def _reap(self):
+        """ Return the shards of silent workers to the queue. """
+        now = time.monotonic()
+        for worker, seen in list(self._seen.items()):
+            if now - seen > self.timeout:
+                self._release(worker)
+
+    def _release(self, worker):
+        """ Forget a worker, returning its unfinished shards to the queue. """
+        self._seen.pop(worker, None)
+        for shard, holders in list(self._holders.items()):
+            if holders.pop(worker, None) is not None and not holders:
+                del self._holders[shard]
+                if shard not in self._done:
+                    self._pending.appendleft(shard)
+                    self.reassigned += 1
+
+    def _disconnect(self, worker):
+        with self._lock:
+            self._release(worker)
+
+    def __init__(
+        self,
+        ciphertext,
+        chi,
+        rotors=(1, 2),
+        address=("127.0.0.1", 0),
+        shard=1,
+        timeout=10.0,
+        heartbeat=1.0,
+        steal=True,
+    ):
+        """Create a Coordinator, and start serving.
+
+        ciphertext, chi, rotors
+            The search, as for `ChiSearch.__init__()`.
+
+        address
+            A (host, port) pair to listen on TCP, or a path to listen on a
+            Unix socket. By default, an unused port on the loopback interface
+            is chosen; the address actually used is `.address`.
+
+        shard
+            The number of groups in each shard.
+
+        timeout
+            The number of seconds for which a worker may be silent before its
+            shards are given to others.
+
+        heartbeat
+            The number of seconds between a worker's heartbeats (and for which
+            an idle worker waits when no shard is available.)
+
+        steal
+            If true, idle workers duplicate shards held by others once the
+            queue is empty.
+        """
+
+        self.search = ChiSearch(ciphertext, chi, rotors)
+        self.timeout = timeout
+        self.heartbeat = heartbeat
+        self.steal = steal
+
+        groups = len(self.search.groups())
+        self.shards = [
+            (lo, min(lo + shard, groups)) for lo in range(0, groups, shard)
+        ]
+
+        # The number of shards duplicated by stealing, and returned to the
+        # queue after their workers died.
+        self.stolen = 0
+        self.reassigned = 0
+
+        self._job = {
+            "type": "job",
+            "ciphertext": list(ciphertext),
+            "chi": chi,
+            "rotors": list(rotors),
+            "heartbeat": heartbeat,
+        }
+
+        self._lock = threading.Lock()
+        self._finished = threading.Condition(self._lock)
+        self._ids = count()
+        self._pending = deque(range(len(self.shards)))
+        self._holders = {}
+        self._done = {}
+        self._seen = {}
+
+        if isinstance(address, str):
+            self._server = _UnixServer(address, _Handler)
+        else:
+            self._server = _TCPServer(address, _Handler)
+        self._server.coordinator = self
+        self.address = self._server.server_address
+
+        threading.Thread(
+            target=self._server.serve_forever, daemon=True
+        ).start()
+
+
+def work(address):
+    """Work for the coordinator at the given address until the search is done,
+    returning the number of shards counted.
+    """
+
+    with _connect(address) as connection:
+        fh = connection.makefile("rwb")
+        lock = threading.Lock()
+
+        def send(message):
+            with lock:
+                _send(fh, message)
+
+        def receive():
+            line = fh.readline()
+            if not line:
+                raise ConnectionError("the coordinator closed the connection.")
+            return json.loads(line)
+
+        send({"type": "hello"})
+        job = receive()
+        search = ChiSearch(job["ciphertext"], job["chi"], job["rotors"])
+        groups = search.groups()
+
+        # Heartbeats are sent from a separate thread, so that they continue
+        # while a shard is being counted.
+        stopped = threading.Event()
+
+        def beat():
+            while not stopped.wait(job["heartbeat"]):
+                try:
+                    send({"type": "heartbeat"})
+                except OSError:
+                    return
+
+        threading.Thread(target=beat, daemon=True).start()
+
+        shards = 0
+        try:
+            send({"type": "request"})
+            while True:
+                message = receive()
+
+                if message["type"] == "done":
+                    return shards
+
+                if message["type"] == "wait":
+                    time.sleep(message["seconds"])
+                    send({"type": "request"})
+                    continue
+
+                results = search.count(groups, message["lo"], message["hi"])
+                shards += 1
+                send(
+                    {
+                        "type": "result",
+                        "shard": message["shard"],
+                        "results": results,
+                    }
+                )
+        finally:
+            stopped.set()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# duplicates.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+""" Finds repeated intercepts of the same message, exactly or with garbles.
+
+A ciphertext is reduced to the set of its n-grams ("shingles") of five-bit
+words, each packed into an integer by a rolling hash. Two intercepts of the
+same message share most of their shingles, even if a few characters were
+garbled, dropped or inserted in transmission; their similarity is the Jaccard
+index of their sets of shingles.
+
+The similarity is estimated by MinHash: the shingles are hashed into `bands *
+rows` bins, and the least hash in each bin kept, so that two signatures agree
+at each bin with probability (about) equal to the similarity. The
+signatures are divided into bands, and an index maps each band to the
+messages with that band ("locality-sensitive hashing"); a query only compares
+its signature with those of the messages that share one of its bands, rather
+than with the whole archive.
+"""
+import hashlib
+import random
+from collections import namedtuple
+from operator import eq
+
+# A message found to duplicate a query, and the estimated similarity of the
+# two (1.0 for an exact duplicate.)
+Match = namedtuple("Match", ["key", "similarity"])
+
+_MASK = 2**64 - 1
+
+# An odd constant, offsetting the values that empty bins borrow.
+_MIX = 0x9E3779B97F4A7C15
+
+
+def shingles(ciphertext, n=8):
+    """Return the set of the n-grams of a ciphertext, each packed into an
+    integer of `5 * n` bits. A ciphertext shorter than `n` is one shingle.
+    """
+
+    window = (1 << (5 * n)) - 1
+    value = 0
+    found = set()
+    for i, word in enumerate(ciphertext):
+        value = ((value << 5) | word) & window
+        if i >= n - 1:
+            found.add(value)
+
+    if not found and ciphertext:
+        found.add(value)
+    return found
+
+
+class DuplicateIndex:
+    """ An index of ciphertexts, searchable for duplicates. """
+
+    def signature(self, ciphertext):
+        """ Return the MinHash signature of a ciphertext. """
+        size = self.bands * self.rows
+        salt = self._salt
+
+        # A single hash is computed for each shingle, and its top bits choose
+        # a bin, in which the least hash is kept ("one-permutation hashing".)
+        minima = [None] * size
+        for shingle in shingles(ciphertext, self.n):
+            x = (shingle ^ salt) & _MASK
+            x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+            x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK
+            x ^= x >> 31
+
+            b = (x * size) >> 64
+            if minima[b] is None or x < minima[b]:
+                minima[b] = x
+
+        if all(value is None for value in minima):
+            return (0,) * size
+
+        # Empty bins borrow from the next bin that is not, so that short
+        # messages are still comparable bin by bin.
+        signature = list(minima)
+        for b in range(size):
+            distance = 1
+            while signature[b] is None:
+                borrowed = minima[(b + distance) % size]
+                if borrowed is not None:
+                    signature[b] = (borrowed + distance * _MIX) & _MASK
+                distance += 1
+
+        return tuple(signature)
+
+    def add(self, key, ciphertext):
+        """ Index a ciphertext under a key. """
+        if key in self._signatures:
+            raise ValueError(f"key {key!r} is already indexed.")
+
+        signature = self.signature(ciphertext)
+        self._signatures[key] = signature
+        self._digests[key] = self._digest(ciphertext)
+        self._exact.setdefault(self._digests[key], []).append(key)
+        for band in self._bands(signature):
+            self._buckets.setdefault(band, []).append(key)
+
+    def remove(self, key):
+        """ Remove a ciphertext from the index. """
+        signature = self._signatures.pop(key)
+        for band in self._bands(signature):
+            self._buckets[band].remove(key)
+            if not self._buckets[band]:
+                del self._buckets[band]
+        digest = self._digests.pop(key)
+        self._exact[digest].remove(key)
+        if not self._exact[digest]:
+            del self._exact[digest]
+
+    def exact(self, ciphertext):
+        """Return the key of an identical ciphertext (the first indexed, if
+        there are several), or None.
+        """
+
+        keys = self._exact.get(self._digest(ciphertext))
+        return keys[0] if keys else None
+
+    def query(self, ciphertext, threshold=None):
+        """Find the indexed ciphertexts similar to the given one, returning
+        Matches from the most similar to the least.
+
+        threshold
+            The least estimated similarity of a match; by default, that given
+            when the index was created.
+        """
+
+        threshold = self.threshold if threshold is None else threshold
+
+        matches = {
+            key: 1.0 for key in self._exact.get(self._digest(ciphertext), ())
+        }
+
+        signature = self.signature(ciphertext)
+        candidates = set()
+        for band in self._bands(signature):
+            candidates.update(self._buckets.get(band, ()))
+
+        for key in candidates - matches.keys():
+            other = self._signatures[key]
+            similarity = sum(map(eq, signature, other)) / len(other)
+            if similarity >= threshold:
+                matches[key] = similarity
+
+        ranked = [Match(key, s) for key, s in matches.items()]
+        ranked.sort(key=lambda match: -match.similarity)
+        return ranked
+
+    def unique(self, messages, threshold=None):
+        """Index (key, ciphertext) pairs, yielding only those that duplicate
+        no ciphertext indexed before them, so that each message is analysed
+        once.
+        """
+
+        for key, ciphertext in messages:
+            duplicate = self.query(ciphertext, threshold)
+            self.add(key, ciphertext)
+            if not duplicate:
+                yield key, ciphertext
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def __contains__(self, key):
+        return key in self._signatures
+
+    def _bands(self, signature):
+        r = self.rows
+        return [
+            (i, hash(signature[i * r : (i + 1) * r]))
+            for i in range(self.bands)
+        ]
+
+    @staticmethod
+    def _digest(ciphertext):
+        return hashlib.sha256(bytes(ciphertext)).digest()
+
+    def __init__(self, n=8, bands=32, rows=3, threshold=0.5, seed=0):
+        """Create an empty DuplicateIndex.
+
+        n
+            The length of the shingles, in characters.
+
+        bands, rows
+            The number of bands into which signatures are divided, and the
+            number of hash functions in each. A pair of messages of similarity
+            s share a band with probability 1 - (1 - s ** rows) ** bands; the
+            default gives 0.99 for a similarity of 0.5, and 0.03 for 0.1.
+
+        threshold
+            The least estimated similarity of a match.
+
+        seed
+            The seed of the hash functions. Only indices with the same seed
+            (and parameters) produce comparable signatures.
+        """
+
+        if n < 1 or bands < 1 or rows < 1:
+            raise ValueError("n, bands and rows must be positive.")
+
+        self.n = n
+        self.bands = bands
+        self.rows = rows
+        self.threshold = threshold
+
+        self._salt = random.Random(seed).getrandbits(64)
+
+        self._signatures = {}
+        self._buckets = {}
+        self._digests = {}
+        self._exact = {}
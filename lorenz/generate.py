@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# generate.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+""" Generates random sets of cams for the SZ40, satisfying (approximately) the
+constraints that the German operators were instructed to follow.
+
+The patterns of the Chi and Psi rotors had roughly equal numbers of dots and
+crosses, and no long runs of either; the patterns of the Chi rotors were also
+required to have roughly balanced deltas. The known patterns (see
+`lorenz.patterns`) all satisfy the default constraints below.
+
+Each rotor is drawn as a single random integer and tested with a handful of
+bitwise operations, so sets of cams can be generated in bulk. A set of cams
+packs into 63 bytes (one bit per cam), which is the form used for storage.
+"""
+import random
+from collections import namedtuple
+
+from lorenz.bits import mask
+from lorenz.bits import popcount
+from lorenz.bits import unpack as unpack_bits
+
+# The sizes of the rotors of the SZ40, in the order used by the `rotors`
+# parameter of `SZ40.__init__()`.
+SIZES = {
+    "chi": [41, 31, 29, 26, 23],
+    "psi": [43, 47, 51, 53, 59],
+    "mu": [61, 37],
+}
+
+# The constraints on the pattern of a rotor: the permitted range of the
+# proportion of crosses, the permitted range of the proportion of crosses in
+# its delta, and the longest permitted run of dots or crosses (all taken
+# cyclically.)
+Constraint = namedtuple("Constraint", ["crosses", "delta", "run"])
+
+CONSTRAINTS = {
+    "chi": Constraint(crosses=(0.45, 0.55), delta=(0.35, 0.65), run=4),
+    "psi": Constraint(crosses=(0.45, 0.55), delta=(0.35, 0.80), run=5),
+    "mu": Constraint(crosses=(0.30, 0.75), delta=(0.0, 1.0), run=4),
+}
+
+
+def _satisfies(pattern, size, constraint):
+    """ Decide whether a packed pattern satisfies a constraint. """
+    lo, hi = constraint.crosses
+    if not lo * size <= popcount(pattern) <= hi * size:
+        return False
+
+    # The delta compares each cam with the next, cyclically.
+    rotated = (pattern >> 1) | ((pattern & 1) << (size - 1))
+    lo, hi = constraint.delta
+    if not lo * size <= popcount(pattern ^ rotated) <= hi * size:
+        return False
+
+    # A run longer than the limit leaves a set bit after ANDing together that
+    # many shifted copies of the (doubled, to handle wrapping) pattern.
+    for value in (pattern, pattern ^ mask(size)):
+        doubled = value | (value << size)
+        runs = doubled
+        for shift in range(1, constraint.run + 1):
+            runs &= doubled >> shift
+        if runs:
+            return False
+
+    return True
+
+
+class CamGenerator:
+    """ Generate random sets of cams, reproducibly from a seed. """
+
+    def pattern(self, size, constraint):
+        """ Draw a packed pattern for a single rotor. """
+        while True:
+            pattern = self.rng.getrandbits(size)
+            if _satisfies(pattern, size, constraint):
+                return pattern
+
+    def packed(self):
+        """ Draw a set of cams, packed into bytes. """
+        value = 0
+        offset = 0
+        for group in ["chi", "psi", "mu"]:
+            for size in self.sizes[group]:
+                value |= self.pattern(size, self.constraints[group]) << offset
+                offset += size
+
+        return value.to_bytes((offset + 7) // 8, "little")
+
+    def cams(self):
+        """ Draw a set of cams, in the form accepted by `SZ40.__init__()`. """
+        return unpack(self.packed(), self.sizes)
+
+    def generate(self, n, packed=False):
+        """ Generate `n` sets of cams, either as dictionaries or as bytes. """
+        draw = self.packed if packed else self.cams
+        for _ in range(n):
+            yield draw()
+
+    def __init__(self, seed=None, constraints=CONSTRAINTS, sizes=SIZES):
+        """Create a CamGenerator.
+
+        seed
+            The seed of the generator; generators with the same seed produce
+            the same sets of cams.
+
+        constraints
+            A dictionary mapping each rotor group to its Constraint.
+
+        sizes
+            A dictionary mapping each rotor group to the sizes of its rotors.
+        """
+
+        self.rng = random.Random(seed)
+        self.constraints = constraints
+        self.sizes = sizes
+
+
+def record_size(sizes=SIZES):
+    """ Return the number of bytes in a packed set of cams. """
+    return (sum(sum(group) for group in sizes.values()) + 7) // 8
+
+
+def pack(cams, sizes=SIZES):
+    """ Pack a set of cams into bytes. """
+    value = 0
+    offset = 0
+    for group in ["chi", "psi", "mu"]:
+        if [len(pins) for pins in cams[group]] != sizes[group]:
+            raise ValueError(f"mismatched sizes of {group} rotors.")
+
+        for pins in cams[group]:
+            for i, bit in enumerate(pins):
+                value |= bit << (offset + i)
+            offset += len(pins)
+
+    return value.to_bytes(record_size(sizes), "little")
+
+
+def unpack(data, sizes=SIZES):
+    """ Unpack a set of cams from bytes. """
+    if len(data) != record_size(sizes):
+        raise ValueError("packed cams are of the wrong length.")
+
+    value = int.from_bytes(data, "little")
+
+    cams = {}
+    offset = 0
+    for group in ["chi", "psi", "mu"]:
+        cams[group] = []
+        for size in sizes[group]:
+            cams[group].append(unpack_bits(value >> offset, size))
+            offset += size
+
+    return cams
+
+
+def write(fh, packed):
+    """ Write packed sets of cams to a binary file. """
+    for record in packed:
+        fh.write(record)
+
+
+def read(fh, sizes=SIZES):
+    """ Read sets of cams (as dictionaries) from a binary file. """
+    size = record_size(sizes)
+    while True:
+        record = fh.read(size)
+        if not record:
+            return
+
+        yield unpack(record, sizes)
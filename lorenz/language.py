@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# language.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+""" Simple statistical models of teleprinter plaintext, used to score
+candidate decrypts.
+
+A `LanguageModel` assigns a log-probability to each five-bit ITA2 character,
+either independently (a unigram model) or conditioned upon the character that
+precedes it (a bigram model.) Genuine plaintext scores far higher, per
+character, than the near-uniform output of a wrong key.
+"""
+import math
+import random
+from itertools import accumulate
+
+from lorenz.telegraphy import BP_SHIFTLESS_ITA2
+from lorenz.telegraphy import Teleprinter
+
+# Approximate frequencies (per cent) of letters in English text. Word spaces
+# ("9" in Bletchley shiftless notation) make up a further ENGLISH_SPACE of all
+# characters, and the remaining symbols share ENGLISH_OTHER between them.
+ENGLISH_LETTERS = {
+    "E": 12.70,
+    "T": 9.06,
+    "A": 8.17,
+    "O": 7.51,
+    "I": 6.97,
+    "N": 6.75,
+    "S": 6.33,
+    "H": 6.09,
+    "R": 5.99,
+    "D": 4.25,
+    "L": 4.03,
+    "C": 2.78,
+    "U": 2.76,
+    "M": 2.41,
+    "W": 2.36,
+    "F": 2.23,
+    "G": 2.02,
+    "Y": 1.97,
+    "P": 1.93,
+    "B": 1.29,
+    "V": 0.98,
+    "K": 0.77,
+    "J": 0.15,
+    "X": 0.15,
+    "Q": 0.10,
+    "Z": 0.07,
+}
+ENGLISH_SPACE = 0.17
+ENGLISH_OTHER = 0.01
+
+
+class LanguageModel:
+    """ A unigram or bigram model of five-bit plaintext. """
+
+    def scores(self, stream):
+        """Return the log-probability of each character of a stream. The
+        first character is scored by the unigram model; the remainder by the
+        bigram model, if there is one.
+        """
+
+        if not stream:
+            return []
+
+        if self.bigrams is None:
+            return list(map(self.unigrams.__getitem__, stream))
+
+        scores = [self.unigrams[stream[0]]]
+        scores.extend(
+            self.bigrams[previous][word]
+            for previous, word in zip(stream, stream[1:])
+        )
+        return scores
+
+    def score(self, stream):
+        """ Return the mean log-probability per character of a stream. """
+        return sum(self.scores(stream)) / len(stream) if stream else 0.0
+
+    def expected(self):
+        """Return the expected per-character score of genuine plaintext,
+        according to the unigram model.
+        """
+
+        return sum(math.exp(lp) * lp for lp in self.unigrams)
+
+    def random(self):
+        """Return the expected per-character score of random (uniformly
+        distributed) characters, such as are produced by decrypting with the
+        wrong key.
+        """
+
+        return sum(self.unigrams) / 32
+
+    def threshold(self):
+        """Return a per-character score midway between that expected of
+        plaintext and that expected of random characters.
+        """
+
+        return (self.expected() + self.random()) / 2
+
+    def sample(self, n, rng=None):
+        """Generate a stream of `n` characters from the model.
+
+        rng
+            A `random.Random` instance, for reproducibility.
+        """
+
+        rng = rng or random.Random()
+        if n <= 0:
+            return []
+
+        population = range(32)
+        first = list(accumulate(map(math.exp, self.unigrams)))
+
+        if self.bigrams is None:
+            return rng.choices(population, cum_weights=first, k=n)
+
+        rows = [list(accumulate(map(math.exp, row))) for row in self.bigrams]
+
+        stream = rng.choices(population, cum_weights=first)
+        for _ in range(n - 1):
+            stream += rng.choices(population, cum_weights=rows[stream[-1]])
+        return stream
+
+    @classmethod
+    def english(cls):
+        """ Return a unigram model of English, as written in ITA2. """
+        unigrams = [ENGLISH_OTHER / 5] * 32
+        for letter, frequency in ENGLISH_LETTERS.items():
+            unigrams[BP_SHIFTLESS_ITA2.index(letter)] = (
+                (1 - ENGLISH_SPACE - ENGLISH_OTHER) * frequency / 100
+            )
+        unigrams[BP_SHIFTLESS_ITA2.index("9")] = ENGLISH_SPACE
+
+        return cls([p / sum(unigrams) for p in unigrams])
+
+    @classmethod
+    def from_text(cls, text, bigrams=True, smoothing=1.0):
+        """Train a model on a sample of plaintext.
+
+        text
+            Either a string (in Bletchley shiftless notation) or a list of
+            five-bit integers.
+
+        bigrams
+            If true, a bigram model is trained.
+
+        smoothing
+            A pseudo-count added to every character (and pair of characters),
+            so that those absent from the sample are not deemed impossible.
+        """
+
+        if isinstance(text, str):
+            text = Teleprinter.encode(text)
+
+        counts = [smoothing] * 32
+        for word in text:
+            counts[word] += 1
+        unigrams = [count / sum(counts) for count in counts]
+
+        if not bigrams:
+            return cls(unigrams)
+
+        pairs = [[smoothing] * 32 for _ in range(32)]
+        for previous, word in zip(text, text[1:]):
+            pairs[previous][word] += 1
+
+        return cls(
+            unigrams, [[count / sum(row) for count in row] for row in pairs]
+        )
+
+    def __init__(self, unigrams, bigrams=None):
+        """Create a LanguageModel.
+
+        unigrams
+            A list of 32 probabilities, one for each character.
+
+        bigrams
+            Optionally, a list of 32 lists of 32 probabilities, the `j`th
+            entry of the `i`th list giving the probability of character `j`
+            following character `i`.
+        """
+
+        if len(unigrams) != 32:
+            raise ValueError("a unigram model requires 32 probabilities.")
+
+        if any(p <= 0 for p in unigrams):
+            raise ValueError("probabilities must be positive.")
+
+        self.unigrams = [math.log(p) for p in unigrams]
+        self.bigrams = None
+
+        if bigrams is not None:
+            if len(bigrams) != 32 or any(len(row) != 32 for row in bigrams):
+                raise ValueError(
+                    "a bigram model requires 32x32 probabilities."
+                )
+
+            if any(p <= 0 for row in bigrams for p in row):
+                raise ValueError("probabilities must be positive.")
+
+            self.bigrams = [[math.log(p) for p in row] for row in bigrams]
@@ -17,10 +17,15 @@ following Wikipedia articles:
  - https://en.wikipedia.org/wiki/Cryptanalysis_of_the_Lorenz_cipher
 
 """
+from itertools import accumulate
+
+from lorenz import backends
 from lorenz.rotor import MotorSet
 from lorenz.rotor import Rotor
 from lorenz.rotor import RotorSet
 
+WORDS = frozenset(range(32))
+
 
 class SZ40:
     """ A historically-accurate implementation of the Lorenz SZ-40 machine. """
@@ -39,6 +44,77 @@ class SZ40:
         if self.mu.state():
             self.psi.backstep()
 
+    def seek(self, n):
+        """Step the machine's rotors `n` positions forward at once.
+
+        The motion of the Psi rotors is looked up from the precomputed schedule
+        of the motor, so this takes (amortized) constant time.
+        """
+
+        if n < 0:
+            raise ValueError(f"cannot seek by a negative offset {n}.")
+
+        advances = self.mu.schedule().advances(n)
+
+        self.chi.seek(n)
+        self.psi.seek(advances)
+        self.mu.seek(n)
+
+    def rewind(self, n):
+        """Step the machine's rotors `n` positions backward at once; the
+        inverse of `.seek()`.
+        """
+
+        if n < 0:
+            raise ValueError(f"cannot rewind by a negative offset {n}.")
+
+        # The Psi rotors retreat once for every raised step of the motor
+        # during the `n` steps that led to its current position.
+        self.mu.rewind(n)
+        advances = self.mu.schedule().advances(n)
+
+        self.chi.rewind(n)
+        self.psi.rewind(advances)
+
+    def keystream(self, n):
+        """Return the key for the next `n` characters, stepping the machine's
+        rotors `n` positions forward.
+
+        The key is generated in bulk, rather than by stepping the rotors one
+        character at a time; it is identical to the sequence of values that
+        `.state()` would take.
+        """
+
+        schedule = self.mu.schedule()
+
+        # The Psi rotors advance whenever the motor is raised, so before step t
+        # they have advanced once for every raised step prior to it.
+        advances = list(accumulate(schedule.stream(n), initial=0))
+
+        chi = self.chi.states(n, self.backend)
+        psi = self.psi.states(advances[-1] + 1, self.backend)
+        key = self.backend.keystream(chi, psi, advances)
+
+        self.chi.seek(n)
+        self.psi.seek(advances[-1])
+        self.mu.seek(n)
+
+        return key
+
+    def reverse_keystream(self, n):
+        """Return the key for the `n` characters before the current position
+        (in the order in which they are enciphered), stepping the machine's
+        rotors `n` positions backward.
+
+        As for `.keystream()`, the key is generated in bulk.
+        """
+
+        self.rewind(n)
+        key = self.keystream(n)
+        self.rewind(n)
+
+        return key
+
     def state(self):
         """Return the pseudorandom value in the active position(s) of the
         Chi and Psi rotors.
@@ -51,20 +127,37 @@ class SZ40:
         to generate the key.
 
         Each character in the input stream is XOR'ed with the current state of
-        the Lorenz machine, then the machine is stepped one position.
+        the Lorenz machine, then the machine is stepped one position. The
+        stream is validated before the machine is stepped.
+        """
+
+        stream = self._validate(stream)
+        return self.backend.add(stream, self.keystream(len(stream)))
+
+    def feed_backward(self, stream):
+        """Feed a stream of information that ends at the machine's current
+        position, stepping the machine back to where the stream began.
+
+        This deciphers the end of a message from the positions reached at its
+        end, without stepping through the beginning. The stream is validated
+        before the machine is stepped.
         """
 
-        output = []
-        for word in stream:
-            if (type(word) is not int) or (word < 0) or (word >= 32):
-                raise RuntimeError(f'illegal word "{word}" in stream.')
+        stream = self._validate(stream)
+        return self.backend.add(stream, self.reverse_keystream(len(stream)))
+
+    def _validate(self, stream):
+        """ Return a stream as a list, checking that it holds only words. """
+        stream = list(stream)
 
-            output.append(word ^ self.state())
-            self.step()
+        if not (set(map(type, stream)) <= {int} and set(stream) <= WORDS):
+            for word in stream:
+                if (type(word) is not int) or (word < 0) or (word >= 32):
+                    raise RuntimeError(f'illegal word "{word}" in stream.')
 
-        return output
+        return stream
 
-    def __init__(self, rotors, positions=None):
+    def __init__(self, rotors, positions=None, backend=None):
         """Create a Lorenz SZ-40 machine.
 
         rotors
@@ -74,8 +167,14 @@ class SZ40:
         positions
             Specify the initial rotor positions using a dictionary with three
             keys: `chi`, `psi`, and `mu`.
+
+        backend
+            Specify the backend (or its name) used to generate key in bulk; see
+            `lorenz.backends`. If empty, the default backend is used.
         """
 
+        self.backend = backends.get(backend)
+
         if positions is None:
             self.chi = RotorSet(rotors["chi"])
             self.psi = RotorSet(rotors["psi"])
@@ -0,0 +1,309 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# metrics.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+""" Optional instrumentation for the Lorenz SZ-40 machine.
+
+`InstrumentedSZ40` is a drop-in replacement for `SZ40` that keeps counters of
+the characters keyed by it, the steps (forward or backward, whether one at a
+time or in bulk) during which the Psi rotors advanced or were held by the
+motor, and the revolutions completed by every rotor, as well as a histogram of
+the time taken by each call to `.feed()` (or `.feed_backward()`.)
+
+The counting is done by a separate engine, rather than by checks within `SZ40`
+itself, so that machines which are not instrumented pay nothing for it.
+"""
+import time
+
+from lorenz.machines import SZ40
+
+
+class Histogram:
+    """Accumulate a distribution of non-negative values in power-of-two
+    buckets.
+
+    The bucket with upper bound `2 ** k` holds values `v` satisfying
+    `2 ** (k - 1) < v <= 2 ** k`, with values measured in units of `unit`.
+    """
+
+    def record(self, value):
+        """ Add a value to the histogram. """
+        ticks = int(value / self.unit)
+        bound = 1 << max(ticks - 1, 0).bit_length()
+        self.buckets[bound] = self.buckets.get(bound, 0) + 1
+
+        self.count += 1
+        self.total += value
+        self.minimum = (
+            value if self.minimum is None else min(self.minimum, value)
+        )
+        self.maximum = (
+            value if self.maximum is None else max(self.maximum, value)
+        )
+
+    def mean(self):
+        """ Return the mean of the recorded values. """
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q):
+        """Return an upper bound for the `q`th percentile (0 <= q <= 100) of the
+        recorded values, to within the resolution of the buckets.
+        """
+
+        if not 0 <= q <= 100:
+            raise ValueError(f"illegal percentile {q}.")
+
+        if not self.count:
+            return 0.0
+
+        seen = 0
+        for bound in sorted(self.buckets):
+            seen += self.buckets[bound]
+            if seen >= q / 100 * self.count:
+                return min(bound * self.unit, self.maximum)
+
+        return self.maximum
+
+    def summary(self):
+        """ Return a dictionary summarizing the histogram. """
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.mean(),
+            "min": self.minimum,
+            "max": self.maximum,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+            "buckets": {
+                bound * self.unit: self.buckets[bound]
+                for bound in sorted(self.buckets)
+            },
+        }
+
+    def __init__(self, unit=1e-6):
+        """Create an empty Histogram.
+
+        unit
+            The resolution of the histogram. By default, values are bucketed
+            by the number of microseconds they represent.
+        """
+
+        self.unit = unit
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+
+
+class InstrumentedSZ40(SZ40):
+    """ A Lorenz SZ-40 machine that records counters and timings. """
+
+    def step(self):
+        """ Step the machine's rotors one position forward. """
+        if self.mu.state():
+            self.psi.step()
+            self.psi_advances += 1
+            self._moves["psi"] += 1
+        else:
+            self.motor_stops += 1
+
+        # Within a MotorSet, the first rotor always steps and each subsequent
+        # rotor steps when its predecessor is raised.
+        moves = self._moves["mu"]
+        moves[0] += 1
+        for i in range(1, len(self.mu.rotors)):
+            moves[i] += self.mu.rotors[i - 1].state()
+
+        self.mu.step()
+        self.chi.step()
+        self.steps += 1
+        self._moves["chi"] += 1
+
+    def backstep(self):
+        """ Step the machine's rotors one position backward. """
+        super().backstep()
+        if self._counting:
+            self._count(self.mu.schedule(), 1, -1)
+
+    def seek(self, n):
+        """ Step the machine's rotors `n` positions forward at once. """
+        schedule = self.mu.schedule()
+        super().seek(n)
+        if self._counting:
+            self._count(schedule, n, 1)
+
+    def rewind(self, n):
+        """ Step the machine's rotors `n` positions backward at once. """
+        super().rewind(n)
+        if self._counting:
+            self._count(self.mu.schedule(), n, -1)
+
+    def keystream(self, n):
+        """Return the key for the next `n` characters, stepping the machine's
+        rotors `n` positions forward.
+        """
+
+        schedule = self.mu.schedule()
+        key = super().keystream(n)
+        if self._counting:
+            self.characters += n
+            self._count(schedule, n, 1)
+        return key
+
+    def reverse_keystream(self, n):
+        """Return the key for the `n` characters before the current position,
+        stepping the machine's rotors `n` positions backward.
+
+        The rotors are moved to and fro in producing the key, but only the
+        `n` steps backward are counted.
+        """
+
+        self._counting = False
+        try:
+            key = super().reverse_keystream(n)
+        finally:
+            self._counting = True
+
+        self.characters += n
+        self._count(self.mu.schedule(), n, -1)
+        return key
+
+    def feed(self, stream):
+        """Feed a stream of information into the machine, using Lorenz
+        to generate the key.
+
+        The time taken by the call is added to the `.timings` histogram. The
+        machine is stepped in bulk, so the counters are updated from the
+        precomputed schedule of the motor rather than once per character.
+        """
+
+        start = time.perf_counter()
+        output = super().feed(stream)
+        self.timings.record(time.perf_counter() - start)
+        return output
+
+    def feed_backward(self, stream):
+        """Feed a stream of information that ends at the machine's current
+        position, stepping the machine back to where the stream began.
+
+        As for `.feed()`, the time taken by the call is added to the
+        `.timings` histogram.
+        """
+
+        start = time.perf_counter()
+        output = super().feed_backward(stream)
+        self.timings.record(time.perf_counter() - start)
+        return output
+
+    def revolutions(self):
+        """Return a dictionary mapping the name of each rotor (`chi1`, ...,
+        `psi1`, ..., `mu1`, ...) to the number of complete revolutions it has
+        made since the counters were last reset.
+
+        The rotors of the MotorSet are numbered in the order they are passed
+        to it, so for the standard patterns `mu1` is the 61-cam rotor.
+        """
+
+        moves = {
+            "chi": [self._moves["chi"]] * len(self.chi.rotors),
+            "psi": [self._moves["psi"]] * len(self.psi.rotors),
+            "mu": self._moves["mu"],
+        }
+
+        revolutions = {}
+        for group in ["chi", "psi", "mu"]:
+            rotors = getattr(self, group).rotors
+            for i, (rotor, start) in enumerate(
+                zip(rotors, self._starts[group])
+            ):
+                revolutions[f"{group}{i + 1}"] = (
+                    start + moves[group][i]
+                ) // len(rotor.pins)
+
+        return revolutions
+
+    def metrics(self):
+        """ Return a snapshot of all counters and timings. """
+        elapsed = self.timings.total
+        return {
+            "characters": self.characters,
+            "steps": self.steps,
+            "psi_advances": self.psi_advances,
+            "motor_stops": self.motor_stops,
+            "motor_stop_ratio": (
+                self.motor_stops / self.steps if self.steps else 0.0
+            ),
+            "throughput": self.characters / elapsed if elapsed else 0.0,
+            "revolutions": self.revolutions(),
+            "feed": self.timings.summary(),
+        }
+
+    def reset(self):
+        """Reset all counters and timings; revolutions are subsequently
+        counted from the rotors' current positions.
+        """
+
+        self.characters = 0
+        self.steps = 0
+        self.psi_advances = 0
+        self.motor_stops = 0
+        self.timings = Histogram()
+
+        # The net number of moves of each group of rotors (backward moves
+        # counting against forward ones), from which revolutions are counted.
+        self._moves = {"chi": 0, "psi": 0, "mu": [0] * len(self.mu.rotors)}
+        self._starts = {
+            group: [rotor.position for rotor in getattr(self, group).rotors]
+            for group in ["chi", "psi", "mu"]
+        }
+
+    def _count(self, schedule, n, direction):
+        """Count `n` steps, forward (if `direction` is 1) or backward (if it is
+        -1), over which the motor begins (or, backward, ends) at the position
+        of the given schedule.
+        """
+
+        advances = schedule.advances(n)
+
+        self.steps += n
+        self.psi_advances += advances
+        self.motor_stops += n - advances
+
+        self._moves["chi"] += direction * n
+        self._moves["psi"] += direction * advances
+        moves = self._moves["mu"]
+        for i, count in enumerate(schedule.moves(n)):
+            moves[i] += direction * count
+
+    @classmethod
+    def from_machine(cls, machine):
+        """Create an instrumented machine sharing the rotors (and therefore
+        the state) of an existing SZ40.
+        """
+
+        instrumented = cls.__new__(cls)
+        instrumented.chi = machine.chi
+        instrumented.psi = machine.psi
+        instrumented.mu = machine.mu
+        instrumented.backend = machine.backend
+        instrumented._counting = True
+        instrumented.reset()
+        return instrumented
+
+    def __init__(self, rotors, positions=None, backend=None):
+        """Create an instrumented Lorenz SZ-40 machine.
+
+        The parameters are those of `SZ40.__init__()`.
+        """
+
+        super().__init__(rotors, positions=positions, backend=backend)
+
+        # Whether the motion of the rotors is counted; it is not while a bulk
+        # operation moves them back and forth internally.
+        self._counting = True
+        self.reset()
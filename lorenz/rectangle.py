@@ -0,0 +1,430 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# rectangle.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+""" Breaks the cam patterns of a pair of Chi rotors by "rectangling", pooling
+the evidence of many messages.
+
+As for the "1+2 break-in" (see `lorenz.search`), the sum of two impulses of the
+delta-ciphertext, say dZ1 + dZ2, agrees with dX1 + dX2 more often than chance.
+A rectangle tallies dZ1 + dZ2 over every pair of positions of the two Chi
+rotors: each cell holds the number of dots less the number of crosses counted
+there, so that the sign of a cell estimates dX1 + dX2 at that pair of
+positions. "Converging" the rectangle then finds the delta-patterns of the two
+rotors that best agree with it.
+
+A single message rarely fills a 41 x 31 rectangle, but the cam patterns were
+unchanged across the many messages of a period, so their rectangles may be
+pooled. Their starts are unknown, so each message is tallied in its own frame,
+then aligned against the patterns converged so far and added to the pool at
+the best alignment. Pools that share a frame (that is, that were aligned
+against the same patterns) merge by simple addition, so the messages can be
+divided amongst parallel workers. Only the pool and one message are held at a
+time, so arbitrarily many messages can be processed in bounded memory.
+"""
+import math
+import multiprocessing
+import os
+from collections import namedtuple
+from itertools import islice
+from operator import mul
+
+from lorenz.bits import BitPlaneStream
+from lorenz.checkpoint import Checkpointer
+from lorenz.checkpoint import fingerprint
+
+SIZES = [41, 31, 29, 26, 23]
+
+# The delta-patterns found for each rotor (as lists of bits), their cam
+# patterns (found by integrating the deltas, with the first cam a dot), and
+# the proportion of the pooled evidence with which the patterns agree.
+Patterns = namedtuple("Patterns", ["delta", "cams", "agreement"])
+
+
+def _signs(bits):
+    """ Map bits to signs; a dot (0) is +1 and a cross (1) is -1. """
+    return [1 - 2 * bit for bit in bits]
+
+
+def _rotate(values, k):
+    k %= len(values)
+    return values[k:] + values[:k]
+
+
+def integrate(delta):
+    """Return the cam pattern of a rotor from its delta-pattern, taking the
+    first cam to be a dot. The delta-pattern must have an even number of
+    crosses.
+    """
+
+    if sum(delta) % 2:
+        raise ValueError(
+            "a delta-pattern must have an even number of crosses."
+        )
+
+    cams = [0]
+    for bit in delta[:-1]:
+        cams.append(cams[-1] ^ bit)
+    return cams
+
+
+class Rectangle:
+    """ A pooled tally of the delta-ciphertext over a pair of Chi rotors. """
+
+    def tally(self, ciphertext):
+        """Tally a single message in its own frame; that is, as though both
+        rotors started at zero. Returns the rows of the message's rectangle.
+        """
+
+        a, b = self.rotors
+        planes = BitPlaneStream.from_stream(ciphertext).delta()
+        n = len(planes)
+
+        # Cell (i, j) collects the characters t with t = i (mod the first
+        # size) and t = j (mod the second), which are those congruent to a
+        # single residue modulo the product of the sizes.
+        bits = format(planes.combine(a, b), f"0{n}b")[::-1] if n else ""
+        period = self.sizes[0] * self.sizes[1]
+
+        rows = [[0] * self.sizes[1] for _ in range(self.sizes[0])]
+        for residue in range(min(period, n)):
+            column = bits[residue::period]
+            rows[residue % self.sizes[0]][residue % self.sizes[1]] = len(
+                column
+            ) - 2 * column.count("1")
+        return rows
+
+    def align(self, rows, delta):
+        """Find the starts at which a message's rectangle best agrees with the
+        given delta-patterns, returning the starts and the number of standard
+        deviations by which their agreement exceeds that of the others.
+        """
+
+        first, second = map(_signs, delta)
+        m, n = self.sizes
+
+        # v[k][i] is the agreement of row i with the second rotor started at
+        # k; the agreement of the whole at starts (j, k) is then the sum of
+        # v[k] against the first rotor started at j.
+        v = []
+        for k in range(n):
+            column = _rotate(second, k)
+            v.append([sum(map(mul, row, column)) for row in rows])
+
+        scores = []
+        for j in range(m):
+            row = _rotate(first, j)
+            for k in range(n):
+                scores.append((sum(map(mul, row, v[k])), (j, k)))
+
+        best, starts = max(scores)
+        mean = sum(score for score, _ in scores) / len(scores)
+        variance = sum((score - mean) ** 2 for score, _ in scores)
+        deviation = math.sqrt(variance / len(scores))
+
+        return starts, (best - mean) / deviation if deviation else 0.0
+
+    def add(self, rows, starts=(0, 0)):
+        """ Add a message's rectangle to the pool, at the given starts. """
+        m, n = self.sizes
+        j, k = starts
+        for i, row in enumerate(rows):
+            pooled = self.rows[(i + j) % m]
+            for l, value in enumerate(row):
+                pooled[(l + k) % n] += value
+        self.messages += 1
+
+    def feed(self, ciphertext, delta=None, threshold=4.0):
+        """Tally a message and add it to the pool, aligned against the given
+        delta-patterns. Messages whose alignment is less significant than the
+        threshold (in standard deviations) are not pooled. Returns whether
+        the message was pooled.
+
+        If no delta-patterns are given, the message is pooled at starts of
+        zero; this is used to found the pool's frame.
+        """
+
+        rows = self.tally(ciphertext)
+        if delta is None:
+            self.add(rows)
+            return True
+
+        starts, sigma = self.align(rows, delta)
+        if sigma < threshold:
+            self.skipped += 1
+            return False
+
+        self.add(rows, starts)
+        return True
+
+    def merge(self, other):
+        """ Add another pool, in the same frame, to this one. """
+        if (self.rotors, self.sizes) != (other.rotors, other.sizes):
+            raise ValueError("cannot merge rectangles of different rotors.")
+
+        for pooled, row in zip(self.rows, other.rows):
+            for l, value in enumerate(row):
+                pooled[l] += value
+        self.messages += other.messages
+        self.skipped += other.skipped
+        return self
+
+    def converge(self, iterations=20):
+        """Find the delta-patterns of the two rotors that best agree with the
+        pool, returning the Patterns.
+
+        Starting from the signs of a row, each rotor's pattern is in turn
+        chosen to agree best with the other's, until neither changes. This is
+        repeated from every row, and the patterns agreeing best are kept.
+        """
+
+        rows = self.rows
+        columns = [list(column) for column in zip(*rows)]
+
+        def sign(value):
+            return 1 if value >= 0 else -1
+
+        best = None
+        for strongest in rows:
+            second = [sign(value) for value in strongest]
+            first = None
+
+            for _ in range(iterations):
+                previous = (first, second)
+                first = [sign(sum(map(mul, row, second))) for row in rows]
+                second = [
+                    sign(sum(map(mul, column, first))) for column in columns
+                ]
+                if (first, second) == previous:
+                    break
+
+            agreement = sum(
+                sum(map(mul, column, first)) * s
+                for column, s in zip(columns, second)
+            )
+            if best is None or agreement > best[0]:
+                best = (agreement, first, second)
+
+        _, first, second = best
+
+        # The rectangle cannot tell the patterns from their complements, but
+        # the delta-pattern of a rotor has an even number of crosses, and
+        # complementing the pattern of an odd-sized rotor changes its parity.
+        # If the evidence still gives an odd number, the least certain cam is
+        # wrong.
+        odd = [pattern.count(-1) % 2 for pattern in (first, second)]
+        parities = [size % 2 for size in self.sizes]
+        if sum(o ^ p for o, p in zip(odd, parities)) < sum(odd):
+            first = [-sign for sign in first]
+            second = [-sign for sign in second]
+
+        signs = []
+        for pattern, lines, other in [
+            (first, rows, second),
+            (second, columns, first),
+        ]:
+            if pattern.count(-1) % 2:
+                evidence = [abs(sum(map(mul, line, other))) for line in lines]
+                weakest = evidence.index(min(evidence))
+                pattern = list(pattern)
+                pattern[weakest] = -pattern[weakest]
+            signs.append(pattern)
+
+        delta = [[(1 - sign) // 2 for sign in pattern] for pattern in signs]
+
+        total = sum(sum(map(abs, row)) for row in rows)
+        agreement = sum(
+            sign * sum(map(mul, row, signs[1]))
+            for sign, row in zip(signs[0], rows)
+        )
+
+        return Patterns(
+            delta,
+            [integrate(pattern) for pattern in delta],
+            (1 + agreement / total) / 2 if total else 0.5,
+        )
+
+    def __init__(self, rotors=(1, 2)):
+        """Create an empty Rectangle.
+
+        rotors
+            The (one-indexed) pair of Chi rotors whose patterns are sought.
+        """
+
+        rotors = tuple(rotors)
+        if len(rotors) != 2 or len(set(rotors)) != 2:
+            raise ValueError("a rectangle is formed from two rotors.")
+        if not set(rotors) <= set(range(1, 6)):
+            raise ValueError(f"illegal rotors {rotors}.")
+
+        self.rotors = rotors
+        self.sizes = [SIZES[r - 1] for r in rotors]
+        self.rows = [[0] * self.sizes[1] for _ in range(self.sizes[0])]
+
+        # The number of messages pooled, and of those rejected for aligning
+        # too weakly.
+        self.messages = 0
+        self.skipped = 0
+
+
+def _pool(arguments):
+    """ Pool a batch of messages against fixed delta-patterns. """
+    ciphertexts, rotors, delta, threshold = arguments
+    rectangle = Rectangle(rotors)
+    for ciphertext in ciphertexts:
+        rectangle.feed(ciphertext, delta, threshold)
+    return rectangle
+
+
+def break_wheels(
+    ciphertexts,
+    rotors=(1, 2),
+    delta=None,
+    found=50,
+    rounds=10,
+    threshold=4.0,
+    processes=1,
+    batch=256,
+    checkpoint=None,
+    every=60.0,
+):
+    """Break the cam patterns of a pair of Chi rotors from many messages,
+    returning the Patterns and the pooled Rectangle.
+
+    ciphertexts
+        An iterable of ciphertexts (each a list of five-bit integers), which is
+        consumed once. For example, the ciphertexts of a corpus may be given
+        as `(record.ciphertext for record in corpus.read(paths))`.
+
+    rotors
+        The (one-indexed) pair of Chi rotors whose patterns are sought.
+
+    delta
+        Approximate delta-patterns of the rotors, if any are known. Otherwise,
+        the first message founds the pool's frame.
+
+    found, rounds
+        The number of messages held in memory to found the pool, and the most
+        rounds in which they are realigned against the patterns converged
+        from them, before the rest are pooled in bulk.
+
+    threshold
+        The least significance (in standard deviations) of a message's
+        alignment for it to be pooled.
+
+    processes
+        The number of worker processes among which the bulk of the messages
+        are divided.
+
+    batch
+        The number of messages given to a worker at a time.
+
+    checkpoint
+        If given, the path of a file to which the pool is written (at most
+        once every `every` seconds) as the messages are pooled in bulk. If
+        the file holds a checkpoint of this same search, and the same
+        messages are given again, those already pooled are skipped, and the
+        same Patterns are returned as though it had never been interrupted.
+    """
+
+    ciphertexts = iter(ciphertexts)
+    founding = Rectangle(rotors)
+    tallies = [founding.tally(c) for c in islice(ciphertexts, found)]
+    if not tallies:
+        raise ValueError("no messages were given.")
+    if rounds < 1:
+        raise ValueError("the pool must be founded in at least one round.")
+
+    width = processes or os.cpu_count()
+
+    checkpointer = None
+    state = None
+    if checkpoint is not None:
+        key = fingerprint(
+            tallies, rotors, delta, rounds, threshold, width, batch
+        )
+        checkpointer = Checkpointer(checkpoint, key, every)
+        state = checkpointer.load()
+
+    # The number of messages taken from `ciphertexts` after the first few.
+    consumed = 0
+    if state is not None:
+        # Resume from the pool as it was checkpointed, skipping the messages
+        # already pooled.
+        consumed = state["consumed"]
+        delta = state["delta"]
+        rectangle = Rectangle(rotors)
+        rectangle.rows = state["rows"]
+        rectangle.messages = state["messages"]
+        rectangle.skipped = state["skipped"]
+        for _ in islice(ciphertexts, consumed):
+            pass
+    else:
+        # Found the pool on the first few messages, held in memory: the first
+        # message fixes the frame (unless patterns are given), then the rest
+        # are aligned against the patterns converged so far, and all are
+        # realigned until their alignments settle.
+        if delta is None:
+            founding.add(tallies[0])
+            delta = founding.converge().delta
+
+        alignments = None
+        for _ in range(rounds):
+            current = [founding.align(rows, delta) for rows in tallies]
+            if current == alignments:
+                break
+            alignments = current
+
+            rectangle = Rectangle(rotors)
+            for rows, (starts, sigma) in zip(tallies, alignments):
+                if sigma >= threshold:
+                    rectangle.add(rows, starts)
+                else:
+                    rectangle.skipped += 1
+            if rectangle.messages:
+                delta = rectangle.converge().delta
+
+    # Pool the rest in batches, a round of batches at a time, so that only
+    # those batches are held in memory; the patterns are reconverged on the
+    # growing pool after each round.
+    def batches():
+        while True:
+            chunk = list(islice(ciphertexts, batch))
+            if not chunk:
+                return
+            yield (chunk, rotors, delta, threshold)
+
+    work = batches()
+    pool = multiprocessing.Pool(processes) if processes != 1 else None
+    try:
+        while True:
+            chunks = list(islice(work, width))
+            for pooled in (pool.map if pool else map)(_pool, chunks):
+                rectangle.merge(pooled)
+            consumed += sum(len(chunk[0]) for chunk in chunks)
+            if chunks:
+                delta = rectangle.converge().delta
+
+            if checkpointer is not None and (checkpointer.due() or not chunks):
+                checkpointer.save(
+                    {
+                        "consumed": consumed,
+                        "delta": delta,
+                        "rows": rectangle.rows,
+                        "messages": rectangle.messages,
+                        "skipped": rectangle.skipped,
+                    }
+                )
+
+            if not chunks:
+                break
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    return rectangle.converge(), rectangle
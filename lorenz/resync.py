@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# resync.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+""" Decrypts ciphertext which has suffered transmission errors.
+
+When a character of the ciphertext is lost (or an extra character is received)
+every subsequent character is decrypted with the wrong key, and a straight
+decrypt turns to garbage. The decryption here proceeds window by window,
+scoring each window of plaintext against a `LanguageModel`. When a window
+scores like random characters, the offsets of the key near the current one
+are tried at every split point within the window, and the decrypt continues
+from whichever realigns the plaintext.
+
+The key is generated in bulk once, and is indexed directly at any offset, so
+each resynchronization costs time proportional only to the window and the
+number of offsets tried, rather than to the length of the message.
+"""
+from collections import namedtuple
+from itertools import accumulate
+
+from lorenz.language import LanguageModel
+from lorenz.machines import SZ40
+
+# A loss of synchronization. `position` is the index of the ciphertext at
+# which the error was located, and `shift` is the number of characters dropped
+# from the ciphertext there (or, if negative, the number inserted.)
+SyncError = namedtuple("SyncError", ["position", "shift"])
+
+# The result of a decryption: the plaintext (one character for each character
+# of the ciphertext), the located errors, and a list of (start, end) spans of
+# the ciphertext that could not be read.
+Decrypt = namedtuple("Decrypt", ["plaintext", "errors", "unreadable"])
+
+
+class _Key:
+    """ The keystream of a machine, generated in bulk as it is needed. """
+
+    def __getitem__(self, i):
+        if i >= len(self.key):
+            needed = i + 1 - len(self.key)
+            self.key.extend(self.machine.keystream(max(needed, 4096)))
+
+        return self.key[i]
+
+    def __init__(self, machine):
+        self.machine = machine
+        self.key = []
+
+
+def decrypt(
+    ciphertext, rotors, positions=None, model=None, window=32, radius=4
+):
+    """Decrypt a ciphertext, resynchronizing the key after any characters
+    that were dropped or inserted in transmission.
+
+    ciphertext
+        The ciphertext, as a list of five-bit integers.
+
+    rotors, positions
+        The settings of the machine, as for `SZ40.__init__()`.
+
+    model
+        The LanguageModel used to score the plaintext. By default, a model of
+        English is used.
+
+    window
+        The number of characters scored at a time. Longer windows make false
+        detections rarer, but locate errors less quickly.
+
+    radius
+        The greatest number of characters that may be dropped or inserted at
+        a single error.
+
+    Returns a Decrypt tuple.
+    """
+
+    if window < 2:
+        raise ValueError(f"illegal window {window}.")
+
+    if radius < 1:
+        raise ValueError(f"illegal radius {radius}.")
+
+    model = model or LanguageModel.english()
+    threshold = model.threshold()
+
+    key = _Key(SZ40(rotors, positions=positions))
+    n = len(ciphertext)
+
+    def plain(start, end, offset):
+        return [ciphertext[t] ^ key[t + offset] for t in range(start, end)]
+
+    def readable(stream):
+        return model.score(stream) >= threshold
+
+    plaintext = []
+    errors = []
+    unreadable = []
+
+    offset = 0
+    t = 0
+    anchor = 0
+    resynchronized = False
+
+    while t < n:
+        end = min(t + window, n)
+        segment = plain(t, end, offset)
+
+        # Windows at the very end of the message are too short to be scored
+        # reliably, and the window following a resynchronization has already
+        # been scored.
+        if resynchronized or end - t < window // 2 or readable(segment):
+            plaintext.extend(segment)
+            t = end
+            resynchronized = False
+            continue
+
+        # The error may lie a little before this window, as a few garbled
+        # characters need not spoil the window in which they fall. So try
+        # every split point from the previous window onwards (but not before
+        # the last error), and every nearby offset after it. The scores of
+        # each offset over the region are prefix-summed, so each candidate is
+        # scored in constant time.
+        start = max(anchor, t - window)
+        region = min(t + 2 * window, n)
+        offsets = [
+            o
+            for o in range(offset - radius, offset + radius + 1)
+            if start + o >= 0
+        ]
+        sums = {
+            o: list(
+                accumulate(model.scores(plain(start, region, o)), initial=0)
+            )
+            for o in offsets
+        }
+
+        best = None
+        for p in range(start, end):
+            for o in offsets:
+                if o == offset:
+                    continue
+
+                total = (
+                    sums[offset][p - start]
+                    + sums[o][region - start]
+                    - sums[o][p - start]
+                )
+                if best is None or total > best[0]:
+                    best = (total, p, o)
+
+        if best is not None:
+            _, p, o = best
+            after = min(p + window, n)
+            if not readable(plain(p, after, o)):
+                best = None
+
+        if best is None:
+            plaintext.extend(segment)
+            unreadable.append((t, end))
+            t = end
+            anchor = end
+            continue
+
+        _, p, o = best
+        del plaintext[p:]
+        plaintext.extend(plain(len(plaintext), p, offset))
+        errors.append(SyncError(p, o - offset))
+
+        offset = o
+        t = p
+        anchor = p
+        resynchronized = True
+
+    return Decrypt(plaintext, errors, unreadable)
@@ -12,6 +12,8 @@ of the rotors and rotor groups in the Lorenz machine.
 These types can be combined in unique ways to create "customized" versions of
 the Lorenz machine.
 """
+from lorenz import backends
+from lorenz.schedule import MotorSchedule
 
 
 class Rotor:
@@ -29,6 +31,10 @@ class Rotor:
         """ Get the active bit of this rotor. """
         return self.pins[self.position]
 
+    def __len__(self):
+        """ Get the number of cams on this rotor. """
+        return len(self.pins)
+
     def __init__(self, pins, position=0):
         """Create a Rotor.
 
@@ -77,7 +83,16 @@ class RotorSet:
     def backstep(self):
         """ Step the RotorSet backwards. """
         for rotor in self.rotors:
-            rotor.step()
+            rotor.backstep()
+
+    def seek(self, n):
+        """ Step the RotorSet `n` positions forwards at once. """
+        for rotor in self.rotors:
+            rotor.position = (rotor.position + n) % len(rotor.pins)
+
+    def rewind(self, n):
+        """ Step the RotorSet `n` positions backwards at once. """
+        self.seek(-n)
 
     def state(self):
         """Return an n-bit (n being the number of rotors in this RotorSet)
@@ -93,6 +108,20 @@ class RotorSet:
             state = (state << 1) | rotor.state()
         return state
 
+    def states(self, n, backend=None):
+        """Return a list of the states (as returned by `.state()`) of this
+        RotorSet at each of its next `n` positions, without stepping it.
+
+        backend
+            The backend (or its name) to use; see `lorenz.backends`.
+        """
+
+        return backends.get(backend).states(
+            [rotor.pins for rotor in self.rotors],
+            [rotor.position for rotor in self.rotors],
+            n,
+        )
+
     def sizes(self):
         """ Get the sizes of the rotors in this RotorSet. """
         return [len(rotor) for rotor in self.rotors]
@@ -168,6 +197,29 @@ class MotorSet:
                 rotor.backstep()
             flag = bool(rotor.state())
 
+    def seek(self, n):
+        """ Step the MotorSet `n` positions forwards at once. """
+        positions = self.schedule().positions(n)
+        for rotor, position in zip(self.rotors, positions):
+            rotor.position = position
+
+    def rewind(self, n):
+        """Step the MotorSet `n` positions backwards at once.
+
+        Stepping a MotorSet permutes its states, so its current state lies on
+        a cycle of its schedule, which can be followed backwards as easily as
+        forwards.
+        """
+
+        self.seek(-n)
+
+    def schedule(self):
+        """Return the precomputed `MotorSchedule` of this MotorSet, starting
+        from its current position.
+        """
+
+        return MotorSchedule.of(self)
+
     def state(self):
         """ Get the state of the MotorSet. """
         return self.rotors[-1].state()
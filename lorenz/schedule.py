@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# schedule.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+""" Precomputes the full-period motion of a `MotorSet`.
+
+Stepping a MotorSet is a permutation of its (finite) set of states, so from any
+start the motor eventually returns to where it began. For the SZ40 this period
+is 61 * 37 = 2257 steps, unless the number of raised cams on the 61-cam rotor
+is a multiple of 37.
+
+A `MotorSchedule` records, once per motor pattern, whether the motor is raised
+(and therefore whether the Psi rotors advance) at every step of such a cycle;
+afterwards the number of Psi advances over any span of steps, and the position
+of the motor after any number of steps, are lookups rather than simulations.
+"""
+import functools
+from itertools import accumulate
+
+from lorenz.bits import mask
+from lorenz.bits import pack
+from lorenz.bits import popcount
+
+# Prefix-sum checkpoints are stored every STRIDE steps of the cycle.
+STRIDE = 64
+
+
+class Cycle:
+    """The cycle of states visited by a motor with a particular pattern.
+
+    Every state on the cycle is assigned an index; the cycle is shared between
+    all schedules whose starting state lies upon it.
+    """
+
+    def count(self, end):
+        """ Count the raised steps at indices [0, end) of the cycle. """
+        chunk, offset = divmod(end, STRIDE)
+        window = (self.bits >> (chunk * STRIDE)) & mask(offset)
+        return self.checkpoints[chunk] + popcount(window)
+
+    def advances(self, index, n):
+        """Count the raised steps among the `n` steps beginning at index
+        `index` of the cycle.
+        """
+
+        cycles, n = divmod(n, self.period)
+        total = cycles * self.total
+
+        end = index + n
+        if end <= self.period:
+            return total + self.count(end) - self.count(index)
+
+        return (
+            total
+            + self.total
+            - self.count(index)
+            + self.count(end - self.period)
+        )
+
+    def moves(self, index, n):
+        """Return the number of times each rotor of the motor moves during the
+        `n` steps beginning at index `index` of the cycle.
+        """
+
+        cycles, n = divmod(n, self.period)
+
+        moves = []
+        for cumulative in self.cumulative:
+            total = cycles * cumulative[-1]
+
+            end = index + n
+            if end <= self.period:
+                total += cumulative[end] - cumulative[index]
+            else:
+                total += (
+                    cumulative[-1]
+                    - cumulative[index]
+                    + cumulative[end - self.period]
+                )
+
+            moves.append(total)
+
+        return moves
+
+    def stream(self, index, n):
+        """Return a list of `n` bits, indicating whether the motor is raised at
+        each step beginning at index `index` of the cycle.
+        """
+
+        if self._sequence is None:
+            sequence = []
+            for bit, length in self.runs:
+                sequence.extend([bit] * length)
+            self._sequence = sequence
+
+        rotated = self._sequence[index:] + self._sequence[:index]
+        return (rotated * -(-n // self.period))[:n]
+
+    def __init__(self, pins, start):
+        """Trace the cycle of a motor from a given state.
+
+        pins
+            A tuple containing the cam patterns of the rotors in the motor,
+            each expressed as a tuple of bits, in the order used by MotorSet.
+
+        start
+            A tuple containing the positions of the rotors.
+        """
+
+        sizes = [len(rotor) for rotor in pins]
+
+        states = []
+        raised = []
+        moved = []
+
+        state = start
+        while True:
+            states.append(state)
+            raised.append(pins[-1][state[-1]])
+
+            # Within a MotorSet, the first rotor always steps and each
+            # subsequent rotor steps when its predecessor is raised.
+            steps = [1] + [
+                pins[i - 1][state[i - 1]] for i in range(1, len(pins))
+            ]
+            moved.append(steps)
+
+            state = tuple(
+                (position + step) % size
+                for position, step, size in zip(state, steps, sizes)
+            )
+
+            if state == start:
+                break
+
+        self.period = len(states)
+        self.states = states
+        self.index = {state: i for i, state in enumerate(states)}
+
+        # The raised steps are stored as a packed bit array, with prefix sums at
+        # every STRIDE steps, and also as a run-length encoding.
+        self.bits = pack(raised)
+        self.total = sum(raised)
+        self.checkpoints = [0] + list(
+            accumulate(
+                sum(raised[i : i + STRIDE])
+                for i in range(0, self.period, STRIDE)
+            )
+        )
+
+        self.runs = []
+        for bit in raised:
+            if self.runs and self.runs[-1][0] == bit:
+                self.runs[-1][1] += 1
+            else:
+                self.runs.append([bit, 1])
+        self.runs = [tuple(run) for run in self.runs]
+
+        # The number of moves made by each rotor before every index.
+        self.cumulative = [
+            list(accumulate((steps[i] for steps in moved), initial=0))
+            for i in range(len(pins))
+        ]
+
+        self._sequence = None
+
+
+@functools.lru_cache(maxsize=256)
+def _cycles(pins):
+    """Return the registry of cycles already traced for a motor pattern, which
+    maps each known state to its cycle.
+    """
+
+    return {}
+
+
+class MotorSchedule:
+    """The precomputed motion of a motor from a particular starting state.
+
+    Schedules for motors with the same pattern share their underlying `Cycle`,
+    so constructing a schedule for a previously-seen pattern is cheap.
+    """
+
+    def advances(self, n):
+        """ Count the number of Psi advances during the next `n` steps. """
+        return self.cycle.advances(self.index, n)
+
+    def positions(self, n):
+        """ Return the positions of the motor's rotors after `n` steps. """
+        return list(self.cycle.states[(self.index + n) % self.cycle.period])
+
+    def moves(self, n):
+        """ Return the number of moves made by each rotor in `n` steps. """
+        return self.cycle.moves(self.index, n)
+
+    def stream(self, n):
+        """Return a list of `n` bits indicating whether the Psi rotors advance
+        at each of the next `n` steps.
+        """
+
+        return self.cycle.stream(self.index, n)
+
+    @classmethod
+    def of(cls, motor):
+        """ Return the schedule of a MotorSet from its current position. """
+        return cls(
+            [rotor.pins for rotor in motor.rotors],
+            [rotor.position for rotor in motor.rotors],
+        )
+
+    def __init__(self, pins, positions):
+        """Create a MotorSchedule.
+
+        pins
+            The cam patterns of the rotors in the motor, in the order used by
+            MotorSet.
+
+        positions
+            The starting positions of the rotors in the motor.
+        """
+
+        pins = tuple(tuple(rotor) for rotor in pins)
+        state = tuple(
+            position % len(rotor) for rotor, position in zip(pins, positions)
+        )
+
+        cycles = _cycles(pins)
+        if state not in cycles:
+            cycle = Cycle(pins, state)
+            for s in cycle.states:
+                cycles[s] = cycle
+
+        self.cycle = cycles[state]
+        self.index = self.cycle.index[state]
@@ -0,0 +1,549 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# search.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+""" Searches for the start positions of the Chi rotors, in the manner of the
+Colossus "1+2 break-in".
+
+For the correct starts of, say, the first two Chi rotors, the sum of the first
+two impulses of the delta-ciphertext and the delta-Chi,
+
+    dZ1 + dZ2 + dX1 + dX2 = dP1 + dP2 + dS'1 + dS'2,
+
+is a dot more often than chance, as the delta-Psi' and (to a lesser extent) the
+delta-plaintext are both biased towards dots. A search counts these dots for
+every candidate setting, and ranks the candidates by how far their count
+exceeds the number expected of a wrong setting.
+"""
+import math
+from collections import namedtuple
+from itertools import compress
+from itertools import product
+from operator import add
+
+from lorenz import backends
+from lorenz.bits import BitPlaneStream
+from lorenz.bits import mask
+from lorenz.cache import delta_tables
+from lorenz.checkpoint import Checkpointer
+from lorenz.checkpoint import fingerprint
+
+# A candidate setting, giving the starts of the searched rotors (in the order
+# in which they were specified), the number of dots counted, and the number of
+# standard deviations by which that count exceeds chance.
+Setting = namedtuple("Setting", ["starts", "count", "sigma"])
+
+
+class SequentialTest:
+    """A sequential probability ratio test, used to abandon the candidates of
+    a search that are clearly wrong before the whole message is counted.
+
+    The candidates are counted together, a block of characters at a time.
+    After each block, the log-likelihood ratio of each candidate being right
+    (dots occur with probability `bias`) rather than wrong (dots occur with
+    probability one half) is tested; when it falls below Wald's lower
+    threshold, the candidate is dropped. Only the lower threshold is used: a
+    candidate that survives is counted over the whole message, so that the
+    survivors can be ranked against one another.
+
+    The ratio depends only upon the number of dots counted, so the test is
+    applied to every candidate at once as a least count of dots. Each block
+    is longer than the last by a factor of `growth`, so that most wrong
+    candidates are dropped after a few short blocks while the whole message
+    is still counted in few passes.
+    """
+
+    def least(self, n):
+        """Return the least number of dots among the first `n` characters for
+        which a candidate is kept.
+        """
+
+        # The ratio is dots * dot + (n - dots) * cross, which exceeds the
+        # threshold once dots exceeds (lower - n * cross) / (dot - cross).
+        bound = (self.lower - n * self._cross) / (self._dot - self._cross)
+        return math.floor(bound) + 1
+
+    def blocks(self, n):
+        """ Yield the (start, end) of the blocks counted in `n` characters. """
+        start, size = 0, self.block
+        while start < n:
+            end = min(start + int(size), n)
+            yield start, end
+            start, size = end, size * self.growth
+
+    def __init__(self, bias=0.55, alpha=0.01, beta=0.01, block=200, growth=2):
+        """Create a SequentialTest.
+
+        bias
+            The proportion of dots expected to be counted for the correct
+            setting.
+
+        alpha, beta
+            The error rates of Wald's test: the probabilities of keeping a
+            wrong candidate and of dropping the correct one. Since only the
+            lower threshold, log(beta / (1 - alpha)), is used, `beta` bounds
+            the chance of dropping the correct candidate, while `alpha` only
+            adjusts that threshold; wrong candidates that are not dropped are
+            counted over the whole message.
+
+        block
+            The number of characters in the first block.
+
+        growth
+            The factor by which each block is longer than the last.
+        """
+
+        if not 0.5 < bias < 1:
+            raise ValueError(f"illegal bias {bias}.")
+
+        if not (0 < alpha < 1 and 0 < beta < 1):
+            raise ValueError("error rates must lie strictly between 0 and 1.")
+
+        if block < 1:
+            raise ValueError(f"illegal block size {block}.")
+
+        if growth < 1:
+            raise ValueError(f"illegal block growth {growth}.")
+
+        self.bias = bias
+        self.alpha = alpha
+        self.beta = beta
+        self.block = block
+        self.growth = growth
+
+        self.lower = math.log(beta / (1 - alpha))
+
+        self._dot = math.log(bias / 0.5)
+        self._cross = math.log((1 - bias) / 0.5)
+
+
+class ChiSearch:
+    """ Search for the start positions of some of the Chi rotors. """
+
+    def sigma(self, count, n=None):
+        """Return the number of standard deviations by which a count of dots
+        among `n` characters (by default, the whole message) exceeds chance.
+        """
+
+        n = self.length if n is None else n
+        return (count - n / 2) / (math.sqrt(n) / 2) if n else 0.0
+
+    def run(self, test=None, limit=None, checkpoint=None, every=60.0):
+        """Count every candidate setting, returning the results ranked from
+        most to least likely.
+
+        test
+            If a SequentialTest is given, candidates are counted in blocks,
+            and those rejected by the test are dropped (and not returned.)
+            Only the surviving candidates are counted over the whole message.
+
+        limit
+            If given, only this many of the best settings are returned.
+
+        checkpoint
+            If given, the path of a file to which the progress of the search
+            is written (at most once every `every` seconds.) If the file holds
+            a checkpoint of this same search, the search resumes from it, and
+            returns the same results as though it had never been interrupted.
+        """
+
+        checkpointer = None
+        if checkpoint is not None:
+            key = fingerprint(
+                self._z,
+                self.length,
+                self.rotors,
+                self._pins,
+                None if test is None else vars(test),
+                limit,
+            )
+            checkpointer = Checkpointer(checkpoint, key, every)
+
+        if test is not None:
+            results = self._sequential(test, checkpointer)
+        elif checkpointer is not None:
+            results = self._exhaustive(checkpointer, limit)
+        else:
+            results = self._count(0, self.length)
+
+        return self.rank(results, limit)
+
+    def groups(self):
+        """Return the groups into which the candidates are divided, for
+        searches that are split into pieces. Each group is the tuple of starts
+        shared by its candidates, for all but the last rotor.
+        """
+
+        return list(product(*(range(size) for size in self.sizes[:-1])))
+
+    def count(self, groups, lo, hi):
+        """Count the candidates in groups [lo, hi) of the given list over the
+        whole message, returning a list of (starts, count) pairs.
+        """
+
+        candidates = [
+            group + (s,)
+            for group in groups[lo:hi]
+            for s in range(self.sizes[-1])
+        ]
+        return self._count(0, self.length, candidates)
+
+    def rank(self, results, limit=None):
+        """Rank a list of (starts, count) pairs as Settings, from most to
+        least likely, keeping only the best `limit` if given.
+        """
+
+        settings = [
+            Setting(starts, count, self.sigma(count))
+            for starts, count in results
+        ]
+        settings.sort(key=lambda setting: (-setting.count, setting.starts))
+        return settings[:limit] if limit is not None else settings
+
+    def _exhaustive(self, checkpointer, limit=None):
+        """Count every candidate, a group of candidates at a time, writing
+        checkpoints between groups; only the best `limit` (if given) are kept.
+        """
+
+        state = checkpointer.load() or {"done": 0, "work": 0, "results": []}
+        done = state["done"]
+        self.work = state["work"]
+        results = [
+            (tuple(starts), count) for starts, count in state["results"]
+        ]
+
+        groups = self.groups()
+        for i in range(done, len(groups)):
+            results.extend(self.count(groups, i, i + 1))
+
+            if checkpointer.due() or i == len(groups) - 1:
+                if limit is not None:
+                    results = [
+                        (setting.starts, setting.count)
+                        for setting in self.rank(results, limit)
+                    ]
+
+                checkpointer.save(
+                    {"done": i + 1, "work": self.work, "results": results}
+                )
+
+        return results
+
+    def _count(self, start, end, candidates=None):
+        """Count the dots in positions [start, end) of the delta stream for
+        each candidate (by default, every candidate), returning a list of
+        (starts, count) pairs.
+        """
+
+        z = (self._z >> start) & mask(end - start)
+        return self._tally(z, start, end, candidates)
+
+    def _tally(self, z, start, end, candidates=None):
+        """Count the dots in a packed window `z` of the delta stream, holding
+        its positions [start, end), as for `_count()`.
+        """
+
+        if candidates is None:
+            groups = self._groups()
+        else:
+            groups = {}
+            for starts in candidates:
+                groups.setdefault(starts[:-1], []).append(starts[-1])
+
+        results = []
+        for (starts, lasts), dots in zip(
+            groups.items(), self._dots(z, start, end, groups)
+        ):
+            results.extend(zip((starts + (s,) for s in lasts), dots))
+
+        return results
+
+    def _groups(self):
+        """Return every candidate, as a mapping from the starts of all but the
+        last rotor to the starts of the last.
+        """
+
+        return {
+            starts: range(self.sizes[-1])
+            for starts in product(*(range(size) for size in self.sizes[:-1]))
+        }
+
+    def _dots(self, z, start, end, groups):
+        """Count the dots in a packed window `z` of the delta stream, holding
+        its positions [start, end), for each group of candidates (a mapping as
+        given by `_groups()`), returning a list of each group's counts.
+        """
+
+        n = end - start
+
+        # The delta-Chi streams are periodic, so the window of the stream from
+        # start s beginning at `start` is the stream from start s + `start`.
+        patterns = [
+            patterns[start % size :] + patterns[: start % size]
+            for patterns, size in zip(self._windows(n), self.sizes)
+        ]
+
+        self.work += n * sum(map(len, groups.values()))
+
+        # The last rotor is handled in bulk; only the others are iterated
+        # over in Python.
+        *outer, last = patterns
+
+        results = []
+        for starts, lasts in groups.items():
+            partial = z
+            for pattern, s in zip(outer, starts):
+                partial ^= pattern[s]
+
+            crosses = self.backend.crosses(
+                partial, map(last.__getitem__, lasts)
+            )
+            results.append(list(map(n.__sub__, crosses)))
+
+        return results
+
+    def _windows(self, n):
+        """Return, for each searched rotor, the first `n` characters of its
+        delta stream from each of its starts.
+        """
+
+        if n not in self._cache:
+            self._cache[n] = delta_tables(self._pins, n, self.cache)
+
+        return self._cache[n]
+
+    def _sequential(self, test, checkpointer=None):
+        """Count the candidates block by block, dropping those rejected by the
+        sequential test, and return the survivors' (starts, count) pairs.
+        Checkpoints (if any) are written between blocks.
+        """
+
+        groups = None
+        counts = {}
+        first = 0
+
+        state = checkpointer.load() if checkpointer is not None else None
+        if state is not None:
+            first = state["start"]
+            self.work = state["work"]
+            if state["candidates"] is not None:
+                groups = {}
+                for *starts, last, count in state["candidates"]:
+                    groups.setdefault(tuple(starts), []).append(last)
+                    counts.setdefault(tuple(starts), []).append(count)
+
+        for start, end in test.blocks(self.length):
+            if start < first:
+                continue
+
+            if groups is None:
+                groups = self._groups()
+
+            # Every surviving candidate is counted over the block at once, and
+            # those falling short of the least count are dropped together.
+            least = test.least(end)
+            z = (self._z >> start) & mask(end - start)
+            survivors, totals = {}, {}
+            for (starts, lasts), dots in zip(
+                groups.items(), self._dots(z, start, end, groups)
+            ):
+                if starts in counts:
+                    dots = list(map(add, counts[starts], dots))
+
+                kept = list(map(least.__le__, dots))
+                if any(kept):
+                    survivors[starts] = list(compress(lasts, kept))
+                    totals[starts] = list(compress(dots, kept))
+
+            groups, counts = survivors, totals
+
+            finished = end == self.length or not groups
+            if checkpointer is not None and (checkpointer.due() or finished):
+                checkpointer.save(
+                    {
+                        "start": self.length if finished else end,
+                        "work": self.work,
+                        "candidates": [
+                            [*starts, count]
+                            for starts, count in self._flatten(groups, counts)
+                        ],
+                    }
+                )
+
+            if not groups:
+                break
+
+        return self._flatten(groups or {}, counts)
+
+    def _flatten(self, groups, counts):
+        """ Return the (starts, count) pairs of groups of candidates. """
+        return [
+            (starts + (s,), count)
+            for starts, lasts in groups.items()
+            for s, count in zip(lasts, counts[starts])
+        ]
+
+    def __init__(
+        self, ciphertext, chi, rotors=(1, 2), backend=None, cache=None
+    ):
+        """Prepare a search.
+
+        ciphertext
+            The ciphertext, as a list of five-bit integers.
+
+        chi
+            The cam patterns of the Chi rotors, as a list of five lists of
+            bits.
+
+        rotors
+            The (one-indexed) Chi rotors whose starts are to be found. The
+            corresponding impulses of the ciphertext are summed.
+
+        backend
+            The backend (or its name) used to count; see `lorenz.backends`.
+
+        cache
+            An ArtifactCache in which the delta streams of the Chi rotors are
+            kept between runs; see `lorenz.cache`.
+        """
+
+        if not rotors or any(not 1 <= i <= 5 for i in rotors):
+            raise ValueError(f"illegal rotors {rotors}.")
+
+        self.rotors = tuple(rotors)
+        self.sizes = [len(chi[i - 1]) for i in self.rotors]
+        self.candidates = math.prod(self.sizes)
+
+        self.backend = backends.get(backend)
+        self.cache = cache
+
+        self._pins = [chi[i - 1] for i in self.rotors]
+        self._cache = {}
+
+        # The number of (candidate, character) pairs counted so far.
+        self.work = 0
+
+        self._load(ciphertext)
+
+    def _load(self, ciphertext):
+        """ Prepare the delta stream of the ciphertext to be counted. """
+        if len(ciphertext) < 2:
+            raise ValueError("the ciphertext is too short to be searched.")
+
+        # The length of the delta stream, which is the number of characters
+        # counted for each candidate.
+        self.length = len(ciphertext) - 1
+
+        self._z = (
+            BitPlaneStream.from_stream(ciphertext)
+            .delta()
+            .combine(*self.rotors)
+        )
+
+
+# A candidate whose sigma rose to the threshold of an IncrementalChiSearch,
+# giving its starts, its sigma, and the number of characters counted.
+Crossing = namedtuple("Crossing", ["starts", "sigma", "length"])
+
+
+class IncrementalChiSearch(ChiSearch):
+    """A search whose ciphertext arrives piece by piece.
+
+    The count of every candidate is kept, and each piece is counted on its
+    own, so feeding `n` characters costs time proportional to `n` and to the
+    number of candidates, but not to the length of the ciphertext so far. Only
+    the last character of the ciphertext is kept between pieces.
+    """
+
+    def feed(self, ciphertext):
+        """Count a further piece of the ciphertext, returning a list of the
+        Crossings of the threshold that resulted.
+        """
+
+        ciphertext = list(ciphertext)
+        if self._last is not None:
+            ciphertext.insert(0, self._last)
+        if len(ciphertext) < 2:
+            self._last = ciphertext[-1] if ciphertext else self._last
+            return []
+
+        self._last = ciphertext[-1]
+
+        delta = BitPlaneStream.from_stream(ciphertext).delta()
+        start, end = self.length, self.length + delta.length
+        self.length = end
+
+        # Only the piece just added is counted; the windowed patterns for its
+        # length are dropped afterwards, as pieces vary in length.
+        z = delta.combine(*self.rotors)
+        for starts, dots in self._tally(z, start, end):
+            self.counts[starts] += dots
+        self._cache.clear()
+
+        # The count at which a candidate's sigma reaches the threshold.
+        required = self.length / 2 + self.threshold * math.sqrt(end) / 2
+
+        crossings = []
+        for starts, count in self.counts.items():
+            above = count >= required
+            if above and starts not in self._above:
+                crossings.append(
+                    Crossing(starts, self.sigma(count), self.length)
+                )
+                self._above.add(starts)
+            elif not above:
+                self._above.discard(starts)
+
+        crossings.sort(key=lambda crossing: -crossing.sigma)
+        if self.callback is not None:
+            for crossing in crossings:
+                self.callback(crossing)
+
+        return crossings
+
+    def run(self, test=None, limit=None):
+        """Return the candidate settings, ranked by their counts over the
+        ciphertext fed so far.
+        """
+
+        if test is not None:
+            raise ValueError("an incremental search cannot be sequential.")
+
+        return self.rank(self.counts.items(), limit)
+
+    def __init__(
+        self, chi, rotors=(1, 2), threshold=5.0, callback=None, backend=None
+    ):
+        """Prepare an incremental search, with no ciphertext.
+
+        chi, rotors, backend
+            As for `ChiSearch.__init__()`.
+
+        threshold
+            The sigma at which a candidate is reported.
+
+        callback
+            If given, a function called with each Crossing as it occurs.
+        """
+
+        # Pieces vary in length, so their windows are not worth caching.
+        super().__init__([], chi, rotors, backend)
+
+        self.threshold = threshold
+        self.callback = callback
+
+        # The running count of every candidate, and the candidates currently
+        # at or above the threshold.
+        self.counts = dict.fromkeys(
+            product(*(range(size) for size in self.sizes)), 0
+        )
+        self._above = set()
+
+    def _load(self, ciphertext):
+        """ Start with no ciphertext; it is counted as it is fed. """
+        self.length = 0
+        self._last = None
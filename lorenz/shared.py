@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# shared.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+""" Shares sets of cams between processes.
+
+A `SharedCams` table publishes a set of cams into a block of shared memory,
+one byte for each cam, laid out as
+
+    magic       4 bytes, b"LZCT"
+    counts      3 bytes; the number of Chi, Psi and Mu rotors
+    sizes       1 byte for each rotor
+    cams        1 byte for each cam of each rotor, in order
+
+Worker processes attach to the table by name, and their rotors read their cams
+directly from the shared block rather than from copies. The cams of each rotor
+are a `SharedPins` sequence, which behaves like a list of bits (so that tables
+can be passed to `ChiSearch`, `lorenz.cribs` or `lorenz.stats`), but whose
+slices are copied out of the block as lists. A `SharedSZ40` is
+pickled as the name of its table and the positions of its rotors, so sending a
+machine to a worker costs a few dozen bytes, however many are sent.
+"""
+from collections.abc import Sequence
+from multiprocessing import shared_memory
+
+from lorenz.machines import SZ40
+from lorenz.rotor import Rotor
+
+MAGIC = b"LZCT"
+
+_GROUPS = ["chi", "psi", "mu"]
+
+# The tables attached to by this process, by name.
+_ATTACHED = {}
+
+
+class SharedPins(Sequence):
+    """ The cams of a rotor, read from a view of a shared block. """
+
+    def release(self):
+        """ Release the view of the block. """
+        self._view.release()
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return list(self._view[i])
+        return self._view[i]
+
+    def __len__(self):
+        return len(self._view)
+
+    def __iter__(self):
+        return iter(self._view)
+
+    def __eq__(self, other):
+        if isinstance(other, Sequence) and not isinstance(other, str):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def __init__(self, view):
+        self._view = view
+
+
+class SharedCams:
+    """ A set of cams held in shared memory. """
+
+    @classmethod
+    def publish(cls, cams):
+        """Copy a set of cams (in the form accepted by `SZ40.__init__()`) into
+        a new block of shared memory, returning its table. The publishing
+        process owns the block, and should `unlink()` it when done.
+        """
+
+        counts = [len(cams[group]) for group in _GROUPS]
+        rotors = [pins for group in _GROUPS for pins in cams[group]]
+
+        if any(not 1 <= len(pins) <= 255 for pins in rotors):
+            raise ValueError("rotors must have between 1 and 255 cams.")
+
+        if any(bit not in [0, 1] for pins in rotors for bit in pins):
+            raise ValueError("cannot share non-binary cam positions.")
+
+        data = b"".join(
+            [
+                MAGIC,
+                bytes(counts),
+                bytes(len(pins) for pins in rotors),
+                bytes(bit for pins in rotors for bit in pins),
+            ]
+        )
+
+        block = shared_memory.SharedMemory(create=True, size=len(data))
+        block.buf[: len(data)] = data
+
+        table = cls(block)
+        _ATTACHED[table.name] = table
+        return table
+
+    @classmethod
+    def attach(cls, name):
+        """Attach to a published table by name. Each process attaches to a
+        given table at most once.
+        """
+
+        if name not in _ATTACHED:
+            try:
+                block = shared_memory.SharedMemory(name=name, track=False)
+            except TypeError:  # Python < 3.13
+                block = shared_memory.SharedMemory(name=name)
+
+            _ATTACHED[name] = cls(block)
+
+        return _ATTACHED[name]
+
+    def close(self):
+        """Detach this process from the block. Its cams (and the machines
+        built from them) cannot be used afterwards.
+        """
+
+        for rotors in self.cams.values():
+            for pins in rotors:
+                pins.release()
+
+        self._block.close()
+        if _ATTACHED.get(self.name) is self:
+            del _ATTACHED[self.name]
+
+    def unlink(self):
+        """Remove the block from the system. Processes that are attached may
+        continue to use it until they close it.
+        """
+
+        self._block.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        self.unlink()
+
+    def __reduce__(self):
+        return (SharedCams.attach, (self.name,))
+
+    def __init__(self, block):
+        """Wrap a block of shared memory holding a table. Use `publish()` or
+        `attach()`, rather than calling this directly.
+        """
+
+        buf = block.buf
+        if bytes(buf[:4]) != MAGIC:
+            raise ValueError(f"{block.name} does not hold a table of cams.")
+
+        counts = list(buf[4:7])
+        sizes = list(buf[7 : 7 + sum(counts)])
+
+        # Each rotor's cams are a view of the shared block, not a copy.
+        views = []
+        offset = 7 + sum(counts)
+        for size in sizes:
+            views.append(SharedPins(buf[offset : offset + size]))
+            offset += size
+
+        self.cams = {}
+        for group, count in zip(_GROUPS, counts):
+            self.cams[group], views = views[:count], views[count:]
+
+        self.name = block.name
+        self._block = block
+
+
+class SharedSZ40(SZ40):
+    """An SZ40 whose cams are read from a SharedCams table, and which pickles
+    as a reference to the table and the positions of its rotors.
+    """
+
+    def positions(self):
+        """ Return the positions of the rotors, by group. """
+        return {
+            group: [rotor.position for rotor in getattr(self, group).rotors]
+            for group in _GROUPS
+        }
+
+    def __reduce__(self):
+        return (
+            SharedSZ40,
+            (self.table.name, self.positions(), self.backend.name),
+        )
+
+    def __init__(self, table, positions=None, backend=None):
+        """Create an SZ40 from a table of shared cams.
+
+        table
+            A SharedCams table, or the name of one to attach to.
+
+        positions
+            The initial rotor positions, as for `SZ40.__init__()`.
+
+        backend
+            The backend (or its name), as for `SZ40.__init__()`.
+        """
+
+        if isinstance(table, str):
+            table = SharedCams.attach(table)
+
+        if positions is None:
+            positions = {
+                group: [0] * len(table.cams[group]) for group in _GROUPS
+            }
+
+        rotors = {}
+        for group in _GROUPS:
+            if len(positions[group]) != len(table.cams[group]):
+                raise ValueError("mismatched rotors and positions")
+
+            rotors[group] = [
+                Rotor(pins, position)
+                for pins, position in zip(table.cams[group], positions[group])
+            ]
+
+        super().__init__(rotors, backend=backend)
+        self.table = table
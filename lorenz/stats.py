@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# stats.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+""" Computes the statistics of the keystream produced by a set of cams
+directly from the cam patterns, without generating any key.
+
+The rotors of each group have coprime sizes, so over a long message the
+positions of any two rotors are independent and uniformly distributed. The
+long-run proportion of crosses in any combination of rotor streams therefore
+follows from the proportions in the individual patterns, by the "piling-up"
+rule: the bias (twice the proportion of dots, less one) of a sum of
+independent streams is the product of their biases.
+
+The streams of the Psi rotors are "extended" by the motor: during a step at
+which the Psi rotors stand still, their delta is a dot.
+"""
+import math
+from collections import namedtuple
+
+from lorenz.schedule import MotorSchedule
+
+# The statistics of a set of cams. Each of `key`, `delta_key`, `chi`,
+# `delta_chi`, `psi` and `delta_psi` gives the proportion of crosses in the
+# corresponding stream for each of the five impulses; `advance` gives the
+# proportion of steps at which the Psi rotors advance, and `run` the
+# proportion of dots expected in the count of a Chi-setting run.
+CamStatistics = namedtuple(
+    "CamStatistics",
+    [
+        "key",
+        "delta_key",
+        "chi",
+        "delta_chi",
+        "psi",
+        "delta_psi",
+        "advance",
+        "run",
+    ],
+)
+
+
+def crosses(pins):
+    """ Return the proportion of crosses in a cam pattern. """
+    return sum(pins) / len(pins)
+
+
+def delta_crosses(pins):
+    """Return the proportion of crosses in the delta of a cam pattern; that
+    is, the proportion of positions at which a cam differs from the next.
+    """
+
+    changes = sum(a != b for a, b in zip(pins, pins[1:] + pins[:1]))
+    return changes / len(pins)
+
+
+def combine(*proportions):
+    """Return the proportion of crosses in the sum of independent streams
+    with the given proportions of crosses.
+    """
+
+    bias = 1.0
+    for p in proportions:
+        bias *= 1 - 2 * p
+    return (1 - bias) / 2
+
+
+def advance_rate(mu, positions=None):
+    """Return the proportion of steps at which the Psi rotors advance.
+
+    mu
+        The cam patterns of the motor rotors, in the order used by MotorSet.
+
+    positions
+        The start positions of the motor, if the rate from a particular start
+        is wanted. Usually every start gives the same rate; see below.
+
+    For the two-rotor SZ40 motor, if the number of crosses on the first rotor
+    is coprime with the size of the second, the motor passes through every
+    one of its states in each cycle, and the rate is simply the proportion of
+    crosses on the second rotor. Otherwise, the cycle from the given start is
+    traced (once, and cached) by `MotorSchedule`.
+    """
+
+    if len(mu) == 2 and positions is None:
+        if math.gcd(sum(mu[0]), len(mu[1])) == 1:
+            return crosses(mu[1])
+
+    schedule = MotorSchedule(mu, positions or [0] * len(mu))
+    return schedule.cycle.total / schedule.cycle.period
+
+
+def run_dots(cams, rotors=(1, 2), plaintext=None, rate=None):
+    """Return the proportion of dots expected when counting the sum of the
+    delta-ciphertext and delta-Chi over the given impulses, at the correct
+    Chi setting.
+
+    This is the proportion of dots in the sum of the delta-Psi' impulses (and,
+    if `plaintext` is given as the proportion of dots in the sum of the
+    delta-plaintext impulses, of those too.)
+    """
+
+    rate = advance_rate(cams["mu"]) if rate is None else rate
+
+    # When the Psi rotors stand still, the sum is a dot; when they advance, it
+    # is the sum of the deltas of the rotors' patterns.
+    moving = combine(*(delta_crosses(cams["psi"][i - 1]) for i in rotors))
+    dots = 1 - rate * moving
+
+    if plaintext is not None:
+        dots = 1 - combine(1 - dots, 1 - plaintext)
+
+    return dots
+
+
+def expected_sigma(dots, n):
+    """Return the number of standard deviations by which the count of dots
+    over `n` characters is expected to exceed chance, if dots occur with the
+    given proportion.
+    """
+
+    return (2 * dots - 1) * math.sqrt(n)
+
+
+def statistics(cams, rotors=(1, 2), plaintext=None):
+    """ Return the CamStatistics of a set of cams. """
+    rate = advance_rate(cams["mu"])
+
+    chi = [crosses(pins) for pins in cams["chi"]]
+    delta_chi = [delta_crosses(pins) for pins in cams["chi"]]
+    psi = [crosses(pins) for pins in cams["psi"]]
+    delta_psi = [rate * delta_crosses(pins) for pins in cams["psi"]]
+
+    return CamStatistics(
+        key=[combine(x, s) for x, s in zip(chi, psi)],
+        delta_key=[combine(x, s) for x, s in zip(delta_chi, delta_psi)],
+        chi=chi,
+        delta_chi=delta_chi,
+        psi=psi,
+        delta_psi=delta_psi,
+        advance=rate,
+        run=run_dots(cams, rotors, plaintext, rate=rate),
+    )
+
+
+def evaluate(library, rotors=(1, 2), plaintext=None):
+    """Return the CamStatistics of every set of cams in a library.
+
+    library
+        Either a list of sets of cams, or a dictionary mapping names to sets
+        of cams; a list or dictionary of statistics is returned accordingly.
+    """
+
+    if isinstance(library, dict):
+        return {
+            name: statistics(cams, rotors, plaintext)
+            for name, cams in library.items()
+        }
+
+    return [statistics(cams, rotors, plaintext) for cams in library]
@@ -0,0 +1,396 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# store.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+""" Records messages, the settings found for them, and their decrypts in a
+local SQLite database, so that analysis can skip the messages it has already
+solved.
+
+A database holds three tables:
+
+    cams        each set of cams, by its hash (see `lorenz.cache.key()`),
+                with an optional name ("ZMUG") and the cams packed as by
+                `lorenz.generate.pack()`
+    messages    each ciphertext, by its fingerprint (a hash of the ciphertext)
+    decrypts    each decrypt of a message: the set of cams and the positions
+                (one byte for each rotor; Chi, then Psi, then Mu) used, its
+                score and plaintext, and its provenance (the analysis that
+                produced it, and that analysis's parameters, as JSON)
+
+Messages and decrypts are inserted in bulk (a batch to a transaction), and
+decrypts are indexed by their cams and by their message.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import namedtuple
+from itertools import islice
+
+from lorenz import cache
+from lorenz import generate
+
+# A decrypt of a message, as stored.
+Decrypt = namedtuple(
+    "Decrypt",
+    [
+        "fingerprint",
+        "cams",
+        "positions",
+        "score",
+        "plaintext",
+        "analysis",
+        "parameters",
+        "created",
+    ],
+)
+
+_ROTORS = ["chi", "psi", "mu"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cams (
+    hash TEXT PRIMARY KEY,
+    name TEXT,
+    packed BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cams_name ON cams (name);
+
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    fingerprint TEXT NOT NULL UNIQUE,
+    length INTEGER NOT NULL,
+    ciphertext BLOB NOT NULL,
+    added REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS decrypts (
+    id INTEGER PRIMARY KEY,
+    message INTEGER NOT NULL REFERENCES messages (id),
+    cams TEXT NOT NULL REFERENCES cams (hash),
+    positions BLOB NOT NULL,
+    score REAL,
+    plaintext BLOB,
+    analysis TEXT,
+    parameters TEXT,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS decrypts_cams ON decrypts (cams);
+CREATE INDEX IF NOT EXISTS decrypts_message ON decrypts (message, score);
+"""
+
+# Rows are inserted in batches of this many.
+BATCH = 10_000
+
+
+def _blob(values):
+    return None if values is None else bytes(values)
+
+
+def _json(value):
+    return None if value is None else json.dumps(value)
+
+
+def fingerprint(ciphertext):
+    """ Return a hash identifying a ciphertext. """
+    return hashlib.sha256(bytes(ciphertext)).hexdigest()
+
+
+class Store:
+    """ A database of messages, settings and decrypts. """
+
+    def add_cams(self, cams, name=None):
+        """ Record a set of cams (if it is new), returning its hash. """
+        digest = cache.key(cams)
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR IGNORE INTO cams (hash, name, packed) "
+                "VALUES (?, ?, ?)",
+                (digest, name, generate.pack(cams)),
+            )
+            if name is not None:
+                self.connection.execute(
+                    "UPDATE cams SET name = ? WHERE hash = ?", (name, digest)
+                )
+        return digest
+
+    def cams(self, name):
+        """ Return the set of cams of the given name or hash, or None. """
+        row = self.connection.execute(
+            "SELECT packed FROM cams WHERE name = ? OR hash = ?", (name, name)
+        ).fetchone()
+        return generate.unpack(row[0]) if row else None
+
+    def add_messages(self, ciphertexts):
+        """Record many ciphertexts (skipping those already recorded), and
+        return their fingerprints.
+        """
+
+        fingerprints = []
+
+        def rows():
+            now = time.time()
+            for ciphertext in ciphertexts:
+                data = bytes(ciphertext)
+                fingerprints.append(fingerprint(data))
+                yield (fingerprints[-1], len(data), data, now)
+
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO messages "
+                "(fingerprint, length, ciphertext, added) VALUES (?, ?, ?, ?)",
+                rows(),
+            )
+        return fingerprints
+
+    def add_message(self, ciphertext):
+        """ Record a ciphertext, returning its fingerprint. """
+        return self.add_messages([ciphertext])[0]
+
+    def message(self, fingerprint):
+        """ Return the ciphertext of a message, or None. """
+        row = self.connection.execute(
+            "SELECT ciphertext FROM messages WHERE fingerprint = ?",
+            (fingerprint,),
+        ).fetchone()
+        return list(row[0]) if row else None
+
+    def add_decrypts(self, decrypts):
+        """Record many decrypts, each a dictionary with the keys
+
+            ciphertext or fingerprint       the message, which is recorded
+                                            if a ciphertext is given
+            cams                            the set of cams, which is
+                                            recorded, or its hash
+            positions                       the start positions
+            score, plaintext, analysis,     optional
+            parameters
+
+        Returns the number recorded.
+        """
+
+        count = 0
+        decrypts = iter(decrypts)
+        while True:
+            batch = list(islice(decrypts, BATCH))
+            if not batch:
+                return count
+
+            # Record the messages and cams first, then the decrypts. The same
+            # set of cams is usually shared by many decrypts, so each is only
+            # hashed once.
+            fresh = iter(
+                self.add_messages(
+                    d["ciphertext"] for d in batch if "ciphertext" in d
+                )
+            )
+            keys = [
+                next(fresh) if "ciphertext" in d else d["fingerprint"]
+                for d in batch
+            ]
+            ids = self._ids(set(keys))
+
+            digests = {}
+            hashes = []
+            for d in batch:
+                cams = d["cams"]
+                if isinstance(cams, str):
+                    hashes.append(cams)
+                else:
+                    if id(cams) not in digests:
+                        digests[id(cams)] = self.add_cams(cams)
+                    hashes.append(digests[id(cams)])
+
+            now = time.time()
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT INTO decrypts (message, cams, positions, score, "
+                    "plaintext, analysis, parameters, created) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        (
+                            ids[key],
+                            digest,
+                            bytes(
+                                p
+                                for group in _ROTORS
+                                for p in d["positions"][group]
+                            ),
+                            d.get("score"),
+                            _blob(d.get("plaintext")),
+                            d.get("analysis"),
+                            _json(d.get("parameters")),
+                            now,
+                        )
+                        for d, key, digest in zip(batch, keys, hashes)
+                    ),
+                )
+            count += len(batch)
+
+    def add_decrypt(self, **decrypt):
+        """ Record a decrypt; see `add_decrypts()`. """
+        self.add_decrypts([decrypt])
+
+    def decrypts(self, fingerprint=None, cams=None, analysis=None, limit=None):
+        """Return the decrypts recorded, from the best score to the worst,
+        optionally only those of a message, of a set of cams (given by name,
+        by hash, or as the cams themselves), or of an analysis.
+        """
+
+        query = (
+            "SELECT m.fingerprint, d.cams, d.positions, d.score, d.plaintext, "
+            "d.analysis, d.parameters, d.created FROM decrypts d "
+            "JOIN messages m ON m.id = d.message"
+        )
+        clauses, arguments = self._filter(fingerprint, cams, analysis)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY d.score DESC, d.id"
+        if limit is not None:
+            query += " LIMIT ?"
+            arguments.append(limit)
+
+        return [
+            self._decrypt(row)
+            for row in self.connection.execute(query, arguments)
+        ]
+
+    def best(self, fingerprint):
+        """ Return the best-scoring decrypt of a message, or None. """
+        decrypts = self.decrypts(fingerprint=fingerprint, limit=1)
+        return decrypts[0] if decrypts else None
+
+    def messages(self, cams=None, analysis=None):
+        """Return the fingerprints of the messages decrypted (optionally, with
+        a particular set of cams, or by a particular analysis), in the order in
+        which they were recorded.
+        """
+
+        clauses, arguments = self._filter(None, cams, analysis)
+        query = (
+            "SELECT m.fingerprint FROM messages m WHERE EXISTS ("
+            "SELECT 1 FROM decrypts d WHERE d.message = m.id"
+        )
+        if clauses:
+            query += " AND " + " AND ".join(clauses)
+        query += ") ORDER BY m.id"
+
+        return [row[0] for row in self.connection.execute(query, arguments)]
+
+    def solved(self, fingerprint, cams=None):
+        """ Decide whether a message has been decrypted. """
+        clauses, arguments = self._filter(fingerprint, cams, None)
+        query = (
+            "SELECT 1 FROM decrypts d JOIN messages m ON m.id = d.message "
+            "WHERE " + " AND ".join(clauses) + " LIMIT 1"
+        )
+        return self.connection.execute(query, arguments).fetchone() is not None
+
+    def unsolved(self, ciphertexts, cams=None):
+        """Yield the ciphertexts that have not yet been decrypted (optionally,
+        with a particular set of cams.)
+        """
+
+        for ciphertext in ciphertexts:
+            if not self.solved(fingerprint(bytes(ciphertext)), cams):
+                yield ciphertext
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        """ Count the messages recorded. """
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM messages"
+        ).fetchone()[0]
+
+    def _ids(self, fingerprints):
+        """ Map fingerprints to the ids of their messages. """
+        fingerprints = list(fingerprints)
+        ids = {}
+        for i in range(0, len(fingerprints), 500):
+            chunk = fingerprints[i : i + 500]
+            ids.update(
+                (row[1], row[0])
+                for row in self.connection.execute(
+                    "SELECT id, fingerprint FROM messages WHERE fingerprint "
+                    f"IN ({', '.join('?' * len(chunk))})",
+                    chunk,
+                )
+            )
+
+        for fingerprint in fingerprints:
+            if fingerprint not in ids:
+                raise ValueError(f"no message with fingerprint {fingerprint}.")
+        return ids
+
+    def _filter(self, fingerprint, cams, analysis):
+        """ Build the WHERE clauses selecting decrypts. """
+        clauses = []
+        arguments = []
+
+        if fingerprint is not None:
+            clauses.append("m.fingerprint = ?")
+            arguments.append(fingerprint)
+
+        if cams is not None:
+            if isinstance(cams, str):
+                clauses.append(
+                    "d.cams IN (SELECT hash FROM cams WHERE hash = ? OR "
+                    "name = ?)"
+                )
+                arguments.extend([cams, cams])
+            else:
+                clauses.append("d.cams = ?")
+                arguments.append(cache.key(cams))
+
+        if analysis is not None:
+            clauses.append("d.analysis = ?")
+            arguments.append(analysis)
+
+        return clauses, arguments
+
+    def _decrypt(self, row):
+        fingerprint, cams, positions, score, plaintext, analysis, p, t = row
+
+        sizes = [5, 5, 2]
+        offsets = [0, 5, 10]
+        return Decrypt(
+            fingerprint,
+            cams,
+            {
+                group: list(positions[offset : offset + size])
+                for group, offset, size in zip(_ROTORS, offsets, sizes)
+            },
+            score,
+            None if plaintext is None else list(plaintext),
+            analysis,
+            None if p is None else json.loads(p),
+            t,
+        )
+
+    def __init__(self, path=":memory:"):
+        """Open (or create) a store.
+
+        path
+            The path of the database; by default, it is held in memory.
+        """
+
+        if path != ":memory:":
+            path = os.fspath(path)
+
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.executescript(_SCHEMA)
@@ -0,0 +1,328 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# wiring.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+""" Compiles machines of the Lorenz family from a declarative description of
+their wiring.
+
+A `Wiring` names the wheels of a machine and gives their sizes, states when
+each wheel is driven, and states which wheels are added to form each impulse
+of the key. For example, the SZ40 is described by `SZ40_WIRING` below: the Chi
+wheels and the 61-cam motor wheel always step, the 37-cam motor wheel steps
+when the 61-cam wheel shows a cross, and the Psi wheels step when the 37-cam
+wheel shows a cross.
+
+The drive of a wheel is a boolean expression over the cams (before the step)
+of the other wheels, using `and`, `or`, `not` and `^`. A wheel's name stands
+for its active cam; a subscript selects a cam relative to the active one, so
+that `chi2[-1]` is the cam one back, as read by the "limitations" of the later
+SZ42 machines.
+
+A Wiring is compiled into the source of a Python function, in which the sizes
+of the wheels and the drives are written out literally and every position is
+held in a local variable. The most recently used compiled functions are
+cached, so a Wiring in use is compiled only once.
+"""
+import ast
+import functools
+import hashlib
+import keyword
+from collections import namedtuple
+
+from lorenz.machines import WORDS
+
+# The description of a machine.
+#
+# wheels
+#     A list of (name, size) pairs.
+#
+# drives
+#     A dictionary mapping the names of the wheels that do not step at every
+#     character to the expressions that decide when they do.
+#
+# key
+#     A list of five lists of wheel names, one for each impulse of the key
+#     (from the first), giving the wheels whose cams are added to form it.
+Wiring = namedtuple("Wiring", ["wheels", "drives", "key"])
+
+SZ40_WIRING = Wiring(
+    wheels=[
+        ("chi1", 41),
+        ("chi2", 31),
+        ("chi3", 29),
+        ("chi4", 26),
+        ("chi5", 23),
+        ("psi1", 43),
+        ("psi2", 47),
+        ("psi3", 51),
+        ("psi4", 53),
+        ("psi5", 59),
+        ("mu61", 61),
+        ("mu37", 37),
+    ],
+    drives={
+        "mu37": "mu61",
+        "psi1": "mu37",
+        "psi2": "mu37",
+        "psi3": "mu37",
+        "psi4": "mu37",
+        "psi5": "mu37",
+    },
+    key=[[f"chi{i}", f"psi{i}"] for i in range(1, 6)],
+)
+
+# The number of compiled functions cached.
+CACHE = 64
+
+
+def digest(wiring):
+    """ Return a hash identifying a Wiring. """
+    canonical = repr(
+        (
+            [(name, size) for name, size in wiring.wheels],
+            sorted(wiring.drives.items()),
+            [list(names) for names in wiring.key],
+        )
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _expression(source, index, sizes):
+    """Translate a drive expression into Python source, referring to the
+    wheels by their local variables.
+    """
+
+    def offset(node):
+        if isinstance(node, ast.Index):  # Python < 3.9
+            node = node.value
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            return -offset(node.operand)
+        if isinstance(node, ast.Constant) and type(node.value) is int:
+            return node.value
+        raise ValueError(f"illegal cam offset in drive {source!r}.")
+
+    def cam(name, k=0):
+        if name not in index:
+            raise ValueError(f"unknown wheel {name!r} in drive {source!r}.")
+
+        i = index[name]
+        if k % sizes[i] == 0:
+            return f"w{i}[p{i}]"
+        return f"w{i}[(p{i} + {k % sizes[i]}) % {sizes[i]}]"
+
+    def walk(node):
+        if isinstance(node, ast.BoolOp):
+            op = " and " if isinstance(node.op, ast.And) else " or "
+            return "(" + op.join(map(walk, node.values)) + ")"
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            return f"(not {walk(node.operand)})"
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitXor):
+            return f"({walk(node.left)} ^ {walk(node.right)})"
+        if isinstance(node, ast.Name):
+            return cam(node.id)
+        if isinstance(node, ast.Subscript) and isinstance(
+            node.value, ast.Name
+        ):
+            return cam(node.value.id, offset(node.slice))
+        if isinstance(node, ast.Constant) and node.value in (0, 1):
+            return str(int(node.value))
+        raise ValueError(f"illegal drive {source!r}.")
+
+    try:
+        tree = ast.parse(source, mode="eval")
+    except SyntaxError:
+        raise ValueError(f"illegal drive {source!r}.")
+
+    return walk(tree.body)
+
+
+def source(wiring):
+    """ Return the Python source of the function compiled from a Wiring. """
+    names = [name for name, _ in wiring.wheels]
+    sizes = [size for _, size in wiring.wheels]
+    index = {name: i for i, name in enumerate(names)}
+
+    if len(index) != len(names):
+        raise ValueError("duplicate wheel names.")
+
+    for name, size in wiring.wheels:
+        if not name.isidentifier() or keyword.iskeyword(name):
+            raise ValueError(f"illegal wheel name {name!r}.")
+        if size < 1:
+            raise ValueError(f"illegal size {size} of wheel {name!r}.")
+
+    for name in wiring.drives:
+        if name not in index:
+            raise ValueError(f"unknown wheel {name!r} in drives.")
+
+    if len(wiring.key) != 5:
+        raise ValueError("the key must have five impulses.")
+
+    impulses = []
+    for shift, wheels in zip(range(4, -1, -1), wiring.key):
+        if not wheels:
+            continue
+        for name in wheels:
+            if name not in index:
+                raise ValueError(f"unknown wheel {name!r} in key.")
+
+        term = " ^ ".join(f"w{index[name]}[p{index[name]}]" for name in wheels)
+        impulses.append(f"(({term}) << {shift})" if shift else f"({term})")
+
+    n = len(names)
+    positions = ", ".join(f"p{i}" for i in range(n))
+    lines = [
+        "def machine(pins, positions, stream):",
+        f"    ({', '.join(f'w{i}' for i in range(n))},) = pins",
+        f"    ({positions},) = positions",
+        "    out = []",
+        "    append = out.append",
+        "    for word in stream:",
+        f"        append(word ^ ({' | '.join(impulses) or '0'}))",
+    ]
+
+    # Every drive is evaluated before any wheel is stepped. Wheels with the
+    # same drive (such as the Psi wheels) share a single test.
+    drives = {}
+    for i, name in enumerate(names):
+        if name in wiring.drives:
+            drive = _expression(wiring.drives[name], index, sizes)
+            drives.setdefault(drive, []).append(i)
+        else:
+            drives.setdefault(None, []).append(i)
+
+    for k, drive in enumerate(drives):
+        if drive is not None:
+            lines.append(f"        d{k} = {drive}")
+
+    for k, (drive, wheels) in enumerate(drives.items()):
+        indent = "        "
+        if drive is not None:
+            lines.append(f"        if d{k}:")
+            indent += "    "
+        for i in wheels:
+            lines.append(f"{indent}p{i} += 1")
+            lines.append(f"{indent}if p{i} == {sizes[i]}:")
+            lines.append(f"{indent}    p{i} = 0")
+
+    lines.append(f"    return out, [{positions}]")
+    return "\n".join(lines) + "\n"
+
+
+def compile_wiring(wiring):
+    """Compile a Wiring into a function
+
+        machine(pins, positions, stream) -> (output, positions)
+
+    which adds the key to a stream of five-bit integers, given the cams and
+    start positions of the wheels (as lists in the order of `wiring.wheels`),
+    and also returns the positions of the wheels afterwards.
+    """
+
+    return _compile(
+        (
+            tuple((name, size) for name, size in wiring.wheels),
+            tuple(sorted(wiring.drives.items())),
+            tuple(tuple(names) for names in wiring.key),
+        )
+    )
+
+
+@functools.lru_cache(maxsize=CACHE)
+def _compile(canonical):
+    """ Compile a Wiring, given as a hashable tuple. """
+    wheels, drives, key = canonical
+    wiring = Wiring(list(wheels), dict(drives), [list(names) for names in key])
+
+    namespace = {}
+    code = compile(source(wiring), f"<wiring {digest(wiring)[:12]}>", "exec")
+    exec(code, namespace)
+    return namespace["machine"]
+
+
+class CompiledMachine:
+    """ A machine compiled from a Wiring. """
+
+    def feed(self, stream):
+        """Feed a stream of five-bit integers into the machine, returning the
+        stream with the key added, and stepping the wheels. The stream is
+        validated before the wheels are stepped.
+        """
+
+        stream = list(stream)
+
+        if not (set(map(type, stream)) <= {int} and set(stream) <= WORDS):
+            for word in stream:
+                if (type(word) is not int) or (word < 0) or (word >= 32):
+                    raise RuntimeError(f'illegal word "{word}" in stream.')
+
+        out, self.positions = self._machine(self.pins, self.positions, stream)
+        return out
+
+    def keystream(self, n):
+        """ Return the key for the next `n` characters. """
+        return self.feed([0] * n)
+
+    def state(self):
+        """ Return the positions of the wheels, by name. """
+        return {
+            name: position
+            for (name, _), position in zip(self.wiring.wheels, self.positions)
+        }
+
+    @classmethod
+    def sz40(cls, rotors, positions=None):
+        """Compile an SZ40, taking its cams (and, optionally, positions) in the
+        form accepted by `SZ40.__init__()`.
+        """
+
+        names = [name for name, _ in SZ40_WIRING.wheels]
+
+        def flatten(groups):
+            return groups["chi"] + groups["psi"] + groups["mu"]
+
+        return cls(
+            SZ40_WIRING,
+            dict(zip(names, flatten(rotors))),
+            (
+                None
+                if positions is None
+                else dict(zip(names, flatten(positions)))
+            ),
+        )
+
+    def __init__(self, wiring, pins, positions=None):
+        """Create a CompiledMachine.
+
+        wiring
+            The Wiring of the machine.
+
+        pins
+            A dictionary mapping the name of each wheel to its list of cams.
+
+        positions
+            A dictionary mapping the names of wheels to their start positions;
+            wheels not given start at zero.
+        """
+
+        positions = positions or {}
+
+        for name, size in wiring.wheels:
+            if name not in pins:
+                raise ValueError(f"missing cams of wheel {name!r}.")
+            if len(pins[name]) != size:
+                raise ValueError(f"wrong number of cams on wheel {name!r}.")
+            if any(bit not in [0, 1] for bit in pins[name]):
+                raise ValueError(f"non-binary cam on wheel {name!r}.")
+            if not 0 <= positions.get(name, 0) < size:
+                raise ValueError(f"illegal position of wheel {name!r}.")
+
+        self.wiring = wiring
+        self.pins = [list(pins[name]) for name, _ in wiring.wheels]
+        self.positions = [positions.get(name, 0) for name, _ in wiring.wheels]
+
+        self._machine = compile_wiring(wiring)
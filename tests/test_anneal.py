@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_anneal.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+import os
+import random
+import tempfile
+import unittest
+
+from lorenz import schedule
+from lorenz.anneal import Annealer
+from lorenz.anneal import recover
+from lorenz.anneal import recover_motor
+from lorenz.language import LanguageModel
+from lorenz.machines import SZ40
+from lorenz.patterns import KH_CAMS
+from lorenz.patterns import ZMUG_CAMS
+from lorenz.rotor import RotorSet
+
+
+class TestAnneal(unittest.TestCase):
+    def setUp(self):
+        self.model = LanguageModel.english()
+        self.plaintext = self.model.sample(2000, random.Random(1))
+
+        ciphertext = SZ40(KH_CAMS).feed(self.plaintext)
+        chi = RotorSet(KH_CAMS["chi"]).states(len(ciphertext))
+        self.dechi = [z ^ x for z, x in zip(ciphertext, chi)]
+
+    def test__plaintext(self):
+        annealer = Annealer(self.dechi, KH_CAMS["mu"], psi=KH_CAMS["psi"])
+        self.assertEqual(self.plaintext, annealer.plaintext)
+
+    def test__incremental(self):
+        bigrams = LanguageModel.from_text(self.plaintext)
+
+        for model in [self.model, bigrams]:
+            annealer = Annealer(self.dechi, KH_CAMS["mu"], model=model, seed=2)
+            for _ in range(200):
+                annealer.step(0.5)
+            self.assertAlmostEqual(annealer.score(), annealer.total)
+
+            for i, c in [(0, 0), (2, 17), (4, 58)]:
+                before = annealer.score()
+                delta = annealer.flip_psi(i, c)
+                self.assertAlmostEqual(annealer.score() - before, delta)
+                self.assertEqual(annealer.plaintext_of(), annealer.plaintext)
+
+    def test__recover(self):
+        recovery = recover(
+            self.dechi,
+            KH_CAMS["mu"],
+            restarts=2,
+            iterations=15000,
+            processes=2,
+        )
+        self.assertEqual(KH_CAMS["psi"], recovery.psi)
+        self.assertEqual(KH_CAMS["mu"], recovery.mu)
+
+    def count(self, annealer, crash=None):
+        """Count the steps taken by an annealer, making it crash after a
+        number of steps if `crash` is given.
+        """
+
+        steps = []
+
+        def step(temperature):
+            if len(steps) == crash:
+                raise KeyboardInterrupt
+            steps.append(temperature)
+            Annealer.step(annealer, temperature)
+
+        annealer.step = step
+        return steps
+
+    def test__checkpoint(self):
+        expected = Annealer(self.dechi, KH_CAMS["mu"], seed=3).run(2000)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "anneal.json")
+
+            annealer = Annealer(self.dechi, KH_CAMS["mu"], seed=3)
+            self.count(annealer, crash=777)
+            with self.assertRaises(KeyboardInterrupt):
+                annealer.run(2000, checkpoint=path, every=0)
+            self.assertTrue(os.path.exists(path))
+
+            resumed = Annealer(self.dechi, KH_CAMS["mu"], seed=3)
+            steps = self.count(resumed)
+            self.assertEqual(
+                expected, resumed.run(2000, checkpoint=path, every=0)
+            )
+            self.assertEqual(2000 - 777, len(steps))
+
+            # Nor is a checkpoint resumed by a different search.
+            other = Annealer(self.dechi, KH_CAMS["mu"], seed=4)
+            with self.assertRaises(ValueError):
+                other.run(2000, checkpoint=path)
+
+    def test__recover_motor(self):
+        schedule._cycles.cache_clear()
+
+        recovery = recover_motor(self.dechi, KH_CAMS["psi"])
+        self.assertEqual(KH_CAMS["mu"], recovery.mu)
+        self.assertEqual(KH_CAMS["psi"], recovery.psi)
+
+        # no motor schedule is built for the patterns tried along the way.
+        self.assertEqual(1, schedule._cycles.cache_info().currsize)
+
+    def test__recover_motor_positions(self):
+        # The motor cams are recovered as seen from the starts of the message,
+        # wherever the rotors start.
+        rng = random.Random(5)
+        plaintext = self.model.sample(3000, rng)
+
+        for cams in [KH_CAMS, ZMUG_CAMS]:
+            positions = {
+                name: [rng.randrange(len(pins)) for pins in rotors]
+                for name, rotors in cams.items()
+            }
+            psi, mu = (
+                [
+                    pins[p:] + pins[:p]
+                    for pins, p in zip(cams[name], positions[name])
+                ]
+                for name in ["psi", "mu"]
+            )
+
+            ciphertext = SZ40(cams, positions=positions).feed(plaintext)
+            chi = RotorSet(cams["chi"], positions=positions["chi"])
+            dechi = [
+                z ^ x for z, x in zip(ciphertext, chi.states(len(ciphertext)))
+            ]
+
+            recovery = recover_motor(dechi, psi, processes=2)
+            self.assertEqual(mu, recovery.mu)
+            self.assertEqual(psi, recovery.psi)
+
+    def test__short(self):
+        with self.assertRaises(ValueError):
+            Annealer([1], KH_CAMS["mu"])
+
+        with self.assertRaises(ValueError):
+            recover_motor([1], KH_CAMS["psi"])
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_backends.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+import os
+import random
+import unittest
+from unittest import mock
+
+from lorenz import backends
+from lorenz.machines import SZ40
+from lorenz.patterns import KH_CAMS
+from lorenz.search import ChiSearch
+
+
+class BrokenBackend(backends.PythonBackend):
+    name = "broken"
+
+    def add(self, stream, key):
+        return [word ^ k ^ 1 for word, k in zip(stream, key)]
+
+
+class TestBackends(unittest.TestCase):
+    def setUp(self):
+        # The tests choose their own defaults, whatever the environment.
+        self.default = backends._DEFAULT
+        self.environ = mock.patch.dict(os.environ)
+        self.environ.start()
+        os.environ.pop("LORENZ_BACKEND", None)
+        backends._DEFAULT = None
+
+    def tearDown(self):
+        self.environ.stop()
+        backends._DEFAULT = self.default
+
+    def test__available(self):
+        names = backends.available()
+        self.assertIn("python", names)
+
+        stream = [random.randrange(32) for _ in range(3000)]
+        expected = SZ40(KH_CAMS, backend="python").feed(stream)
+        settings = ChiSearch(expected, KH_CAMS["chi"], backend="python").run()
+
+        for name in names:
+            machine = SZ40(KH_CAMS, backend=name)
+            self.assertEqual(expected, machine.feed(stream))
+
+            search = ChiSearch(expected, KH_CAMS["chi"], backend=name)
+            self.assertEqual(settings, search.run())
+
+    def test__select(self):
+        self.assertIs(backends.select("python"), backends.get("python"))
+        self.assertIs(backends.default(), backends.get(None))
+
+        backend = backends.PythonBackend()
+        self.assertIs(backend, backends.get(backend))
+        self.assertIs(backend, SZ40(KH_CAMS, backend=backend).backend)
+
+        with self.assertRaises(ValueError):
+            backends.select("fortran")
+
+    def test__unavailable(self):
+        with mock.patch.dict("sys.modules", {"numpy": None, "numba": None}):
+            with mock.patch.dict(backends._SELECTED, clear=True):
+                for name in ["numpy", "numba"]:
+                    with self.assertRaises(RuntimeError):
+                        backends.select(name)
+
+                # Without Numba, the default is the reference.
+                backends._DEFAULT = None
+                self.assertEqual("python", backends.default().name)
+
+    def test__startup(self):
+        # a default has been chosen, and tested, by importing the module.
+        self.assertIsNotNone(self.default)
+        self.assertIn(self.default, backends._SELECTED)
+
+    def test__environment(self):
+        with mock.patch.dict(os.environ, {"LORENZ_BACKEND": "python"}):
+            backends._DEFAULT = None
+            self.assertEqual("python", backends.default().name)
+
+        with mock.patch.dict(os.environ, {"LORENZ_BACKEND": "fortran"}):
+            backends._DEFAULT = None
+            with self.assertRaises(ValueError):
+                backends.default()
+
+    def test__self_test(self):
+        backends.self_test(backends.PythonBackend())
+
+        with self.assertRaises(RuntimeError):
+            backends.self_test(BrokenBackend())
+
+    def test__use(self):
+        backends.use("python")
+        self.assertEqual("python", backends.default().name)
+
+        with self.assertRaises(ValueError):
+            backends.use("fortran")
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_benchmarks.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+import unittest
+from unittest import mock
+
+from benchmarks import suite
+from lorenz.telegraphy import Teleprinter
+
+
+class TestSuite(unittest.TestCase):
+    def test__run(self):
+        # every benchmark must at least run at a small size.
+        for name, (function, _) in suite.BENCHMARKS.items():
+            with self.subTest(name=name):
+                function(300)()
+
+    def test__cases(self):
+        cases = list(suite.cases([10, 20], only=["sz40.seek", "sz40.feed"]))
+        self.assertEqual(
+            [("sz40.feed", 10), ("sz40.feed", 20), ("sz40.seek", 1_000)],
+            cases,
+        )
+
+    def test__chunked(self):
+        decoded = []
+        original = Teleprinter.decode
+
+        def decode(stream):
+            decoded.append(len(stream))
+            return original(stream)
+
+        with mock.patch.object(suite, "CHUNK", 100):
+            with mock.patch.object(suite.Teleprinter, "decode", decode):
+                result = suite.measure("teleprinter.decode", 250, repeat=1)
+
+        # the whole size is decoded, not just the first chunk.
+        self.assertEqual([100, 100, 50], decoded)
+        self.assertEqual(250, result["size"])
+
+    def test__compare(self):
+        baseline = {
+            "a[10]": {"median": 1.0},
+            "b[10]": {"median": 1.0},
+        }
+        results = [
+            {"name": "a", "size": 10, "median": 1.2},
+            {"name": "b", "size": 10, "median": 1.5},
+            {"name": "c", "size": 10, "median": 9.0},
+        ]
+
+        self.assertEqual(
+            [("b[10]", 1.0, 1.5)], suite.compare(results, baseline, 0.25)
+        )
+        self.assertEqual([], suite.compare(results, baseline, 0.5))
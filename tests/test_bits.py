@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_bits.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+import random
+import unittest
+
+from lorenz.bits import BitPlaneStream
+from lorenz.bits import pack
+from lorenz.bits import popcount
+from lorenz.bits import unpack
+from lorenz.bits import wheel
+from lorenz.patterns import ZMUG_CAMS
+from lorenz.rotor import RotorSet
+
+rng = random.Random(0)
+stream = [rng.randrange(32) for _ in range(1000)]
+other = [rng.randrange(32) for _ in range(900)]
+
+
+class TestBits(unittest.TestCase):
+    def test__pack(self):
+        self.assertEqual(0b110, pack([0, 1, 1]))
+        self.assertEqual(0, pack([]))
+
+        self.assertEqual([0, 1, 1, 0], unpack(0b110, 4))
+        self.assertEqual([], unpack(0b110, 0))
+
+    def test__popcount(self):
+        self.assertEqual(0, popcount(0))
+        self.assertEqual(3, popcount(0b10101))
+
+    def test__wheel(self):
+        pins = ZMUG_CAMS["chi"][0]
+
+        self.assertEqual(
+            [pins[(7 + i) % len(pins)] for i in range(100)],
+            unpack(wheel(pins, 7, 100), 100),
+        )
+
+
+class TestBitPlaneStream(unittest.TestCase):
+    def test__roundtrip(self):
+        self.assertEqual(
+            stream, BitPlaneStream.from_stream(stream).to_stream()
+        )
+        self.assertEqual([], BitPlaneStream.from_stream([]).to_stream())
+
+        self.assertRaises(RuntimeError, BitPlaneStream.from_stream, [1, 32])
+
+    def test__delta(self):
+        self.assertEqual(
+            [stream[i] ^ stream[i + 1] for i in range(len(stream) - 1)],
+            BitPlaneStream.from_stream(stream).delta().to_stream(),
+        )
+
+    def test__shift(self):
+        planes = BitPlaneStream.from_stream(stream)
+
+        self.assertEqual(stream[10:], planes.shift(10).to_stream())
+        self.assertEqual(stream[:10], planes.truncate(10).to_stream())
+
+    def test__counts(self):
+        planes = BitPlaneStream.from_stream(stream)
+
+        self.assertEqual(
+            sum((word >> 4) & 1 for word in stream), planes.crosses(1)
+        )
+        self.assertEqual(
+            sum(((word >> 4) ^ (word >> 2)) & 1 == 0 for word in stream),
+            planes.dots(1, 3),
+        )
+
+    def test__agreement(self):
+        planes = BitPlaneStream.from_stream(stream)
+
+        self.assertEqual(
+            sum(((a ^ b) >> 3) & 1 == 0 for a, b in zip(stream, other)),
+            planes.agreement(BitPlaneStream.from_stream(other), 2),
+        )
+        self.assertEqual(
+            [a ^ b for a, b in zip(stream, other)],
+            (planes ^ BitPlaneStream.from_stream(other)).to_stream(),
+        )
+
+    def test__from_rotors(self):
+        rotors = RotorSet(ZMUG_CAMS["chi"], positions=[3, 17, 2, 19, 5])
+
+        self.assertEqual(
+            rotors.states(2000),
+            BitPlaneStream.from_rotors(rotors, 2000).to_stream(),
+        )
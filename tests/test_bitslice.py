@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_bitslice.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+import random
+import unittest
+
+from lorenz.bitslice import BLOCK
+from lorenz.bitslice import BitslicedSZ40
+from lorenz.machines import SZ40
+from lorenz.patterns import KH_CAMS
+from lorenz.patterns import ZMUG_CAMS
+from lorenz.telegraphy import Teleprinter
+
+ciphertext = Teleprinter.encode("9W3UMKEGPJZQOKXC")
+plaintext = Teleprinter.encode("ATTACK99AT99DAWN")
+
+
+def random_positions(cams, rng):
+    return {
+        group: [rng.randrange(len(pins)) for pins in cams[group]]
+        for group in ["chi", "psi", "mu"]
+    }
+
+
+class TestBitslicedSZ40(unittest.TestCase):
+    def test__keystreams(self):
+        rng = random.Random(0)
+        positions = [random_positions(ZMUG_CAMS, rng) for _ in range(70)]
+
+        machines = BitslicedSZ40(ZMUG_CAMS, positions)
+        keys = machines.keystreams(500)
+
+        for lane, position in enumerate(positions):
+            self.assertEqual(
+                SZ40(ZMUG_CAMS, positions=position).keystream(500), keys[lane]
+            )
+
+    def test__keystreams_shared_motor(self):
+        rng = random.Random(1)
+        positions = [random_positions(KH_CAMS, rng) for _ in range(70)]
+        for position in positions:
+            position["mu"] = [11, 30]
+
+        machines = BitslicedSZ40(KH_CAMS, positions)
+        keys = machines.keystreams(3000)
+
+        for lane, position in enumerate(positions):
+            self.assertEqual(
+                SZ40(KH_CAMS, positions=position).keystream(3000), keys[lane]
+            )
+
+    def test__slices(self):
+        rng = random.Random(2)
+        positions = [random_positions(KH_CAMS, rng) for _ in range(10)]
+
+        machines = BitslicedSZ40(KH_CAMS, positions)
+        slices = list(machines.slices(BLOCK + 10))
+        self.assertEqual(BLOCK + 10, len(slices))
+
+        for lane, position in enumerate(positions):
+            key = SZ40(KH_CAMS, positions=position).keystream(BLOCK + 10)
+            self.assertEqual(
+                key,
+                [
+                    sum(
+                        ((mask >> lane) & 1) << (4 - i)
+                        for i, mask in enumerate(masks)
+                    )
+                    for masks in slices
+                ],
+            )
+
+    def test__positions(self):
+        rng = random.Random(3)
+        positions = [random_positions(ZMUG_CAMS, rng) for _ in range(5)]
+        positions += [dict(positions[0], chi=[0] * 5)]
+
+        machines = BitslicedSZ40(ZMUG_CAMS, positions)
+        first = machines.keystreams(2000)
+        second = machines.keystreams(2000)
+
+        for lane, position in enumerate(positions):
+            machine = SZ40(ZMUG_CAMS, positions=position)
+            self.assertEqual(
+                machine.keystream(4000), first[lane] + second[lane]
+            )
+            self.assertEqual(
+                {
+                    "chi": [rotor.position for rotor in machine.chi.rotors],
+                    "psi": [rotor.position for rotor in machine.psi.rotors],
+                    "mu": [rotor.position for rotor in machine.mu.rotors],
+                },
+                machines.positions[lane],
+            )
+
+    def test__feed(self):
+        zeroes = {"chi": [0] * 5, "psi": [0] * 5, "mu": [0] * 2}
+        machines = BitslicedSZ40(KH_CAMS, [zeroes, zeroes])
+
+        self.assertEqual(
+            [ciphertext, ciphertext[:4]],
+            machines.feed([plaintext, plaintext[:4]]),
+        )
+
+    def test__instantiate_invalid(self):
+        self.assertRaises(ValueError, BitslicedSZ40, KH_CAMS, [])
+
+        self.assertRaises(
+            ValueError,
+            BitslicedSZ40,
+            KH_CAMS,
+            [{"chi": [0] * 5, "psi": [0] * 5, "mu": [100, 0]}],
+        )
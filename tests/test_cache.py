@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_cache.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+from lorenz.bits import mask
+from lorenz.bits import wheel
+from lorenz.cache import ArtifactCache
+from lorenz.cache import delta_tables
+from lorenz.cache import key
+from lorenz.patterns import KH_CAMS
+from lorenz.search import ChiSearch
+
+
+class TestArtifactCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = ArtifactCache(self.directory.name, limit=10_000)
+        self.key = key(KH_CAMS)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test__key(self):
+        reordered = dict(reversed(list(KH_CAMS.items())))
+        self.assertEqual(self.key, key(reordered))
+        self.assertNotEqual(self.key, key(KH_CAMS["chi"]))
+
+        # Only the bits matter, not the type holding them.
+        views = [memoryview(bytes(pins)) for pins in KH_CAMS["chi"]]
+        self.assertEqual(key(KH_CAMS["chi"]), key(views))
+
+    def test__load(self):
+        calls = []
+
+        def build():
+            calls.append(1)
+            return b"artifact"
+
+        self.assertIsNone(self.cache.get(self.key, "a"))
+        self.assertEqual(
+            b"artifact", bytes(self.cache.load(self.key, "a", build))
+        )
+        self.assertEqual(
+            b"artifact", bytes(self.cache.load(self.key, "a", build))
+        )
+        self.assertEqual(1, len(calls))
+
+        # A second cache in the same directory sees the same artifacts.
+        other = ArtifactCache(self.directory.name)
+        self.assertEqual(b"artifact", bytes(other.get(self.key, "a")))
+
+        self.cache.put(self.key, "empty", b"")
+        self.assertEqual(b"", self.cache.get(self.key, "empty"))
+
+    def test__cleanup(self):
+        for i, name in enumerate("abc"):
+            self.cache.put(self.key, name, bytes(400))
+            os.utime(self.cache.path(self.key, name), ns=(i, i))
+
+        # Using "a" makes "b" the least recently used.
+        self.cache.get(self.key, "a")
+        self.cache.cleanup(limit=800)
+
+        self.assertIsNone(self.cache.get(self.key, "b"))
+        self.assertIsNotNone(self.cache.get(self.key, "a"))
+        self.assertIsNotNone(self.cache.get(self.key, "c"))
+        self.assertEqual(800, self.cache.size())
+
+        # Putting an artifact trims the cache to its limit, but the cache is
+        # not walked while it is known to be within it.
+        self.cache.limit = 1000
+        with mock.patch.object(
+            self.cache, "cleanup", wraps=self.cache.cleanup
+        ) as cleanup:
+            self.cache.put(self.key, "d", bytes(100))
+            self.assertEqual(0, cleanup.call_count)
+            self.cache.put(self.key, "e", bytes(400))
+            self.assertEqual(1, cleanup.call_count)
+        self.assertLessEqual(self.cache.size(), 1000)
+
+    def test__version(self):
+        stale = os.path.join(self.directory.name, "v0", "ab", "abc")
+        os.makedirs(stale)
+        self.cache.cleanup()
+        self.assertFalse(os.path.exists(os.path.dirname(stale)))
+
+    def test__name(self):
+        for name in ["", ".hidden", os.path.join("a", "b")]:
+            with self.assertRaises(ValueError):
+                self.cache.path(self.key, name)
+
+    def test__delta_tables(self):
+        cache = ArtifactCache(self.directory.name)
+        pins = KH_CAMS["chi"][:2]
+
+        for n in [1, 1000, 5000]:
+            expected = [
+                [
+                    (stream ^ (stream >> 1)) & mask(n)
+                    for stream in (wheel(p, s, n + 1) for s in range(len(p)))
+                ]
+                for p in pins
+            ]
+            self.assertEqual(expected, delta_tables(pins, n))
+            self.assertEqual(expected, delta_tables(pins, n, cache))
+            self.assertEqual(expected, delta_tables(pins, n, cache))
+
+        # One artifact is kept for each rotor, whatever the length.
+        self.assertEqual(2, len(list(cache._artifacts())))
+        with cache.get(key([pins[0]]), "chi-delta") as rows:
+            self.assertEqual(41 * 41, len(rows))
+
+    def test__search(self):
+        cache = ArtifactCache(self.directory.name)
+        rng = random.Random(0)
+        ciphertext = [rng.randrange(32) for _ in range(500)]
+
+        expected = ChiSearch(ciphertext, KH_CAMS["chi"]).run(limit=5)
+        for _ in range(2):
+            search = ChiSearch(ciphertext, KH_CAMS["chi"], cache=cache)
+            self.assertEqual(expected, search.run(limit=5))
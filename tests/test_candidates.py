@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_candidates.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+import os
+import random
+import tempfile
+import unittest
+
+from lorenz.candidates import CandidateStore
+from lorenz.candidates import merge
+from lorenz.candidates import read
+
+SIZES = [41, 31, 29, 26, 23, 43, 47, 51, 53, 59, 61, 37]
+
+
+def candidates(n, seed):
+    rng = random.Random(seed)
+    return [
+        (tuple(rng.randrange(size) for size in SIZES), float(rng.randrange(n)))
+        for _ in range(n)
+    ]
+
+
+class TestCandidateStore(unittest.TestCase):
+    def test__top(self):
+        pairs = candidates(1000, 0)
+        store = CandidateStore()
+        store.extend(pairs)
+
+        expected = sorted(pairs, key=lambda pair: -pair[1])[:10]
+        top = store.top(10)
+        self.assertEqual(
+            [score for _, score in expected], [c.score for c in top]
+        )
+        for candidate in top:
+            self.assertIn(tuple(candidate), pairs)
+
+        self.assertEqual(1000, len(store))
+
+    def test__spill(self):
+        pairs = candidates(1000, 1)
+        with CandidateStore(capacity=128) as store:
+            store.extend(pairs)
+            self.assertEqual(7, len(store.shards))
+            self.assertEqual(1000, len(store))
+
+            merged = list(store.merged())
+            self.assertEqual(
+                sorted(pairs, key=lambda pair: (-pair[1], pair[0])),
+                sorted(map(tuple, merged), key=lambda c: (-c[1], c[0])),
+            )
+            scores = [candidate.score for candidate in merged]
+            self.assertEqual(sorted(scores, reverse=True), scores)
+
+            shards = list(store.shards)
+
+        for path in shards:
+            self.assertFalse(os.path.exists(path))
+
+    def test__dedup(self):
+        store = CandidateStore(width=2)
+        store.extend([((1, 2), 1.0), ((3, 4), 5.0), ((1, 2), 3.0)])
+        store.dedup()
+
+        self.assertEqual(
+            [((3, 4), 5.0), ((1, 2), 3.0)], list(map(tuple, store.merged()))
+        )
+
+        store.spill()
+        store.add((3, 4), 2.0)
+        self.assertEqual(3, len(store))
+        self.assertEqual(2, len(store.top(5, unique=True)))
+        store.close()
+
+    def test__shards(self):
+        with tempfile.TemporaryDirectory() as directory:
+            paths = []
+            for seed in range(3):
+                store = CandidateStore()
+                store.extend(candidates(100, seed))
+                path = os.path.join(directory, f"{seed}.shard")
+                store.write(path)
+                paths.append(path)
+
+                self.assertEqual(store.top(100), list(read(path)))
+
+            merged = list(merge(paths))
+            self.assertEqual(300, len(merged))
+            self.assertEqual(
+                sorted((c.score for c in merged), reverse=True),
+                [c.score for c in merged],
+            )
+
+            combined = CandidateStore(shards=paths)
+            combined.add(SIZES, 1000.0)
+            self.assertEqual(301, len(combined))
+            self.assertEqual(tuple(SIZES), combined.top(1)[0].positions)
+            combined.close()
+
+            for path in paths:
+                self.assertTrue(os.path.exists(path))
+
+    def test__illegal(self):
+        store = CandidateStore()
+        with self.assertRaises(ValueError):
+            store.add((1, 2, 3), 0.0)
+        with self.assertRaises(ValueError):
+            store.add([256] * 12, 0.0)
+        with self.assertRaises(ValueError):
+            CandidateStore(capacity=0)
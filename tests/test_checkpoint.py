@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_checkpoint.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+import os
+import random
+import tempfile
+import unittest
+
+from lorenz import checkpoint
+
+
+class TestCheckpoint(unittest.TestCase):
+    def test__save_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "checkpoint.json")
+            key = checkpoint.fingerprint([1, 2, 3], "search")
+
+            checkpointer = checkpoint.Checkpointer(path, key, every=3600)
+            self.assertIsNone(checkpointer.load())
+            self.assertFalse(checkpointer.due())
+
+            state = {"done": 3, "results": [[[1, 2], 40]], "ratio": 0.1}
+            checkpointer.save(state)
+            self.assertEqual(1, checkpointer.saves)
+            self.assertEqual(state, checkpointer.load())
+            self.assertEqual(["checkpoint.json"], os.listdir(directory))
+
+            other = checkpoint.Checkpointer(
+                path, checkpoint.fingerprint([1, 2, 4], "search")
+            )
+            with self.assertRaises(ValueError):
+                other.load()
+
+    def test__fingerprint(self):
+        self.assertEqual(
+            checkpoint.fingerprint([1, 2], {"a": None}),
+            checkpoint.fingerprint((1, 2), {"a": None}),
+        )
+        self.assertNotEqual(
+            checkpoint.fingerprint([1, 2]), checkpoint.fingerprint([[1], 2])
+        )
+        self.assertNotEqual(
+            checkpoint.fingerprint("1"), checkpoint.fingerprint(b"1")
+        )
+
+        # integers too long for `repr()` are fingerprinted all the same.
+        self.assertNotEqual(
+            checkpoint.fingerprint(1 << 100_000),
+            checkpoint.fingerprint(1 << 100_001),
+        )
+
+        with self.assertRaises(TypeError):
+            checkpoint.fingerprint(object())
+
+    def test__due(self):
+        checkpointer = checkpoint.Checkpointer("unused", "key", every=0)
+        self.assertTrue(checkpointer.due())
+
+    def test__rng_state(self):
+        rng = random.Random(5)
+        rng.random()
+        state = checkpoint.rng_state(rng)
+        expected = [rng.random() for _ in range(10)]
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "checkpoint.json")
+            checkpointer = checkpoint.Checkpointer(path, "key")
+            checkpointer.save({"rng": state})
+
+            restored = random.Random()
+            checkpoint.set_rng_state(restored, checkpointer.load()["rng"])
+            self.assertEqual(expected, [restored.random() for _ in range(10)])
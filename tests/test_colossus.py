@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_colossus.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+import random
+import unittest
+
+from lorenz.colossus import Colossus
+from lorenz.language import LanguageModel
+from lorenz.machines import SZ40
+from lorenz.patterns import KH_CAMS
+from lorenz.search import ChiSearch
+
+POSITIONS = {"chi": [5, 7, 0, 0, 0], "psi": [0] * 5, "mu": [0, 0]}
+
+
+class TestColossus(unittest.TestCase):
+    def setUp(self):
+        plaintext = LanguageModel.english().sample(3000, random.Random(1))
+        self.ciphertext = SZ40(KH_CAMS, positions=POSITIONS).feed(plaintext)
+        self.colossus = Colossus(
+            self.ciphertext, chi=KH_CAMS["chi"], psi=KH_CAMS["psi"]
+        )
+
+    def test__break_in(self):
+        counts = self.colossus.run(
+            "~(dZ1 ^ dZ2 ^ dX1 ^ dX2)", loops=["X1", "X2"]
+        )
+        settings = ChiSearch(self.ciphertext, KH_CAMS["chi"]).run()
+
+        self.assertEqual(41 * 31, len(counts))
+        self.assertEqual(
+            [(setting.starts, setting.count) for setting in settings],
+            [tuple(count) for count in counts],
+        )
+
+    def test__count(self):
+        z = self.ciphertext
+        x3 = KH_CAMS["chi"][2]
+        s5 = KH_CAMS["psi"][4]
+
+        # Count the expression character by character.
+        expected = 0
+        for t in range(len(z) - 1):
+            dz3 = ((z[t] ^ z[t + 1]) >> 2) & 1
+            x = x3[(t + 4) % len(x3)]
+            s = s5[(t + 9) % len(s5)]
+            z4 = (z[t] >> 1) & 1
+            expected += bool((dz3 and not x) or (z4 ^ s))
+
+        self.assertEqual(
+            expected,
+            self.colossus.count(
+                "(dZ3 & ~X3) | (Z4 ^ S5)", starts={"X3": 4, "S5": 9}
+            ),
+        )
+
+        counts = self.colossus.run(
+            "(dZ3 and not X3) or (Z4 ^ S5)",
+            loops=["S5"],
+            starts={"X3": 4},
+        )
+        self.assertIn((9,), [count.starts for count in counts])
+        self.assertEqual(
+            expected,
+            dict(counts)[(9,)],
+        )
+
+    def test__total(self):
+        counts = self.colossus.run("dZ1 ^ dX1", loops=["X1"])
+        total = counts[5].count
+
+        above = self.colossus.run("dZ1 ^ dX1", loops=["X1"], total=total)
+        self.assertEqual(
+            [count for count in counts if count.count >= total], above
+        )
+        self.assertEqual(
+            counts[:3], self.colossus.run("dZ1 ^ dX1", loops=["X1"], limit=3)
+        )
+
+    def test__invalid(self):
+        for expression in ["dZ1 +", "dZ1 + dX1", "Y1", "Z6", "2", "f(Z1)"]:
+            with self.assertRaises(ValueError):
+                self.colossus.count(expression)
+
+        with self.assertRaises(ValueError):
+            self.colossus.run("dZ1 ^ dX1", loops=["X1", "X1"])
+        with self.assertRaises(ValueError):
+            self.colossus.run("dZ1 ^ dX1", loops=["Z1"])
+
+        colossus = Colossus(self.ciphertext, chi=KH_CAMS["chi"], delta=False)
+        self.assertEqual(len(self.ciphertext), colossus.length)
+        with self.assertRaises(ValueError):
+            colossus.count("S1")
+        with self.assertRaises(ValueError):
+            colossus.count("dZ1")
+
+        with self.assertRaises(ValueError):
+            Colossus([0])
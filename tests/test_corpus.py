@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_corpus.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+import os
+import tempfile
+import unittest
+
+from lorenz import corpus
+from lorenz.machines import SZ40
+from lorenz.patterns import KH_CAMS
+from lorenz.patterns import ZMUG_CAMS
+
+
+class TestCorpus(unittest.TestCase):
+    def test__record(self):
+        generator = corpus.CorpusGenerator(seed=1, length=(50, 100))
+        for record in generator.records(10):
+            self.assertTrue(50 <= len(record.plaintext) <= 100)
+            self.assertEqual(
+                record.ciphertext,
+                SZ40(record.cams, positions=record.positions).feed(
+                    record.plaintext
+                ),
+            )
+
+    def test__seed(self):
+        a = list(corpus.CorpusGenerator(seed=2, length=20).records(3))
+        b = list(corpus.CorpusGenerator(seed=2, length=20).records(3))
+        self.assertEqual(a, b)
+
+    def test__library(self):
+        generator = corpus.CorpusGenerator(
+            seed=3, library={"kh": KH_CAMS, "zmug": ZMUG_CAMS}, length=10
+        )
+        for record in generator.records(10):
+            self.assertIn(record.cams, [KH_CAMS, ZMUG_CAMS])
+
+    def test__text(self):
+        generator = corpus.CorpusGenerator(seed=4, text="HELLO9", length=20)
+        record = generator.record()
+        self.assertIn(bytes(record.plaintext), bytes(generator.text * 5))
+
+    def test__invalid(self):
+        with self.assertRaises(ValueError):
+            corpus.CorpusGenerator(length=(10, 5))
+        with self.assertRaises(ValueError):
+            corpus.CorpusGenerator(library=[])
+        with self.assertRaises(ValueError):
+            corpus.CorpusGenerator(text="")
+
+    def test__encode(self):
+        record = corpus.CorpusGenerator(seed=5, length=30).record()
+        self.assertEqual(record, corpus.decode(corpus.encode(record)))
+
+        with self.assertRaises(ValueError):
+            corpus.decode(corpus.encode(record)[:-1])
+
+    def test__shards(self):
+        records = list(corpus.CorpusGenerator(seed=6, length=100).records(20))
+
+        with tempfile.TemporaryDirectory() as directory:
+            with corpus.CorpusWriter(directory, shard_size=1000) as writer:
+                for record in records:
+                    writer.write(record)
+
+            self.assertEqual(20, writer.count)
+            self.assertEqual(7, len(writer.paths))
+            for path in writer.paths:
+                self.assertLessEqual(os.path.getsize(path), 1000)
+
+            self.assertEqual(records, list(corpus.read(writer.paths)))
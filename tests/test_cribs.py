@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_cribs.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+import random
+import unittest
+
+from lorenz.cribs import drag
+from lorenz.machines import SZ40
+from lorenz.patterns import ZMUG_CAMS
+from lorenz.telegraphy import Teleprinter
+
+rng = random.Random(0)
+plaintext = Teleprinter.encode(
+    "".join(rng.choice("ETAOINSHRDLU9999") for _ in range(2000))
+)
+positions = {"chi": [5, 6, 7, 8, 9], "psi": [1, 2, 3, 4, 5], "mu": [10, 20]}
+ciphertext = SZ40(ZMUG_CAMS, positions=positions).feed(plaintext)
+
+
+class TestDrag(unittest.TestCase):
+    def test__drag(self):
+        matches = drag(
+            ciphertext, plaintext[1200:1260], ZMUG_CAMS["chi"], limit=3
+        )
+
+        self.assertEqual(3, len(matches))
+        self.assertEqual(1200, matches[0].offset)
+        self.assertEqual([5, 6, 7, 8, 9], matches[0].starts)
+
+    def test__drag_impulses(self):
+        match = drag(
+            ciphertext,
+            plaintext[300:380],
+            ZMUG_CAMS["chi"],
+            impulses=(1, 2),
+            limit=1,
+        )[0]
+
+        self.assertEqual(300, match.offset)
+        self.assertEqual([5, 6, None, None, None], match.starts)
+
+    def test__drag_invalid(self):
+        self.assertRaises(ValueError, drag, ciphertext, [1], ZMUG_CAMS["chi"])
+        self.assertRaises(
+            ValueError, drag, ciphertext[:5], plaintext[:10], ZMUG_CAMS["chi"]
+        )
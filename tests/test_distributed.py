@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_distributed.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+import json
+import multiprocessing
+import os
+import tempfile
+import unittest
+
+from lorenz import distributed
+from lorenz.patterns import ZMUG_CAMS
+from lorenz.search import ChiSearch
+from tests.test_search import ciphertext
+
+CHI = ZMUG_CAMS["chi"]
+
+
+def stall(address):
+    """ Take a shard, and then fall silent without returning it. """
+    connection = distributed._connect(address)
+    fh = connection.makefile("rwb")
+    for message in [{"type": "hello"}, {"type": "request"}]:
+        fh.write(json.dumps(message).encode() + b"\n")
+        fh.flush()
+        fh.readline()
+    return connection
+
+
+class TestDistributed(unittest.TestCase):
+    def test__processes(self):
+        expected = ChiSearch(ciphertext, CHI).run()
+
+        with distributed.Coordinator(ciphertext, CHI, shard=3) as coordinator:
+            workers = [
+                multiprocessing.Process(
+                    target=distributed.work, args=(coordinator.address,)
+                )
+                for _ in range(4)
+            ]
+            for worker in workers:
+                worker.start()
+
+            self.assertEqual(expected, coordinator.results(timeout=60))
+
+            for worker in workers:
+                worker.join(timeout=10)
+                self.assertEqual(0, worker.exitcode)
+
+    def test__unix(self):
+        expected = ChiSearch(ciphertext[:500], CHI, rotors=(3,)).run(limit=5)
+
+        with tempfile.TemporaryDirectory() as directory:
+            address = os.path.join(directory, "coordinator.sock")
+            with distributed.Coordinator(
+                ciphertext[:500], CHI, rotors=(3,), address=address
+            ) as coordinator:
+                self.assertEqual(1, distributed.work(address))
+                self.assertEqual(expected, coordinator.results(limit=5))
+
+    def test__steal(self):
+        expected = ChiSearch(ciphertext, CHI).run()
+
+        with distributed.Coordinator(
+            ciphertext, CHI, shard=10, timeout=60
+        ) as coordinator:
+            stalled = stall(coordinator.address)
+
+            # The stalled shard is counted by the live worker.
+            self.assertEqual(5, distributed.work(coordinator.address))
+            self.assertEqual(expected, coordinator.results(timeout=10))
+            self.assertEqual(1, coordinator.stolen)
+            self.assertEqual(0, coordinator.reassigned)
+            stalled.close()
+
+    def test__reassign(self):
+        expected = ChiSearch(ciphertext, CHI).run()
+
+        with distributed.Coordinator(
+            ciphertext, CHI, shard=10, timeout=0.2, heartbeat=0.05, steal=False
+        ) as coordinator:
+            stalled = stall(coordinator.address)
+
+            self.assertEqual(5, distributed.work(coordinator.address))
+            self.assertEqual(expected, coordinator.results(timeout=10))
+            self.assertEqual(0, coordinator.stolen)
+            self.assertEqual(1, coordinator.reassigned)
+            stalled.close()
+
+    def test__timeout(self):
+        with distributed.Coordinator(ciphertext, CHI) as coordinator:
+            with self.assertRaises(TimeoutError):
+                coordinator.results(timeout=0.01)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_duplicates.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+import random
+import unittest
+
+from lorenz.duplicates import DuplicateIndex
+from lorenz.duplicates import shingles
+from lorenz.telegraphy import Teleprinter
+
+
+def garble(ciphertext, rng, n=10):
+    """ Corrupt, drop and insert a few characters. """
+    garbled = list(ciphertext)
+    for _ in range(n):
+        garbled[rng.randrange(len(garbled))] = rng.randrange(32)
+    del garbled[100:103]
+    garbled.insert(300, rng.randrange(32))
+    return garbled
+
+
+class TestDuplicateIndex(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(0)
+        self.messages = [
+            [rng.randrange(32) for _ in range(1000)] for _ in range(200)
+        ]
+        self.index = DuplicateIndex()
+        for key, ciphertext in enumerate(self.messages):
+            self.index.add(key, ciphertext)
+
+    def test__shingles(self):
+        text = Teleprinter.encode("ATTACK99AT99DAWN")
+        found = shingles(text, n=3)
+        self.assertEqual(len(text) - 2, len(found))
+        self.assertIn((text[0] << 10) | (text[1] << 5) | text[2], found)
+        self.assertEqual(1, len(shingles(text[:2], n=3)))
+        self.assertEqual(set(), shingles([], n=3))
+
+    def test__exact(self):
+        self.assertEqual(42, self.index.exact(self.messages[42]))
+        self.assertEqual([(42, 1.0)], self.index.query(self.messages[42]))
+        self.assertIsNone(self.index.exact(self.messages[42][1:]))
+
+    def test__near(self):
+        rng = random.Random(1)
+        for key in [0, 17, 199]:
+            matches = self.index.query(garble(self.messages[key], rng))
+            self.assertEqual([key], [match.key for match in matches])
+            self.assertGreater(matches[0].similarity, 0.6)
+            self.assertLess(matches[0].similarity, 1.0)
+
+        unrelated = [rng.randrange(32) for _ in range(1000)]
+        self.assertEqual([], self.index.query(unrelated))
+
+    def test__unique(self):
+        rng = random.Random(2)
+        index = DuplicateIndex()
+        messages = [(0, self.messages[0]), (1, self.messages[1])]
+        messages += [(2, self.messages[0]), (3, garble(self.messages[1], rng))]
+
+        self.assertEqual([0, 1], [key for key, _ in index.unique(messages)])
+        self.assertEqual(4, len(index))
+
+    def test__remove(self):
+        self.index.remove(42)
+        self.assertNotIn(42, self.index)
+        self.assertEqual([], self.index.query(self.messages[42]))
+        self.assertIsNone(self.index.exact(self.messages[42]))
+
+        with self.assertRaises(ValueError):
+            self.index.add(7, self.messages[7])
+
+    def test__remove_identical(self):
+        # Removing one of two identical ciphertexts leaves the other found.
+        self.index.add("copy", self.messages[7])
+        self.assertEqual(7, self.index.exact(self.messages[7]))
+        self.assertEqual(
+            {7, "copy"},
+            {
+                match.key
+                for match in self.index.query(self.messages[7])
+                if match.similarity == 1.0
+            },
+        )
+
+        self.index.remove(7)
+        self.assertEqual("copy", self.index.exact(self.messages[7]))
+        self.assertEqual([("copy", 1.0)], self.index.query(self.messages[7]))
+
+        self.index.remove("copy")
+        self.assertIsNone(self.index.exact(self.messages[7]))
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_generate.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+import io
+import unittest
+
+from lorenz import generate
+from lorenz.bits import pack
+from lorenz.machines import SZ40
+from lorenz.patterns import BREAM_CAMS
+from lorenz.patterns import KH_CAMS
+from lorenz.patterns import ZMUG_CAMS
+
+
+def longest_run(pins):
+    """ Return the longest cyclic run of equal cams in a pattern. """
+    if len(set(pins)) == 1:
+        return len(pins)
+
+    doubled = pins + pins
+    longest = run = 1
+    for a, b in zip(doubled, doubled[1:]):
+        run = run + 1 if a == b else 1
+        longest = max(longest, run)
+    return longest
+
+
+class TestGenerate(unittest.TestCase):
+    def test__known_patterns(self):
+        for cams in [KH_CAMS, ZMUG_CAMS, BREAM_CAMS]:
+            for group, rotors in cams.items():
+                for pins in rotors:
+                    self.assertTrue(
+                        generate._satisfies(
+                            pack(pins),
+                            len(pins),
+                            generate.CONSTRAINTS[group],
+                        )
+                    )
+
+    def test__constraints(self):
+        generator = generate.CamGenerator(seed=1)
+        for cams in generator.generate(50):
+            for group, rotors in cams.items():
+                constraint = generate.CONSTRAINTS[group]
+                self.assertEqual(
+                    generate.SIZES[group], [len(pins) for pins in rotors]
+                )
+
+                for pins in rotors:
+                    lo, hi = constraint.crosses
+                    self.assertTrue(
+                        lo * len(pins) <= sum(pins) <= hi * len(pins)
+                    )
+                    self.assertLessEqual(longest_run(pins), constraint.run)
+
+            # The cams are accepted by the machine.
+            SZ40(cams).feed([0] * 10)
+
+    def test__seed(self):
+        a = list(generate.CamGenerator(seed=7).generate(5))
+        b = list(generate.CamGenerator(seed=7).generate(5))
+        c = list(generate.CamGenerator(seed=8).generate(5))
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, c)
+
+    def test__packed(self):
+        generator = generate.CamGenerator(seed=2)
+        for record in generator.generate(10, packed=True):
+            self.assertEqual(63, len(record))
+            self.assertEqual(record, generate.pack(generate.unpack(record)))
+
+        for cams in [KH_CAMS, ZMUG_CAMS, BREAM_CAMS]:
+            self.assertEqual(cams, generate.unpack(generate.pack(cams)))
+
+    def test__packed_invalid(self):
+        with self.assertRaises(ValueError):
+            generate.unpack(bytes(62))
+
+        cams = {"chi": KH_CAMS["psi"], "psi": KH_CAMS["chi"], "mu": []}
+        with self.assertRaises(ValueError):
+            generate.pack(cams)
+
+    def test__file(self):
+        records = list(generate.CamGenerator(seed=3).generate(20, packed=True))
+
+        fh = io.BytesIO()
+        generate.write(fh, records)
+        self.assertEqual(20 * 63, len(fh.getvalue()))
+
+        fh.seek(0)
+        self.assertEqual(
+            [generate.unpack(record) for record in records],
+            list(generate.read(fh)),
+        )
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_language.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+import random
+import unittest
+
+from lorenz.language import LanguageModel
+from lorenz.telegraphy import Teleprinter
+
+plaintext = Teleprinter.encode("ATTACK9AT9DAWN9THE9ENEMY9IS9HERE")
+
+
+class TestLanguageModel(unittest.TestCase):
+    def test__english(self):
+        model = LanguageModel.english()
+
+        rng = random.Random(0)
+        garbage = [rng.randrange(32) for _ in range(len(plaintext))]
+
+        self.assertGreater(model.score(plaintext), model.threshold())
+        self.assertLess(model.score(garbage), model.threshold())
+
+    def test__from_text(self):
+        model = LanguageModel.from_text("ATTACK9AT9DAWN")
+
+        self.assertIsNotNone(model.bigrams)
+        self.assertEqual(len(plaintext), len(model.scores(plaintext)))
+        self.assertIsNone(
+            LanguageModel.from_text("ATTACK", bigrams=False).bigrams
+        )
+
+    def test__sample(self):
+        model = LanguageModel.from_text("ATTACK9AT9DAWN")
+
+        self.assertEqual(
+            model.sample(100, random.Random(1)),
+            model.sample(100, random.Random(1)),
+        )
+        self.assertEqual(100, len(LanguageModel.english().sample(100)))
+
+    def test__instantiate_invalid(self):
+        self.assertRaises(ValueError, LanguageModel, [1 / 31] * 31)
+        self.assertRaises(ValueError, LanguageModel, [0] + [1 / 31] * 31)
@@ -10,11 +10,21 @@ import unittest
 
 from lorenz.machines import SZ40
 from lorenz.patterns import KH_CAMS
+from lorenz.patterns import ZMUG_CAMS
 from lorenz.telegraphy import Teleprinter
 
 ciphertext = Teleprinter.encode("9W3UMKEGPJZQOKXC")
 plaintext = Teleprinter.encode("ATTACK99AT99DAWN")
 
+positions = {"chi": [3, 17, 2, 19, 5], "psi": [1, 2, 3, 4, 5], "mu": [57, 28]}
+
+
+def positions_of(machine):
+    return [
+        [rotor.position for rotor in rotors.rotors]
+        for rotors in [machine.chi, machine.psi, machine.mu]
+    ]
+
 
 class TestSZ40(unittest.TestCase):
     def test__encrypt(self):
@@ -26,3 +36,81 @@ class TestSZ40(unittest.TestCase):
         machine = SZ40(rotors=KH_CAMS)
 
         self.assertEqual(plaintext, machine.feed(ciphertext))
+
+    def test__feed_invalid(self):
+        machine = SZ40(rotors=KH_CAMS)
+
+        self.assertRaises(RuntimeError, machine.feed, [1, 2, 32])
+        self.assertRaises(RuntimeError, machine.feed, [1, 2.0, 3])
+        self.assertRaises(RuntimeError, machine.feed, [1, True, 3])
+
+    def test__keystream(self):
+        machine = SZ40(rotors=ZMUG_CAMS, positions=positions)
+        reference = SZ40(rotors=ZMUG_CAMS, positions=positions)
+
+        key = machine.keystream(3000)
+        for i in range(3000):
+            self.assertEqual(reference.state(), key[i])
+            reference.step()
+
+        self.assertEqual(positions_of(reference), positions_of(machine))
+
+    def test__seek(self):
+        machine = SZ40(rotors=ZMUG_CAMS, positions=positions)
+        reference = SZ40(rotors=ZMUG_CAMS, positions=positions)
+
+        machine.seek(2500)
+        for _ in range(2500):
+            reference.step()
+
+        self.assertEqual(positions_of(reference), positions_of(machine))
+        self.assertRaises(ValueError, machine.seek, -1)
+
+    def test__backstep(self):
+        machine = SZ40(rotors=ZMUG_CAMS, positions=positions)
+        reference = SZ40(rotors=ZMUG_CAMS, positions=positions)
+
+        for _ in range(2500):
+            machine.step()
+        for _ in range(2500):
+            machine.backstep()
+
+        self.assertEqual(positions_of(reference), positions_of(machine))
+
+    def test__rewind(self):
+        machine = SZ40(rotors=ZMUG_CAMS, positions=positions)
+        reference = SZ40(rotors=ZMUG_CAMS, positions=positions)
+
+        machine.seek(2500)
+        machine.rewind(2500)
+        self.assertEqual(positions_of(reference), positions_of(machine))
+
+        machine.rewind(1000)
+        for _ in range(1000):
+            reference.backstep()
+        self.assertEqual(positions_of(reference), positions_of(machine))
+        self.assertRaises(ValueError, machine.rewind, -1)
+
+    def test__reverse_keystream(self):
+        machine = SZ40(rotors=ZMUG_CAMS, positions=positions)
+        reference = SZ40(rotors=ZMUG_CAMS, positions=positions)
+
+        machine.seek(3000)
+        key = machine.reverse_keystream(3000)
+
+        self.assertEqual(reference.keystream(3000), key)
+        reference.rewind(3000)
+        self.assertEqual(positions_of(reference), positions_of(machine))
+
+    def test__feed_backward(self):
+        message = plaintext * 8
+        machine = SZ40(rotors=KH_CAMS)
+        enciphered = machine.feed(message)
+
+        # decipher the second half of the message from where it ended.
+        self.assertEqual(message[64:], machine.feed_backward(enciphered[64:]))
+        self.assertEqual(message[:64], machine.feed_backward(enciphered[:64]))
+        self.assertEqual(
+            positions_of(SZ40(rotors=KH_CAMS)), positions_of(machine)
+        )
+        self.assertRaises(RuntimeError, machine.feed_backward, [1, 2, 32])
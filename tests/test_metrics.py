@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_metrics.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+import unittest
+
+from lorenz.machines import SZ40
+from lorenz.metrics import Histogram
+from lorenz.metrics import InstrumentedSZ40
+from lorenz.patterns import KH_CAMS
+from lorenz.telegraphy import Teleprinter
+
+ciphertext = Teleprinter.encode("9W3UMKEGPJZQOKXC")
+plaintext = Teleprinter.encode("ATTACK99AT99DAWN")
+
+
+class TestHistogram(unittest.TestCase):
+    def test__record(self):
+        histogram = Histogram(unit=1)
+        for value in [1, 2, 3, 4, 5, 100]:
+            histogram.record(value)
+
+        self.assertEqual({1: 1, 2: 1, 4: 2, 8: 1, 128: 1}, histogram.buckets)
+        self.assertEqual(6, histogram.count)
+        self.assertEqual(4, histogram.percentile(50))
+        self.assertEqual(100, histogram.percentile(100))
+
+        self.assertRaises(ValueError, histogram.percentile, 101)
+
+
+class TestInstrumentedSZ40(unittest.TestCase):
+    def test__encrypt(self):
+        machine = InstrumentedSZ40(rotors=KH_CAMS)
+
+        self.assertEqual(ciphertext, machine.feed(plaintext))
+
+    def test__counters(self):
+        machine = InstrumentedSZ40(rotors=KH_CAMS)
+        reference = SZ40(rotors=KH_CAMS)
+
+        advances = 0
+        for _ in range(3000):
+            advances += reference.mu.state()
+            reference.step()
+
+        machine.feed([0] * 1000)
+        machine.feed([0] * 2000)
+
+        metrics = machine.metrics()
+        self.assertEqual(3000, metrics["characters"])
+        self.assertEqual(3000, metrics["steps"])
+        self.assertEqual(advances, metrics["psi_advances"])
+        self.assertEqual(3000 - advances, metrics["motor_stops"])
+        self.assertEqual(2, metrics["feed"]["count"])
+
+        # chi1 (41 cams) has completed 3000 // 41 revolutions, and the
+        # positions of the mu rotors must agree with the reference machine.
+        revolutions = metrics["revolutions"]
+        self.assertEqual(3000 // 41, revolutions["chi1"])
+        self.assertEqual(3000 // 61, revolutions["mu1"])
+        self.assertEqual(
+            [rotor.position for rotor in reference.mu.rotors],
+            [rotor.position for rotor in machine.mu.rotors],
+        )
+
+    def test__bulk(self):
+        machine = InstrumentedSZ40(rotors=KH_CAMS)
+        reference = SZ40(rotors=KH_CAMS)
+
+        # Step the reference machine one character at a time, counting its
+        # motion in either direction.
+        counts = {"steps": 0, "advances": 0, "chi": 0, "psi": 0, "mu2": 0}
+
+        def forward(n):
+            for _ in range(n):
+                raised = reference.mu.state()
+                counts["steps"] += 1
+                counts["advances"] += raised
+                counts["chi"] += 1
+                counts["psi"] += raised
+                counts["mu2"] += reference.mu.rotors[0].state()
+                reference.step()
+
+        def backward(n):
+            for _ in range(n):
+                reference.backstep()
+                raised = reference.mu.state()
+                counts["steps"] += 1
+                counts["advances"] += raised
+                counts["chi"] -= 1
+                counts["psi"] -= raised
+                counts["mu2"] -= reference.mu.rotors[0].state()
+
+        machine.keystream(1000)
+        forward(1000)
+        machine.seek(5000)
+        forward(5000)
+        machine.rewind(100)
+        backward(100)
+        for _ in range(3):
+            machine.step()
+        forward(3)
+        machine.reverse_keystream(50)
+        backward(50)
+        machine.backstep()
+        backward(1)
+        machine.feed_backward([0] * 20)
+        backward(20)
+        machine.feed([0] * 30)
+        forward(30)
+
+        metrics = machine.metrics()
+        self.assertEqual(1000 + 50 + 20 + 30, metrics["characters"])
+        self.assertEqual(counts["steps"], metrics["steps"])
+        self.assertEqual(counts["advances"], metrics["psi_advances"])
+        self.assertEqual(
+            counts["steps"] - counts["advances"], metrics["motor_stops"]
+        )
+        self.assertEqual(2, metrics["feed"]["count"])
+
+        revolutions = metrics["revolutions"]
+        self.assertEqual(counts["chi"] // 41, revolutions["chi1"])
+        self.assertEqual(counts["chi"] // 61, revolutions["mu1"])
+        self.assertEqual(counts["mu2"] // 37, revolutions["mu2"])
+        self.assertEqual(counts["psi"] // 43, revolutions["psi1"])
+        for group in ["chi", "psi", "mu"]:
+            self.assertEqual(
+                [r.position for r in getattr(reference, group).rotors],
+                [r.position for r in getattr(machine, group).rotors],
+            )
+
+    def test__from_machine(self):
+        machine = SZ40(rotors=KH_CAMS)
+        instrumented = InstrumentedSZ40.from_machine(machine)
+
+        self.assertEqual(ciphertext, instrumented.feed(plaintext))
+        self.assertEqual(16, instrumented.metrics()["steps"])
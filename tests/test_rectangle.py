@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_rectangle.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+from lorenz.machines import SZ40
+from lorenz.patterns import ZMUG_CAMS
+from lorenz.rectangle import Rectangle
+from lorenz.rectangle import break_wheels
+from lorenz.rectangle import integrate
+
+SIZES = {"chi": [41, 31, 29, 26, 23], "psi": [43, 47, 51, 53, 59]}
+
+
+def plaintext(n, rng):
+    """ Generate plaintext biased towards repeated characters. """
+    text = [rng.randrange(32)]
+    while len(text) < n:
+        if rng.random() < 0.3:
+            text.append(text[-1])
+        else:
+            text.append(rng.randrange(32))
+    return text
+
+
+def messages(lengths, rng):
+    """ Encipher messages of the given lengths, at random starts. """
+    for n in lengths:
+        positions = {
+            kind: [rng.randrange(size) for size in sizes]
+            for kind, sizes in SIZES.items()
+        }
+        positions["mu"] = [rng.randrange(61), rng.randrange(37)]
+        yield SZ40(ZMUG_CAMS, positions=positions).feed(plaintext(n, rng))
+
+
+def delta(pins):
+    return [a ^ b for a, b in zip(pins, pins[1:] + pins[:1])]
+
+
+def rotations(pins):
+    """ Return every rotation of a pattern, and of its complement. """
+    return [
+        [bit ^ flip for bit in pins[k:] + pins[:k]]
+        for k in range(len(pins))
+        for flip in (0, 1)
+    ]
+
+
+class TestRectangle(unittest.TestCase):
+    def test__integrate(self):
+        pins = ZMUG_CAMS["chi"][0]
+        self.assertIn(integrate(delta(pins)), rotations(pins))
+
+        with self.assertRaises(ValueError):
+            integrate([1, 0, 0])
+
+    def test__tally(self):
+        rectangle = Rectangle((2, 4))
+        ciphertext = next(messages([3000], random.Random(0)))
+        rows = rectangle.tally(ciphertext)
+
+        naive = [[0] * 26 for _ in range(31)]
+        for t in range(len(ciphertext) - 1):
+            word = ciphertext[t] ^ ciphertext[t + 1]
+            bit = ((word >> 3) ^ (word >> 1)) & 1
+            naive[t % 31][t % 26] += 1 - 2 * bit
+
+        self.assertEqual(naive, rows)
+
+    def test__merge(self):
+        a, b, both = Rectangle(), Rectangle(), Rectangle()
+        for i, ciphertext in enumerate(messages([500, 800], random.Random(1))):
+            rows = both.tally(ciphertext)
+            (a if i else b).add(rows, (i, 2 * i))
+            both.add(rows, (i, 2 * i))
+
+        self.assertEqual(both.rows, a.merge(b).rows)
+        self.assertEqual(2, a.messages)
+
+        with self.assertRaises(ValueError):
+            a.merge(Rectangle((1, 3)))
+
+    def test__break_wheels(self):
+        # The first (long) message founds the pool; the rest are too short to
+        # break the wheels alone.
+        rng = random.Random(2)
+        patterns, rectangle = break_wheels(
+            messages([10000] + [2000] * 150, rng), found=20, processes=2
+        )
+
+        self.assertGreater(rectangle.messages, 50)
+        for i in range(2):
+            pins = ZMUG_CAMS["chi"][i]
+            self.assertIn(patterns.delta[i], rotations(delta(pins)))
+            self.assertIn(patterns.cams[i], rotations(pins))
+
+    def test__checkpoint(self):
+        ciphertexts = list(messages([6000] + [1500] * 60, random.Random(3)))
+        options = {"found": 10, "batch": 8}
+        expected, pool = break_wheels(ciphertexts, **options)
+
+        def interrupted(n):
+            for i, ciphertext in enumerate(ciphertexts):
+                if i == n:
+                    raise KeyboardInterrupt
+                yield ciphertext
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "rectangle.json")
+
+            with self.assertRaises(KeyboardInterrupt):
+                break_wheels(
+                    interrupted(40), checkpoint=path, every=0, **options
+                )
+            self.assertTrue(os.path.exists(path))
+
+            # Only the messages not already pooled (the first 10 found the
+            # pool, and 24 were pooled in bulk before the interruption) are
+            # pooled once more.
+            feed = Rectangle.feed
+            with mock.patch.object(
+                Rectangle, "feed", autospec=True, side_effect=feed
+            ) as fed:
+                patterns, rectangle = break_wheels(
+                    ciphertexts, checkpoint=path, every=0, **options
+                )
+            self.assertEqual(len(ciphertexts) - 10 - 24, fed.call_count)
+
+            self.assertEqual(expected, patterns)
+            self.assertEqual(pool.rows, rectangle.rows)
+            self.assertEqual(pool.messages, rectangle.messages)
+
+            # Nor is a checkpoint resumed by a different search.
+            with self.assertRaises(ValueError):
+                break_wheels(ciphertexts[1:], checkpoint=path, **options)
+
+    def test__illegal(self):
+        with self.assertRaises(ValueError):
+            Rectangle((1, 1))
+        with self.assertRaises(ValueError):
+            Rectangle((1, 6))
+        with self.assertRaises(ValueError):
+            break_wheels([])
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_resync.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+import random
+import unittest
+
+from lorenz.language import LanguageModel
+from lorenz.machines import SZ40
+from lorenz.patterns import KH_CAMS
+from lorenz.resync import decrypt
+
+rng = random.Random(1)
+plaintext = LanguageModel.english().sample(3000, rng)
+ciphertext = SZ40(KH_CAMS).feed(plaintext)
+
+
+class TestDecrypt(unittest.TestCase):
+    def test__clean(self):
+        result = decrypt(ciphertext, KH_CAMS)
+
+        self.assertEqual(plaintext, result.plaintext)
+        self.assertEqual([], result.errors)
+        self.assertEqual([], result.unreadable)
+
+    def test__resynchronize(self):
+        # drop two characters at 700, and insert one at 1498 (of the garbled
+        # ciphertext.)
+        garbled = ciphertext[:700] + ciphertext[702:1500]
+        garbled += [rng.randrange(32)] + ciphertext[1500:]
+
+        result = decrypt(garbled, KH_CAMS)
+
+        self.assertEqual(len(garbled), len(result.plaintext))
+        self.assertEqual([2, -1], [error.shift for error in result.errors])
+        self.assertAlmostEqual(700, result.errors[0].position, delta=4)
+        self.assertAlmostEqual(1498, result.errors[1].position, delta=4)
+
+        # the decrypt is correct away from the errors.
+        self.assertEqual(plaintext[:690], result.plaintext[:690])
+        self.assertEqual(plaintext[1510:], result.plaintext[1509:])
+
+    def test__instantiate_invalid(self):
+        self.assertRaises(ValueError, decrypt, ciphertext, KH_CAMS, window=1)
+        self.assertRaises(ValueError, decrypt, ciphertext, KH_CAMS, radius=0)
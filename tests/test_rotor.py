@@ -71,6 +71,49 @@ class TestRotorSet(unittest.TestCase):
 
             rotors.step()
 
+    def test__states(self):
+        rotors = RotorSet(ZMUG_CAMS["chi"], positions=[3, 17, 2, 19, 5])
+
+        self.assertEqual(
+            [7, 27, 17, 4, 6, 8, 27, 18, 5, 31, 25, 2, 0, 20, 14, 15],
+            rotors.states(16),
+        )
+
+        # looking ahead must not move the rotors.
+        self.assertEqual(7, rotors.state())
+
+    def test__seek(self):
+        rotors = RotorSet(ZMUG_CAMS["chi"], positions=[3, 17, 2, 19, 5])
+        rotors.seek(1024)
+
+        self.assertEqual(
+            [2, 18, 11, 3, 17], [rotor.position for rotor in rotors.rotors]
+        )
+
+    def test__backstep(self):
+        rotors = RotorSet(ZMUG_CAMS["chi"], positions=[3, 17, 2, 19, 5])
+        for _ in range(100):
+            rotors.step()
+        for _ in range(100):
+            rotors.backstep()
+
+        self.assertEqual(
+            [3, 17, 2, 19, 5], [rotor.position for rotor in rotors.rotors]
+        )
+
+    def test__rewind(self):
+        rotors = RotorSet(ZMUG_CAMS["chi"], positions=[2, 18, 11, 3, 17])
+        rotors.rewind(1024)
+
+        self.assertEqual(
+            [3, 17, 2, 19, 5], [rotor.position for rotor in rotors.rotors]
+        )
+
+    def test__sizes(self):
+        rotors = RotorSet(ZMUG_CAMS["chi"])
+
+        self.assertEqual([41, 31, 29, 26, 23], rotors.sizes())
+
 
 class TestMotorSet(unittest.TestCase):
     def test__instantiate(self):
@@ -108,3 +151,23 @@ class TestMotorSet(unittest.TestCase):
             )
 
             rotors.step()
+
+    def test__seek(self):
+        rotors = MotorSet(ZMUG_CAMS["mu"], positions=[21, 18])
+        rotors.seek(1024)
+
+        self.assertEqual([8, 3], [rotor.position for rotor in rotors.rotors])
+
+    def test__backstep(self):
+        rotors = MotorSet(ZMUG_CAMS["mu"], positions=[8, 3])
+        for _ in range(1024):
+            rotors.backstep()
+
+        self.assertEqual([21, 18], [rotor.position for rotor in rotors.rotors])
+
+    def test__rewind(self):
+        rotors = MotorSet(ZMUG_CAMS["mu"], positions=[8, 3])
+        rotors.rewind(1024)
+
+        self.assertEqual([21, 18], [rotor.position for rotor in rotors.rotors])
+        self.assertEqual([61, 37], rotors.sizes())
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_schedule.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+import unittest
+
+from lorenz.patterns import BREAM_CAMS
+from lorenz.patterns import KH_CAMS
+from lorenz.patterns import ZMUG_CAMS
+from lorenz.rotor import MotorSet
+from lorenz.schedule import MotorSchedule
+
+
+class TestMotorSchedule(unittest.TestCase):
+    def test__period(self):
+        for cams in [KH_CAMS, ZMUG_CAMS, BREAM_CAMS]:
+            schedule = MotorSchedule(cams["mu"], [0, 0])
+
+            self.assertEqual(61 * 37, schedule.cycle.period)
+            self.assertEqual(
+                schedule.cycle.period,
+                sum(length for _, length in schedule.cycle.runs),
+            )
+
+    def test__stream(self):
+        motor = MotorSet(ZMUG_CAMS["mu"], positions=[57, 28])
+        schedule = MotorSchedule(ZMUG_CAMS["mu"], [57, 28])
+
+        # run for more than a full period, to exercise wrapping.
+        stream = schedule.stream(5000)
+        for i in range(5000):
+            self.assertEqual(motor.state(), stream[i])
+            motor.step()
+
+    def test__advances(self):
+        motor = MotorSet(KH_CAMS["mu"], positions=[3, 30])
+        schedule = MotorSchedule(KH_CAMS["mu"], [3, 30])
+
+        advances = 0
+        for n in range(6000):
+            if n % 97 == 0:
+                self.assertEqual(advances, schedule.advances(n))
+                self.assertEqual(
+                    [rotor.position for rotor in motor.rotors],
+                    schedule.positions(n),
+                )
+
+            advances += motor.state()
+            motor.step()
+
+    def test__shared(self):
+        first = MotorSchedule(BREAM_CAMS["mu"], [0, 0])
+        second = MotorSet(BREAM_CAMS["mu"], positions=[10, 12]).schedule()
+
+        self.assertIs(first.cycle, second.cycle)
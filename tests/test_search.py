@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_search.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+import os
+import random
+import tempfile
+import unittest
+
+from lorenz.machines import SZ40
+from lorenz.patterns import ZMUG_CAMS
+from lorenz.search import ChiSearch
+from lorenz.search import IncrementalChiSearch
+from lorenz.search import SequentialTest
+
+# German plaintext was full of repeated characters (i.e. doubled letters and
+# runs of spaces), which biases its delta towards dots.
+rng = random.Random(0)
+plaintext = [rng.randrange(32)]
+for _ in range(5999):
+    if rng.random() < 0.3:
+        plaintext.append(plaintext[-1])
+    else:
+        plaintext.append(rng.randrange(32))
+
+positions = {"chi": [5, 6, 7, 8, 9], "psi": [1, 2, 3, 4, 5], "mu": [10, 20]}
+ciphertext = SZ40(ZMUG_CAMS, positions=positions).feed(plaintext)
+
+
+def naive(ciphertext, chi, starts, rotors):
+    """ Count the dots of a setting one character at a time. """
+    count = 0
+    for t in range(len(ciphertext) - 1):
+        total = 0
+        for i, s in zip(rotors, starts):
+            pins = chi[i - 1]
+            total ^= (ciphertext[t] >> (5 - i)) & 1
+            total ^= (ciphertext[t + 1] >> (5 - i)) & 1
+            total ^= pins[(s + t) % len(pins)] ^ pins[(s + t + 1) % len(pins)]
+        count += total == 0
+    return count
+
+
+class TestChiSearch(unittest.TestCase):
+    def test__run(self):
+        search = ChiSearch(ciphertext, ZMUG_CAMS["chi"])
+        settings = search.run()
+
+        self.assertEqual(41 * 31, len(settings))
+        self.assertEqual((5, 6), settings[0].starts)
+        self.assertGreater(settings[0].sigma, 5)
+
+        for setting in settings[:3] + settings[-3:]:
+            self.assertEqual(
+                naive(ciphertext, ZMUG_CAMS["chi"], setting.starts, (1, 2)),
+                setting.count,
+            )
+
+    def test__run_rotors(self):
+        search = ChiSearch(
+            ciphertext[:300], ZMUG_CAMS["chi"], rotors=(4, 2, 5)
+        )
+        settings = search.run()
+
+        self.assertEqual(26 * 31 * 23, len(settings))
+        for setting in settings[:2]:
+            self.assertEqual(
+                naive(
+                    ciphertext[:300],
+                    ZMUG_CAMS["chi"],
+                    setting.starts,
+                    (4, 2, 5),
+                ),
+                setting.count,
+            )
+
+    def test__run_sequential(self):
+        exhaustive = ChiSearch(ciphertext, ZMUG_CAMS["chi"])
+        expected = exhaustive.run(limit=1)
+
+        search = ChiSearch(ciphertext, ZMUG_CAMS["chi"])
+        settings = search.run(SequentialTest(bias=0.55), limit=1)
+
+        # All but the best candidates are dropped early in the message, so
+        # far fewer characters are counted.
+        self.assertEqual(expected, settings)
+        self.assertLess(search.work, exhaustive.work / 3)
+
+    def test__incremental(self):
+        crossings = []
+        search = IncrementalChiSearch(
+            ZMUG_CAMS["chi"], threshold=5.0, callback=crossings.append
+        )
+
+        returned = []
+        t = 0
+        while t < len(ciphertext):
+            n = rng.randint(0, 80)
+            returned.extend(search.feed(ciphertext[t : t + n]))
+            t += n
+
+        self.assertEqual(
+            ChiSearch(ciphertext, ZMUG_CAMS["chi"]).run(), search.run()
+        )
+
+        # The correct setting rose above the threshold as it was fed.
+        self.assertEqual(returned, crossings)
+        self.assertIn((5, 6), [crossing.starts for crossing in crossings])
+        for crossing in crossings:
+            self.assertGreaterEqual(crossing.sigma, 5.0)
+            self.assertLessEqual(crossing.length, len(ciphertext) - 1)
+
+        # Feeding a character at a time gives the same counts.
+        single = IncrementalChiSearch(ZMUG_CAMS["chi"])
+        for word in ciphertext[:200]:
+            single.feed([word])
+        self.assertEqual(
+            ChiSearch(ciphertext[:200], ZMUG_CAMS["chi"]).run(), single.run()
+        )
+
+        with self.assertRaises(ValueError):
+            search.run(SequentialTest())
+
+    def interrupt(self, search, calls):
+        """ Make a search crash after a number of counts. """
+        count = search._dots
+
+        def crash(*args):
+            if search.crashes == calls:
+                raise KeyboardInterrupt
+            search.crashes += 1
+            return count(*args)
+
+        search.crashes = 0
+        search._dots = crash
+
+    def test__checkpoint(self):
+        for test, limit in [
+            (None, None),
+            (None, 5),
+            (SequentialTest(bias=0.55, block=100), 3),
+        ]:
+            expected = ChiSearch(ciphertext, ZMUG_CAMS["chi"])
+            settings = expected.run(test, limit=limit)
+
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "search.json")
+
+                search = ChiSearch(ciphertext, ZMUG_CAMS["chi"])
+                self.interrupt(search, 3)
+                with self.assertRaises(KeyboardInterrupt):
+                    search.run(test, limit=limit, checkpoint=path, every=0)
+                self.assertTrue(os.path.exists(path))
+
+                resumed = ChiSearch(ciphertext, ZMUG_CAMS["chi"])
+                self.assertEqual(
+                    settings,
+                    resumed.run(test, limit=limit, checkpoint=path, every=0),
+                )
+                self.assertEqual(expected.work, resumed.work)
+
+                # A finished search is not counted again.
+                finished = ChiSearch(ciphertext, ZMUG_CAMS["chi"])
+                self.assertEqual(
+                    settings, finished.run(test, limit=limit, checkpoint=path)
+                )
+                self.assertEqual(expected.work, finished.work)
+
+                # Nor is a checkpoint resumed by a different search.
+                other = ChiSearch(ciphertext[1:], ZMUG_CAMS["chi"])
+                with self.assertRaises(ValueError):
+                    other.run(test, limit=limit, checkpoint=path)
+
+    def test__checkpoint_long(self):
+        # The packed delta stream of a long ciphertext is an integer of more
+        # digits than `repr()` allows; it must still be fingerprinted.
+        long = ciphertext * 4
+        expected = ChiSearch(long, ZMUG_CAMS["chi"]).run(limit=3)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "search.json")
+            for _ in range(2):
+                search = ChiSearch(long, ZMUG_CAMS["chi"])
+                self.assertEqual(
+                    expected, search.run(limit=3, checkpoint=path, every=0)
+                )
+
+    def test__instantiate_invalid(self):
+        self.assertRaises(ValueError, ChiSearch, [1], ZMUG_CAMS["chi"])
+        self.assertRaises(
+            ValueError, ChiSearch, ciphertext, ZMUG_CAMS["chi"], rotors=(6,)
+        )
+
+        self.assertRaises(ValueError, SequentialTest, bias=0.5)
+        self.assertRaises(ValueError, SequentialTest, alpha=0)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_shared.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+import multiprocessing
+import pickle
+import random
+import unittest
+
+from lorenz import stats
+from lorenz.bits import BitPlaneStream
+from lorenz.cribs import drag
+from lorenz.machines import SZ40
+from lorenz.patterns import KH_CAMS
+from lorenz.patterns import ZMUG_CAMS
+from lorenz.search import ChiSearch
+from lorenz.shared import SharedCams
+from lorenz.shared import SharedSZ40
+from lorenz.telegraphy import Teleprinter
+
+POSITIONS = {"chi": [3, 4, 5, 6, 7], "psi": [1, 2, 3, 4, 5], "mu": [10, 20]}
+
+
+def encipher(machine, stream):
+    return machine.feed(stream)
+
+
+class TestShared(unittest.TestCase):
+    def test__table(self):
+        with SharedCams.publish(ZMUG_CAMS) as table:
+            self.assertEqual(
+                ZMUG_CAMS,
+                {
+                    group: [list(pins) for pins in rotors]
+                    for group, rotors in table.cams.items()
+                },
+            )
+            self.assertIs(table, SharedCams.attach(table.name))
+
+    def test__invalid(self):
+        with self.assertRaises(ValueError):
+            SharedCams.publish({"chi": [[0, 2]], "psi": [], "mu": []})
+
+        with SharedCams.publish(KH_CAMS) as table:
+            with self.assertRaises(ValueError):
+                SharedSZ40(table, {"chi": [0], "psi": [], "mu": []})
+
+    def test__machine(self):
+        stream = [random.randrange(32) for _ in range(3000)]
+
+        with SharedCams.publish(KH_CAMS) as table:
+            machine = SharedSZ40(table.name, positions=POSITIONS)
+            self.assertEqual(
+                SZ40(KH_CAMS, positions=POSITIONS).feed(stream),
+                machine.feed(stream),
+            )
+
+            # A machine pickles as its table's name and its positions.
+            data = pickle.dumps(machine)
+            self.assertLess(len(data), 400)
+
+            restored = pickle.loads(data)
+            self.assertIs(table, restored.table)
+            self.assertEqual(machine.positions(), restored.positions())
+            self.assertEqual(machine.feed(stream), restored.feed(stream))
+
+    def test__processes(self):
+        streams = [
+            [random.randrange(32) for _ in range(500)] for _ in range(4)
+        ]
+
+        with SharedCams.publish(KH_CAMS) as table:
+            machine = SharedSZ40(table, positions=POSITIONS)
+
+            with multiprocessing.Pool(2) as pool:
+                results = pool.starmap(
+                    encipher, [(machine, stream) for stream in streams]
+                )
+
+            self.assertEqual(
+                [
+                    SZ40(KH_CAMS, positions=POSITIONS).feed(stream)
+                    for stream in streams
+                ],
+                results,
+            )
+
+    def test__analysis(self):
+        plaintext = Teleprinter.encode("ATTACK99AT99DAWN" * 200)
+        ciphertext = SZ40(KH_CAMS, positions=POSITIONS).feed(plaintext)
+
+        with SharedCams.publish(KH_CAMS) as table:
+            # the shared cams stand in for lists wherever cams are taken.
+            self.assertEqual(
+                ChiSearch(ciphertext, KH_CAMS["chi"]).run(limit=5),
+                ChiSearch(ciphertext, table.cams["chi"]).run(limit=5),
+            )
+            self.assertEqual(
+                drag(ciphertext, plaintext[:40], KH_CAMS["chi"]),
+                drag(ciphertext, plaintext[:40], table.cams["chi"]),
+            )
+            self.assertEqual(
+                stats.statistics(KH_CAMS), stats.statistics(table.cams)
+            )
+
+            machine = SharedSZ40(table, positions=POSITIONS)
+            self.assertEqual(
+                BitPlaneStream.from_rotors(
+                    SZ40(KH_CAMS, positions=POSITIONS).chi, 1000
+                ),
+                BitPlaneStream.from_rotors(machine.chi, 1000),
+            )
+
+    def test__close(self):
+        table = SharedCams.publish(KH_CAMS)
+        name = table.name
+        with table:
+            pins = table.cams["chi"][0]
+            self.assertEqual(KH_CAMS["chi"][0], pins)
+            self.assertEqual(KH_CAMS["chi"][0][3:], pins[3:])
+
+        # once closed, the views of the block are released.
+        with self.assertRaises(ValueError):
+            pins[0]
+
+        with self.assertRaises(FileNotFoundError):
+            SharedCams.attach(name)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_stats.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+import unittest
+
+from lorenz import stats
+from lorenz.bits import BitPlaneStream
+from lorenz.machines import SZ40
+from lorenz.patterns import BREAM_CAMS
+from lorenz.patterns import KH_CAMS
+from lorenz.patterns import ZMUG_CAMS
+from lorenz.schedule import MotorSchedule
+
+
+class TestStats(unittest.TestCase):
+    def test__crosses(self):
+        self.assertEqual(0.5, stats.crosses([0, 1, 1, 0]))
+        self.assertEqual(0.5, stats.delta_crosses([0, 1, 1, 1]))
+        self.assertEqual(1.0, stats.delta_crosses([0, 1, 0, 1]))
+
+    def test__combine(self):
+        self.assertAlmostEqual(0.5, stats.combine(0.5, 0.1))
+        self.assertAlmostEqual(0.1, stats.combine(0.1, 0.0))
+        self.assertAlmostEqual(0.18, stats.combine(0.1, 0.1))
+
+    def test__advance_rate(self):
+        for cams in [KH_CAMS, ZMUG_CAMS, BREAM_CAMS]:
+            schedule = MotorSchedule(cams["mu"], [0, 0])
+
+            self.assertAlmostEqual(
+                schedule.cycle.total / schedule.cycle.period,
+                stats.advance_rate(cams["mu"]),
+            )
+
+    def test__statistics(self):
+        # compare against the statistics of a simulated keystream.
+        n = 100_000
+        result = stats.statistics(ZMUG_CAMS)
+
+        key = BitPlaneStream.from_stream(SZ40(ZMUG_CAMS).keystream(n))
+        chi = BitPlaneStream.from_rotors(SZ40(ZMUG_CAMS).chi, n)
+
+        for i in range(1, 6):
+            self.assertAlmostEqual(
+                result.key[i - 1], key.crosses(i) / n, delta=0.01
+            )
+            self.assertAlmostEqual(
+                result.delta_key[i - 1],
+                key.delta().crosses(i) / (n - 1),
+                delta=0.01,
+            )
+
+        self.assertAlmostEqual(
+            result.run,
+            (key.delta() ^ chi.delta()).dots(1, 2) / (n - 1),
+            delta=0.01,
+        )
+
+    def test__evaluate(self):
+        library = {"kh": KH_CAMS, "zmug": ZMUG_CAMS}
+        results = stats.evaluate(library, rotors=(4, 5), plaintext=0.6)
+
+        self.assertEqual({"kh", "zmug"}, set(results))
+        self.assertEqual(
+            stats.statistics(KH_CAMS, rotors=(4, 5), plaintext=0.6),
+            results["kh"],
+        )
+        self.assertEqual(2, len(stats.evaluate([KH_CAMS, BREAM_CAMS])))
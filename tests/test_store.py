@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_store.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+import os
+import random
+import sqlite3
+import tempfile
+import unittest
+
+from lorenz.cache import key
+from lorenz.patterns import KH_CAMS
+from lorenz.patterns import ZMUG_CAMS
+from lorenz.store import Store
+from lorenz.store import fingerprint
+
+POSITIONS = {"chi": [1, 2, 3, 4, 5], "psi": [6, 7, 8, 9, 10], "mu": [11, 12]}
+
+
+def messages(n, seed=0):
+    rng = random.Random(seed)
+    return [[rng.randrange(32) for _ in range(50)] for _ in range(n)]
+
+
+class TestStore(unittest.TestCase):
+    def setUp(self):
+        self.store = Store()
+
+    def tearDown(self):
+        self.store.close()
+
+    def test__messages(self):
+        ciphertexts = messages(10)
+        fingerprints = self.store.add_messages(ciphertexts)
+        self.store.add_messages(ciphertexts[:5])
+
+        self.assertEqual(10, len(self.store))
+        self.assertEqual(fingerprint(ciphertexts[3]), fingerprints[3])
+        self.assertEqual(ciphertexts[3], self.store.message(fingerprints[3]))
+        self.assertIsNone(self.store.message("0" * 64))
+
+    def test__cams(self):
+        digest = self.store.add_cams(ZMUG_CAMS, "ZMUG")
+        self.assertEqual(key(ZMUG_CAMS), digest)
+        self.assertEqual(ZMUG_CAMS, self.store.cams("ZMUG"))
+        self.assertEqual(ZMUG_CAMS, self.store.cams(digest))
+        self.assertIsNone(self.store.cams("BREAM"))
+
+    def test__decrypts(self):
+        self.store.add_cams(ZMUG_CAMS, "ZMUG")
+        ciphertexts = messages(6)
+
+        count = self.store.add_decrypts(
+            {
+                "ciphertext": ciphertext,
+                "cams": ZMUG_CAMS if i % 2 else KH_CAMS,
+                "positions": POSITIONS,
+                "score": float(i),
+                "plaintext": ciphertext[::-1],
+                "analysis": "chi-search",
+                "parameters": {"rotors": [1, 2]},
+            }
+            for i, ciphertext in enumerate(ciphertexts)
+        )
+        self.assertEqual(6, count)
+
+        zmug = self.store.messages(cams="ZMUG")
+        self.assertEqual([fingerprint(c) for c in ciphertexts[1::2]], zmug)
+        self.assertEqual(zmug, self.store.messages(cams=ZMUG_CAMS))
+        self.assertEqual(3, len(self.store.decrypts(cams=KH_CAMS)))
+        self.assertEqual([], self.store.messages(analysis="rectangling"))
+
+        decrypts = self.store.decrypts(limit=2)
+        self.assertEqual([5.0, 4.0], [d.score for d in decrypts])
+        self.assertEqual(POSITIONS, decrypts[0].positions)
+        self.assertEqual(ciphertexts[5][::-1], decrypts[0].plaintext)
+        self.assertEqual({"rotors": [1, 2]}, decrypts[0].parameters)
+
+        # A better decrypt of a message already recorded.
+        self.store.add_decrypt(
+            fingerprint=fingerprint(ciphertexts[0]),
+            cams=key(KH_CAMS),
+            positions=POSITIONS,
+            score=10.0,
+        )
+        best = self.store.best(fingerprint(ciphertexts[0]))
+        self.assertEqual(10.0, best.score)
+        self.assertIsNone(best.plaintext)
+
+    def test__unsolved(self):
+        ciphertexts = messages(5)
+        for ciphertext in ciphertexts[:2]:
+            self.store.add_decrypt(
+                ciphertext=ciphertext, cams=KH_CAMS, positions=POSITIONS
+            )
+
+        self.assertEqual(
+            ciphertexts[2:], list(self.store.unsolved(ciphertexts))
+        )
+        self.assertEqual(
+            ciphertexts, list(self.store.unsolved(ciphertexts, "ZMUG"))
+        )
+        self.assertTrue(self.store.solved(fingerprint(ciphertexts[0])))
+
+    def test__integrity(self):
+        with self.assertRaises(ValueError):
+            self.store.add_decrypt(
+                fingerprint="0" * 64, cams=KH_CAMS, positions=POSITIONS
+            )
+
+        fp = self.store.add_message(messages(1)[0])
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.store.add_decrypt(
+                fingerprint=fp, cams="0" * 64, positions=POSITIONS
+            )
+
+    def test__file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "lorenz.db")
+            with Store(path) as store:
+                store.add_decrypts(
+                    {"ciphertext": c, "cams": KH_CAMS, "positions": POSITIONS}
+                    for c in messages(100)
+                )
+
+            with Store(path) as store:
+                self.assertEqual(100, len(store))
+                self.assertEqual(100, len(store.messages(cams=KH_CAMS)))
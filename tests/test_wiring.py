@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# test_wiring.py
+# Copyright (c) 2020 Hugh Coleman
+#
+# This file is part of hughcoleman/lorenz, a historically accurate simulator of
+# the Lorenz SZ40 Cipher Machine. It is released under the MIT License (see
+# LICENSE.)
+import random
+import unittest
+
+from lorenz import wiring
+from lorenz.machines import SZ40
+from lorenz.patterns import KH_CAMS
+from lorenz.patterns import ZMUG_CAMS
+
+POSITIONS = {"chi": [3, 4, 5, 6, 7], "psi": [1, 2, 3, 4, 5], "mu": [10, 20]}
+
+# An SZ40 with a "limitation": the Psi wheels also step whenever the cam one
+# back on the second Chi wheel is a cross.
+LIMITED = wiring.Wiring(
+    wheels=wiring.SZ40_WIRING.wheels,
+    drives={
+        "mu37": "mu61",
+        **{f"psi{i}": "mu37 or chi2[-1]" for i in range(1, 6)},
+    },
+    key=wiring.SZ40_WIRING.key,
+)
+
+
+class TestWiring(unittest.TestCase):
+    def test__sz40(self):
+        stream = [random.randrange(32) for _ in range(5000)]
+
+        for cams in [KH_CAMS, ZMUG_CAMS]:
+            machine = SZ40(cams, positions=POSITIONS)
+            compiled = wiring.CompiledMachine.sz40(cams, positions=POSITIONS)
+
+            self.assertEqual(machine.feed(stream), compiled.feed(stream))
+            self.assertEqual(machine.keystream(100), compiled.keystream(100))
+
+            state = compiled.state()
+            self.assertEqual(
+                [rotor.position for rotor in machine.psi.rotors],
+                [state[f"psi{i}"] for i in range(1, 6)],
+            )
+            self.assertEqual(
+                [rotor.position for rotor in machine.mu.rotors],
+                [state["mu61"], state["mu37"]],
+            )
+
+    def test__limitation(self):
+        compiled = wiring.CompiledMachine.sz40(KH_CAMS, positions=POSITIONS)
+        compiled = wiring.CompiledMachine(
+            LIMITED, dict(zip(compiled.state(), compiled.pins))
+        )
+
+        # Simulate the limited machine step by step.
+        machine = SZ40(KH_CAMS)
+        chi2 = machine.chi.rotors[1]
+
+        key = []
+        for _ in range(1000):
+            key.append(machine.state())
+
+            limitation = chi2.pins[chi2.position - 1]
+            if machine.mu.state() or limitation:
+                machine.psi.step()
+            machine.mu.step()
+            machine.chi.step()
+
+        self.assertEqual(key, compiled.keystream(1000))
+
+    def test__cache(self):
+        self.assertIs(
+            wiring.compile_wiring(wiring.SZ40_WIRING),
+            wiring.compile_wiring(wiring.Wiring(*wiring.SZ40_WIRING)),
+        )
+        self.assertIsNot(
+            wiring.compile_wiring(wiring.SZ40_WIRING),
+            wiring.compile_wiring(LIMITED),
+        )
+        self.assertNotEqual(
+            wiring.digest(wiring.SZ40_WIRING), wiring.digest(LIMITED)
+        )
+
+        # the cache holds a bounded number of compiled functions.
+        for size in range(2, wiring.CACHE + 10):
+            wiring.compile_wiring(
+                wiring.Wiring([("a", size)], {}, [["a"], [], [], [], []])
+            )
+        self.assertEqual(wiring.CACHE, wiring._compile.cache_info().currsize)
+
+    def test__feed_invalid(self):
+        machine = wiring.CompiledMachine.sz40(KH_CAMS)
+
+        self.assertRaises(RuntimeError, machine.feed, [1, 2, 32])
+        self.assertRaises(RuntimeError, machine.feed, [1, 2.0, 3])
+        self.assertRaises(RuntimeError, machine.feed, [1, -1, 3])
+        self.assertEqual([0] * 12, machine.positions)
+
+    def test__invalid(self):
+        wheels = [("a", 3), ("b", 5)]
+        key = [["a"], ["b"], [], [], []]
+
+        for drives in [
+            {"b": "c"},
+            {"b": "a + 1"},
+            {"b": "a[x]"},
+            {"b": "import os"},
+            {"c": "a"},
+        ]:
+            with self.assertRaises(ValueError):
+                wiring.source(wiring.Wiring(wheels, drives, key))
+
+        with self.assertRaises(ValueError):
+            wiring.source(wiring.Wiring([("a", 3), ("a", 5)], {}, key))
+        with self.assertRaises(ValueError):
+            wiring.source(wiring.Wiring([("if", 3)], {}, key))
+        with self.assertRaises(ValueError):
+            wiring.source(wiring.Wiring(wheels, {}, key[:4]))
+
+        machine = wiring.Wiring(wheels, {"b": "not a[1]"}, key)
+        with self.assertRaises(ValueError):
+            wiring.CompiledMachine(machine, {"a": [0, 1, 0]})
+        with self.assertRaises(ValueError):
+            wiring.CompiledMachine(machine, {"a": [0, 1], "b": [0] * 5})
+        with self.assertRaises(ValueError):
+            wiring.CompiledMachine(
+                machine, {"a": [0, 1, 0], "b": [0] * 5}, {"a": 3}
+            )